@@ -3,16 +3,270 @@ Flask backend API for scam detection.
 Endpoint: POST /detect-scam
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-from model_utils import ScamDetectionModel
+from calibration import load_threshold_profiles
+from metrics import CONTENT_TYPE, registry, stage_timer
+from ndjson_stream import NDJSONScorer, iter_results
+from near_duplicates import MinHashLSH, cluster_indicator_key, cluster_messages
+from text_preprocessor import TextPreprocessor
+from model_utils import ModelReloadError, ScamDetectionModel, load_canary
+from model_reloader import ModelReloader
+from online_learning import OnlineLearner, open_feedback_store
+from prefilter import PrefilterCascade, load_prefilter_config
+from reputation_index import ReputationIndex
+from worker_pool import InferencePool, PoolOverloaded
+import argparse
 import os
+import time
+from typing import Optional
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend integration
 
-# Initialize model
-model = ScamDetectionModel()
+# Extra sections for the health endpoint, registered by serving modes
+# (e.g. the ASGI request coalescer): name -> callable returning a dict
+health_providers = {}
+
+# Cheap checks that settle obvious messages before the model (domain block/allow
+# lists, feature thresholds); tiers are configured with a JSON file. Off unless
+# enabled there or with PREFILTER_ENABLED=1: settled messages get the tier's
+# fixed probability and rule-based explanations instead of the model's
+prefilter_config = load_prefilter_config(os.environ.get('PREFILTER_CONFIG'))
+if 'PREFILTER_ENABLED' in os.environ:
+    prefilter_config['enabled'] = os.environ['PREFILTER_ENABLED'].lower() not in ('0', 'false', 'no')
+prefilter = PrefilterCascade(prefilter_config) if prefilter_config['enabled'] else None
+
+# Scam thresholds (0-100) per tenant, applied to the calibrated probability;
+# a request can also send its own "threshold"
+threshold_profiles = load_threshold_profiles(os.environ.get('THRESHOLD_PROFILES'))
+health_providers['thresholds'] = threshold_profiles.stats
+
+# Known bad / good domains and phone numbers (build with reputation_index.py);
+# swapped in by the same reload as the model
+reputation = ReputationIndex(os.environ.get('REPUTATION_INDEX', 'model/reputation'))
+
+# Initialize model (prediction cache is sized/aged via environment variables)
+model = ScamDetectionModel(
+    cache_size=int(os.environ.get('PREDICTION_CACHE_SIZE', 10000)),
+    cache_ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 300)),
+    top_k_terms=int(os.environ.get('EXPLAIN_TOP_TERMS', 5)),
+    prefilter=prefilter,
+    reputation=reputation
+)
+
+# Object that runs predictions: the model itself, or an InferencePool of
+# forked workers sharing it (see start_worker_pool)
+predictor = model
+
+# Hot reload of retrained models (admin endpoint, SIGHUP, file watch)
+reloader = ModelReloader(
+    model,
+    canary=load_canary(os.environ.get('MODEL_CANARY_FILE')),
+    min_canary_accuracy=float(os.environ.get('MODEL_CANARY_MIN_ACCURACY', 1.0))
+)
+health_providers['reload'] = reloader.stats
+health_providers['calibration'] = lambda: model.calibrator.stats() if model.calibrator is not None else None
+
+# Incremental updates from analyst feedback (POST /feedback, POST /admin/learn)
+learner = OnlineLearner(
+    model,
+    open_feedback_store(os.environ.get('FEEDBACK_STORE', 'model/feedback.sqlite3')),
+    checkpoint_dir=os.environ.get('ONLINE_CHECKPOINT_DIR', 'model/online'),
+    canary=reloader.canary,
+    min_canary_accuracy=reloader.min_canary_accuracy
+)
+learner.restore()
+health_providers['online_learning'] = learner.stats
+
+# Near-duplicate grouping for /batch-detect ("near_duplicates": true)
+near_duplicate_index = MinHashLSH(threshold=float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', 0.8)))
+
+# Request metrics (see /metrics); model stages are timed in model_utils
+REQUESTS = registry.counter("scam_http_requests_total", "HTTP requests handled",
+                            labelnames=("endpoint", "method", "status"))
+REQUEST_SECONDS = registry.histogram("scam_http_request_duration_seconds",
+                                     "Time to handle an HTTP request", labelnames=("endpoint",))
+_PARSE_TIMER = stage_timer("parse_json")
+_SERIALIZE_TIMER = stage_timer("serialize_json")
+
+registry.gauge_callback(
+    "scam_model_info", "Loaded model version and format",
+    lambda: [((model.model_version or "", model.model_format or ""), 1 if model.model is not None else 0)],
+    labelnames=("version", "format"))
+registry.gauge_callback(
+    "scam_model_loaded_timestamp_seconds", "Unix time the current model was loaded",
+    lambda: [((), model.loaded_at)])
+registry.gauge_callback(
+    "scam_model_reloads_total", "Models swapped in by hot reload",
+    lambda: [((), reloader.reloads)], kind="counter")
+registry.gauge_callback(
+    "scam_model_reload_failures_total", "Reloaded models rejected",
+    lambda: [((), reloader.failures)], kind="counter")
+registry.gauge_callback(
+    "scam_prediction_cache_entries", "Entries in the prediction cache",
+    lambda: [((), model.cache.stats()["size"])])
+registry.gauge_callback(
+    "scam_prediction_cache_events_total", "Prediction cache lookups and removals by outcome",
+    lambda: [((event,), model.cache.stats()[event])
+             for event in ("hits", "misses", "evictions", "expirations")],
+    labelnames=("event",), kind="counter")
+registry.gauge_callback(
+    "scam_reputation_index_entries", "Indicators in the loaded reputation index",
+    lambda: [((), reputation.stats()["entries"])])
+health_providers['reputation'] = reputation.stats
+
+if prefilter is not None:
+    health_providers['prefilter'] = prefilter.stats
+    registry.gauge_callback(
+        "scam_prefilter_checked_total", "Messages checked by the pre-filter cascade",
+        lambda: [((), prefilter.checked)], kind="counter")
+    registry.gauge_callback(
+        "scam_prefilter_decisions_total", "Messages settled by a pre-filter tier without the model",
+        lambda: [((tier, prediction), count) for (tier, prediction), count in prefilter.decisions.items()],
+        labelnames=("tier", "prediction"), kind="counter")
+
+def start_worker_pool(processes: int, max_pending: int = 1024) -> InferencePool:
+    """Serve predictions from a pool of worker processes forked after the model is loaded."""
+    global predictor
+    pool = InferencePool(model, processes=processes, max_pending=max_pending).start()
+    predictor = pool
+    health_providers['worker_pool'] = pool.stats
+    # Workers hold a copy of the model from fork time; refork them after a reload
+    reloader.on_swap = pool.recycle
+    return pool
+
+def start_model_reloading(watch_interval: float = 0.0):
+    """Reload on SIGHUP and, if watch_interval > 0, when the model files change."""
+    reloader.install_signal_handler()
+    if watch_interval > 0:
+        reloader.watch(watch_interval)
+
+def start_online_learning(interval: float = 0.0):
+    """Apply pending feedback every interval seconds (0 = only via POST /admin/learn)."""
+    if interval > 0:
+        learner.watch(interval, on_update=recycle_workers)
+
+def recycle_workers():
+    """Refork the inference workers, if any, so they serve the current weights."""
+    if reloader.on_swap is not None:
+        reloader.on_swap()
+
+def is_admin_request() -> bool:
+    """Admin endpoints need the ADMIN_TOKEN header, or a local client when no token is set."""
+    token = os.environ.get('ADMIN_TOKEN')
+    if token:
+        return request.headers.get('X-Admin-Token') == token
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+def validate_detect_request(data):
+    """
+    Validate a /detect-scam request body.
+    
+    Shared by the Flask handler and the ASGI entry point (asgi_app.py) so both
+    keep the same API contract.
+    
+    Returns:
+        tuple: (message, None) when valid, otherwise (None, (error_body, status))
+    """
+    if not data:
+        return None, ({
+            "error": "No JSON data provided"
+        }, 400)
+    
+    # Extract message
+    message = data.get('message', '').strip()
+    
+    if not message:
+        return None, ({
+            "error": "Message field is required and cannot be empty"
+        }, 400)
+    
+    # Check if model is loaded
+    if model.model is None or model.vectorizer is None:
+        return None, ({
+            "error": "Model not loaded. Please train the model first."
+        }, 503)
+    
+    return message, None
+
+def request_flag(data, args, name: str, default: bool) -> bool:
+    """Read a boolean option from the JSON body, falling back to the query string."""
+    value = data.get(name) if isinstance(data, dict) and name in data else args.get(name, default)
+    if isinstance(value, str):
+        return value.strip().lower() not in ('false', '0', 'no', 'off', '')
+    return bool(value)
+
+def explain_requested(data, args) -> bool:
+    """
+    Whether the client wants explanations: "explain": false in the JSON body or
+    ?explain=false in the query string turns them off (default on).
+    """
+    return request_flag(data, args, 'explain', True)
+
+def request_threshold(data, args, tenant_header: Optional[str] = None) -> float:
+    """
+    The Scam threshold (0-100) for a request: "threshold" in the JSON body or
+    query string, else the profile of "tenant" (body, query string or
+    X-Tenant-Id header), else the default profile.
+    
+    Raises:
+        ValueError: the threshold is not a number in (0, 100]
+    """
+    data = data if isinstance(data, dict) else {}
+    threshold = data['threshold'] if 'threshold' in data else args.get('threshold')
+    tenant = data['tenant'] if 'tenant' in data else args.get('tenant', tenant_header)
+    return threshold_profiles.resolve(tenant, threshold)
+
+def stream_scorer(args, scoring, tenant_header: Optional[str] = None) -> NDJSONScorer:
+    """
+    Build the scorer for one /stream-detect request from its query string
+    (?batch_size=, ?explain=, ?threshold=, ?tenant=).
+    
+    Raises:
+        ValueError: an invalid batch_size or threshold
+    """
+    try:
+        batch_size = int(args.get('batch_size', os.environ.get('STREAM_BATCH_SIZE', 256)))
+    except ValueError:
+        raise ValueError("batch_size must be an integer")
+    return NDJSONScorer(scoring, batch_size=min(max(batch_size, 1), 4096),
+                        explain=explain_requested(None, args),
+                        threshold=request_threshold(None, args, tenant_header))
+
+def format_top_terms(top_terms):
+    """Round top-term weights for the response."""
+    return [{"term": item["term"], "weight": round(item["weight"], 4)} for item in top_terms]
+
+def detect_response(message, prediction, probability, explanations, top_terms, threshold):
+    """Build the /detect-scam response body."""
+    return {
+        "prediction": prediction,
+        "probability": round(probability, 2),
+        "threshold": threshold,
+        "explanations": explanations,
+        "top_terms": format_top_terms(top_terms),
+        "message": message  # Echo back the message for reference
+    }
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        # The route pattern, not the raw path, so label values stay bounded
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - started)
+        REQUESTS.labels(endpoint, request.method, response.status_code).inc()
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus-style metrics in the text exposition format."""
+    return Response(registry.render(), content_type=CONTENT_TYPE)
 
 @app.route('/', methods=['GET'])
 def health_check():
@@ -20,7 +274,12 @@ def health_check():
     return jsonify({
         "status": "running",
         "message": "CyberGuard Bot - Scam Detection API",
-        "model_loaded": model.model is not None and model.vectorizer is not None
+        "model_loaded": model.model is not None and model.vectorizer is not None,
+        "model_version": model.model_version,
+        "model_format": model.model_format,
+        "model_loaded_at": model.loaded_at,
+        "cache": model.cache.stats(),
+        **{name: provider() for name, provider in health_providers.items()}
     })
 
 @app.route('/detect-scam', methods=['POST'])
@@ -30,52 +289,59 @@ def detect_scam():
     
     Request body:
     {
-        "message": "Your account has been suspended. Click here..."
+        "message": "Your account has been suspended. Click here...",
+        "explain": true,  (optional; false skips the explanations)
+        "tenant": "acme-bank",  (optional; selects a threshold profile, or X-Tenant-Id)
+        "threshold": 70  (optional; Scam at or above this probability, overrides the profile)
     }
     
     Response:
     {
         "prediction": "Scam",
         "probability": 87.5,
+        "threshold": 50.0,
         "explanations": [
             "Contains 2 urgency-indicating word(s)",
             "Multiple suspicious phrases detected (3)"
+        ],
+        "top_terms": [
+            {"term": "suspended", "weight": 1.8421},
+            {"term": "click", "weight": 0.9310}
         ]
     }
     """
     try:
         # Get JSON data
+        start = time.perf_counter()
         data = request.get_json()
+        _PARSE_TIMER.observe(time.perf_counter() - start)
         
-        if not data:
-            return jsonify({
-                "error": "No JSON data provided"
-            }), 400
-        
-        # Extract message
-        message = data.get('message', '').strip()
-        
-        if not message:
+        message, error = validate_detect_request(data)
+        if error:
+            return jsonify(error[0]), error[1]
+        try:
+            threshold = request_threshold(data, request.args, request.headers.get('X-Tenant-Id'))
+        except ValueError as e:
             return jsonify({
-                "error": "Message field is required and cannot be empty"
+                "error": str(e)
             }), 400
         
-        # Check if model is loaded
-        if model.model is None or model.vectorizer is None:
-            return jsonify({
-                "error": "Model not loaded. Please train the model first."
-            }), 503
-        
         # Get prediction
-        prediction, probability, explanations = model.predict(message)
+        prediction, probability, explanations, top_terms = predictor.predict(
+            message, explain=explain_requested(data, request.args), threshold=threshold)
         
         # Return response
+        start = time.perf_counter()
+        response = jsonify(detect_response(message, prediction, probability, explanations, top_terms,
+                                           threshold))
+        _SERIALIZE_TIMER.observe(time.perf_counter() - start)
+        return response, 200
+    
+    except PoolOverloaded as e:
         return jsonify({
-            "prediction": prediction,
-            "probability": round(probability, 2),
-            "explanations": explanations,
-            "message": message  # Echo back the message for reference
-        }), 200
+            "error": str(e),
+            "message": "Server is busy, please retry"
+        }), 503
     
     except Exception as e:
         return jsonify({
@@ -90,8 +356,15 @@ def batch_detect():
     
     Request body:
     {
-        "messages": ["message1", "message2", ...]
+        "messages": ["message1", "message2", ...],
+        "explain": true,  (optional; false skips the explanations)
+        "near_duplicates": false,  (optional; true also groups near-identical messages)
+        "tenant": "acme-bank", "threshold": 70  (optional; as for /detect-scam)
     }
+    
+    Messages with the same cleaned text, domains and phone numbers are scored
+    once. Every result carries the cluster_id of its group; with
+    near_duplicates, messages in a group share the score of its first message.
     """
     try:
         data = request.get_json()
@@ -108,25 +381,68 @@ def batch_detect():
                 "error": "Messages must be an array"
             }), 400
         
-        results = []
-        for msg in messages:
+        texts = [str(msg) for msg in messages]
+        explain = explain_requested(data, request.args)
+        try:
+            threshold = request_threshold(data, request.args, request.headers.get('X-Tenant-Id'))
+        except ValueError as e:
+            return jsonify({
+                "error": str(e)
+            }), 400
+        near_duplicates = request_flag(data, request.args, 'near_duplicates', False)
+        
+        # Score one representative per cluster of duplicate messages; the
+        # links and numbers clean_text drops must match too (reputation)
+        cleaned_texts = list(TextPreprocessor.clean_many(texts))
+        indicators = [TextPreprocessor.extract_indicators(text) for text in texts]
+        cluster_ids, representatives = cluster_messages(
+            cleaned_texts,
+            near_duplicate_index if near_duplicates else None,
+            [cluster_indicator_key(found) for found in indicators]
+        )
+        representative_texts = [texts[i] for i in representatives]
+        
+        try:
+            # Score the whole batch with one vectorizer/model call
+            predictions = predictor.predict_batch(representative_texts, explain=explain, threshold=threshold,
+                                                  cleaned_texts=[cleaned_texts[i] for i in representatives],
+                                                  indicators=[indicators[i] for i in representatives])
+        except PoolOverloaded as e:
+            return jsonify({
+                "error": str(e)
+            }), 503
+        except Exception:
+            # Fall back to per-message scoring so errors are reported per item
+            predictions = None
+        
+        cluster_results = []
+        for c, text in enumerate(representative_texts):
             try:
-                prediction, probability, explanations = model.predict(str(msg))
-                results.append({
-                    "message": str(msg),
+                if predictions is not None:
+                    prediction, probability, explanations, top_terms = predictions[c]
+                else:
+                    prediction, probability, explanations, top_terms = predictor.predict(
+                        text, explain=explain, threshold=threshold)
+                cluster_results.append({
                     "prediction": prediction,
                     "probability": round(probability, 2),
-                    "explanations": explanations
+                    "explanations": explanations,
+                    "top_terms": format_top_terms(top_terms)
                 })
             except Exception as e:
-                results.append({
-                    "message": str(msg),
+                cluster_results.append({
                     "error": str(e)
                 })
         
+        # Fan the cluster results back out in the original order
+        results = [{"message": text, **cluster_results[cluster_id], "cluster_id": cluster_id}
+                   for text, cluster_id in zip(texts, cluster_ids)]
+        
         return jsonify({
             "results": results,
-            "total": len(results)
+            "total": len(results),
+            "clusters": len(representatives),
+            "threshold": threshold
         }), 200
     
     except Exception as e:
@@ -134,7 +450,152 @@ def batch_detect():
             "error": str(e)
         }), 500
 
+@app.route('/stream-detect', methods=['POST'])
+def stream_detect():
+    """
+    Score an unbounded stream of messages sent as NDJSON (see ndjson_stream.py).
+    
+    Request body, one message per line:
+    {"id": "a1", "message": "Your account has been suspended..."}
+    "Lunch at noon?"
+    
+    Response (application/x-ndjson), written while the body is still arriving:
+    {"index": 0, "id": "a1", "prediction": "Scam", "probability": 87.5, ...}
+    {"index": 1, "prediction": "Legit", "probability": 3.2, ...}
+    {"summary": {"total": 2, "scored": 2, "errors": 0}}
+    
+    Query parameters: batch_size (default STREAM_BATCH_SIZE or 256), explain,
+    threshold and tenant (or the X-Tenant-Id header).
+    """
+    if model.model is None or model.vectorizer is None:
+        return jsonify({
+            "error": "Model not loaded. Please train the model first."
+        }), 503
+    
+    try:
+        scorer = stream_scorer(request.args, predictor, request.headers.get('X-Tenant-Id'))
+    except ValueError as e:
+        return jsonify({
+            "error": str(e)
+        }), 400
+    
+    # Read line by line so results flow back while a chunked upload is still arriving
+    stream = request.stream
+    lines = iter(lambda: stream.readline(65536), b'')
+    return Response(stream_with_context(iter_results(lines, scorer)),
+                    content_type='application/x-ndjson')
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """
+    Load the model files again and swap the new model in if it passes the canary check.
+    
+    Response:
+    {
+        "previous_version": "3f9a1c0b22de",
+        "model_version": "8e01d4a7c513",
+        "swapped": true,
+        "canary_accuracy": 1.0
+    }
+    """
+    if not is_admin_request():
+        return jsonify({
+            "error": "Forbidden"
+        }), 403
+    
+    try:
+        return jsonify(reloader.reload("admin")), 200
+    
+    except ModelReloadError as e:
+        return jsonify({
+            "error": str(e),
+            "message": "Model reload rejected, still serving the current model",
+            "model_version": model.model_version
+        }), 500
+
+@app.route('/feedback', methods=['POST'])
+def feedback():
+    """
+    Store analyst-labelled messages for online learning (admin only).
+    
+    Request body:
+    {
+        "feedback": [{"message": "...", "label": "Scam"}, {"message": "...", "label": 0}],
+        "source": "analyst@example.com"  (optional)
+    }
+    """
+    if not is_admin_request():
+        return jsonify({
+            "error": "Forbidden"
+        }), 403
+    
+    data = request.get_json(silent=True)
+    items = data.get('feedback') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return jsonify({
+            "error": "feedback must be an array of {message, label} objects"
+        }), 400
+    
+    try:
+        stored = learner.add_feedback([(item.get('message', ''), item.get('label')) for item in items],
+                                      source=data.get('source'))
+    except ValueError as e:
+        return jsonify({
+            "error": str(e)
+        }), 400
+    
+    return jsonify({
+        "stored": stored,
+        "pending": learner.pending()
+    }), 200
+
+@app.route('/admin/learn', methods=['POST'])
+def admin_learn():
+    """
+    Apply the feedback received since the last update to the model weights.
+    
+    Response:
+    {
+        "updated": true,
+        "samples": 43,
+        "previous_version": "3f9a1c0b22de",
+        "model_version": "3f9a1c0b22de+online1",
+        "loss_before": 1.4158,
+        "loss_after": 0.5875,
+        "canary_accuracy": 1.0,
+        "pending": 0
+    }
+    """
+    if not is_admin_request():
+        return jsonify({
+            "error": "Forbidden"
+        }), 403
+    
+    try:
+        result = learner.update()
+    except ModelReloadError as e:
+        return jsonify({
+            "error": str(e),
+            "message": "Online update rejected, still serving the current weights",
+            "model_version": model.model_version
+        }), 500
+    
+    if result["updated"]:
+        recycle_workers()
+    return jsonify(result), 200
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="CyberGuard Bot scam detection API")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get('INFERENCE_WORKERS', 0)),
+                        help="serve predictions from this many forked worker processes (0 = in-process)")
+    parser.add_argument("--max-pending", type=int, default=int(os.environ.get('INFERENCE_MAX_PENDING', 1024)),
+                        help="requests that may wait for a worker before returning 503")
+    parser.add_argument("--watch-interval", type=float, default=float(os.environ.get('MODEL_WATCH_INTERVAL', 0)),
+                        help="seconds between checks of the model files for a retrained model (0 = off)")
+    parser.add_argument("--learn-interval", type=float, default=float(os.environ.get('ONLINE_LEARNING_INTERVAL', 0)),
+                        help="seconds between online updates from pending feedback (0 = only /admin/learn)")
+    args = parser.parse_args()
+    
     # Check if model exists
     if model.model is None or model.vectorizer is None:
         print("⚠️  WARNING: Model not found. Please run train_model.py first.")
@@ -147,7 +608,24 @@ if __name__ == '__main__':
     print("  GET  /              - Health check")
     print("  POST /detect-scam   - Detect scam in single message")
     print("  POST /batch-detect  - Detect scam in multiple messages")
+    print("  POST /stream-detect - Detect scam in an NDJSON stream of messages")
+    print("  POST /admin/reload  - Reload a retrained model")
+    print("  POST /feedback      - Store analyst-labelled messages")
+    print("  POST /admin/learn   - Apply feedback to the model weights")
+    print("  GET  /metrics       - Prometheus metrics")
+    if args.workers > 0:
+        pool = start_worker_pool(args.workers, args.max_pending)
+        print(f"\nInference worker pool: {args.workers} processes (max {args.max_pending} pending)")
+    start_model_reloading(args.watch_interval)
+    start_online_learning(args.learn_interval)
     print("\nStarting server on http://localhost:5000")
     print("=" * 60 + "\n")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    if args.workers > 0:
+        # The debug reloader would start a second copy of the pool
+        try:
+            app.run(debug=False, threaded=True, host='0.0.0.0', port=5000)
+        finally:
+            pool.close()
+    else:
+        app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,325 @@
+"""
+ASGI entry point with a micro-batching request coalescer.
+
+POST /detect-scam is served natively: concurrent requests that arrive within
+a short window are grouped and scored as one matrix with
+ScamDetectionModel.predict_batch, and every caller gets its own result.
+POST /stream-detect is served natively too, so NDJSON results flow back while
+the request body is still being received. All other routes (and malformed
+/detect-scam requests) are delegated to the Flask app, so the API contract is
+unchanged.
+
+Run with:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+
+Configuration (environment variables):
+    COALESCE_WINDOW_MS   how long the first request of a batch waits for others (default 2)
+    COALESCE_MAX_BATCH   flush as soon as this many messages are waiting (default 64)
+    MODEL_WATCH_INTERVAL seconds between checks for a retrained model (default 0 = off)
+    ONLINE_LEARNING_INTERVAL seconds between online updates from feedback (default 0 = off)
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import (REQUEST_SECONDS, REQUESTS, app as flask_app, detect_response, explain_requested,
+                 health_providers, model, request_threshold, start_model_reloading, start_online_learning,
+                 stream_scorer, validate_detect_request)
+from metrics import stage_timer
+
+_PARSE_TIMER = stage_timer("parse_json")
+_SERIALIZE_TIMER = stage_timer("serialize_json")
+
+
+class RequestCoalescer:
+    """
+    Groups concurrent scoring requests into micro-batches.
+
+    The first message of a batch starts a timer of max_wait seconds; the batch
+    is flushed when the timer fires or when max_batch_size messages are
+    waiting, whichever comes first. Batches are scored in a worker thread so
+    the event loop keeps accepting requests meanwhile.
+    """
+
+    def __init__(self, score_batch: Callable[[List[str], List[bool], List[float]], List[tuple]],
+                 score_one: Callable[[str, bool, float], tuple],
+                 max_batch_size: int = 64, max_wait: float = 0.002):
+        self.score_batch = score_batch
+        self.score_one = score_one
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending: List[Tuple[str, bool, float, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches = 0
+        self.messages = 0
+        self.largest_batch = 0
+
+    async def submit(self, text: str, explain: bool = True, threshold: Optional[float] = None) -> tuple:
+        """
+        Queue one message and wait for its (prediction, probability, explanations, top_terms).
+
+        Callers with different thresholds (tenants) share a batch; each gets
+        the decision for its own threshold.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, explain, threshold, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        self.batches += 1
+        self.messages += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        asyncio.get_running_loop().create_task(self._score(batch))
+
+    async def _score(self, batch: List[Tuple[str, bool, float, asyncio.Future]]):
+        texts = [text for text, _, _, _ in batch]
+        explain_flags = [explain for _, explain, _, _ in batch]
+        thresholds = [threshold for _, _, threshold, _ in batch]
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(None, self._score_texts, texts, explain_flags, thresholds)
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, _, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _score_texts(self, texts: List[str], explain_flags: List[bool], thresholds: List[float]) -> list:
+        """Score a batch; if the batch call fails, score one by one so errors stay per caller."""
+        try:
+            return self.score_batch(texts, explain_flags, thresholds)
+        except Exception:
+            results = []
+            for text, explain, threshold in zip(texts, explain_flags, thresholds):
+                try:
+                    results.append(self.score_one(text, explain, threshold))
+                except Exception as e:
+                    results.append(e)
+            return results
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "messages": self.messages,
+            "largest_batch": self.largest_batch,
+            "avg_batch_size": round(self.messages / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+coalescer = RequestCoalescer(
+    model.predict_batch,
+    model.predict,
+    max_batch_size=int(os.environ.get('COALESCE_MAX_BATCH', 64)),
+    max_wait=float(os.environ.get('COALESCE_WINDOW_MS', 2)) / 1000
+)
+health_providers['coalescer'] = coalescer.stats
+
+wsgi_app = WsgiToAsgi(flask_app)
+
+
+async def app(scope, receive, send):
+    """ASGI application: coalesced /detect-scam, everything else via Flask."""
+    if scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] == '/detect-scam':
+        await _serve_natively(detect_scam, '/detect-scam', scope, receive, send)
+    elif scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] == '/stream-detect' \
+            and model.model is not None:
+        await _serve_natively(stream_detect, '/stream-detect', scope, receive, send)
+    elif scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
+
+
+async def _serve_natively(handler, endpoint: str, scope, receive, send):
+    """
+    Run a native handler and record the same request metrics as the Flask
+    after_request hook, unless the handler delegated to Flask (which records them).
+    """
+    started = time.perf_counter()
+    status = []
+
+    async def send_and_note_status(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        await send(message)
+
+    delegated = await handler(scope, receive, send_and_note_status)
+    if status and not delegated:
+        REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - started)
+        REQUESTS.labels(endpoint, scope['method'], status[0]).inc()
+
+
+async def detect_scam(scope, receive, send) -> bool:
+    """
+    Coalesced POST /detect-scam with the same responses as the Flask handler.
+
+    Returns:
+        bool: whether the request was handed to Flask instead
+    """
+    body = await _read_body(receive)
+
+    # Let Flask produce its exact error responses for bodies it would reject
+    content_type = dict(scope['headers']).get(b'content-type', b'')
+    try:
+        if not content_type.split(b';')[0].strip().lower().endswith(b'json'):
+            raise ValueError("not a JSON request")
+        start = time.perf_counter()
+        data = json.loads(body) if body else None
+        _PARSE_TIMER.observe(time.perf_counter() - start)
+    except ValueError:
+        await wsgi_app(scope, _replay(body), send)
+        return True
+
+    try:
+        message, error = validate_detect_request(data)
+        if error:
+            await _send_json(send, error[0], error[1])
+            return False
+
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        args = {name: values[-1] for name, values in query.items()}
+        explain = explain_requested(data, args)
+        try:
+            threshold = request_threshold(data, args, _tenant_header(scope))
+        except ValueError as e:
+            await _send_json(send, {"error": str(e)}, 400)
+            return False
+        prediction, probability, explanations, top_terms = await coalescer.submit(message, explain, threshold)
+        start = time.perf_counter()
+        payload = _encode_json(detect_response(message, prediction, probability, explanations, top_terms,
+                                               threshold))
+        _SERIALIZE_TIMER.observe(time.perf_counter() - start)
+        await _send_payload(send, payload, 200)
+    except Exception as e:
+        await _send_json(send, {
+            "error": str(e),
+            "message": "An error occurred while processing the request"
+        }, 500)
+    return False
+
+
+async def stream_detect(scope, receive, send):
+    """
+    POST /stream-detect reading the body event by event.
+
+    Each body chunk is scored in a worker thread and its completed result
+    lines are sent before the next chunk is read, so memory stays bounded by
+    one micro-batch however long the stream is.
+    """
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    try:
+        scorer = stream_scorer({name: values[-1] for name, values in query.items()}, model,
+                               _tenant_header(scope))
+    except ValueError as e:
+        await _send_json(send, {"error": str(e)}, 400)
+        return
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'application/x-ndjson'),
+            (b'access-control-allow-origin', b'*'),
+        ],
+    })
+    loop = asyncio.get_running_loop()
+    while True:
+        event = await receive()
+        if event['type'] == 'http.disconnect':
+            return
+        output = await loop.run_in_executor(None, scorer.feed, event.get('body', b''))
+        if output:
+            await send({'type': 'http.response.body', 'body': output, 'more_body': True})
+        if not event.get('more_body', False):
+            break
+    output = await loop.run_in_executor(None, scorer.finish)
+    await send({'type': 'http.response.body', 'body': output})
+
+
+async def lifespan(receive, send):
+    while True:
+        event = await receive()
+        if event['type'] == 'lifespan.startup':
+            # Startup runs on the server's main thread, where signal handlers can be installed
+            start_model_reloading(float(os.environ.get('MODEL_WATCH_INTERVAL', 0)))
+            start_online_learning(float(os.environ.get('ONLINE_LEARNING_INTERVAL', 0)))
+            await send({'type': 'lifespan.startup.complete'})
+        elif event['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        event = await receive()
+        chunks.append(event.get('body', b''))
+        if not event.get('more_body', False):
+            return b''.join(chunks)
+
+
+def _replay(body: bytes):
+    """Return a receive callable that hands an already-read body to another app."""
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        return {'type': 'http.disconnect'}
+
+    return receive
+
+
+def _tenant_header(scope) -> Optional[str]:
+    value = dict(scope['headers']).get(b'x-tenant-id')
+    return value.decode('latin-1') if value is not None else None
+
+
+def _encode_json(body: dict) -> bytes:
+    return json.dumps(body, sort_keys=True).encode('utf-8')
+
+
+async def _send_json(send, body: dict, status: int):
+    await _send_payload(send, _encode_json(body), status)
+
+
+async def _send_payload(send, payload: bytes, status: int):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(payload)).encode()),
+            (b'access-control-allow-origin', b'*'),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': payload})
@@ -0,0 +1,320 @@
+"""
+Benchmark suite for the detection hot path.
+
+Generates a corpus with dataset/generate_dataset.py and measures throughput
+(ops/sec), latency percentiles and peak RSS for:
+
+    clean_text, clean_text_obfuscated, normalize_unicode, extract_features, predict,
+    predict_no_explain, generate_explanations, calibrate, detect_scam (POST /detect-scam),
+    batch_detect (POST /batch-detect)
+
+clean_text_obfuscated runs clean_text on the corpus with homoglyphs,
+zero-width characters and leetspeak mixed in, to measure the slow path of the
+Unicode normalization that plain ASCII messages skip. calibrate maps one raw
+probability through the model's calibrator (an identity Platt mapping when the
+model has none), the per-message cost calibration adds to predict.
+
+The endpoints are called in process through the Flask test client, so the
+numbers include request parsing and JSON serialization but no network.
+
+Usage:
+    python benchmark.py --size 2000 --output bench.json
+    python benchmark.py --baseline bench.json      # exits 1 on a regression
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from calibration import Calibrator
+from model_utils import ScamDetectionModel
+from text_preprocessor import TextPreprocessor, normalize_unicode
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dataset')
+
+CASES = ('clean_text', 'clean_text_obfuscated', 'normalize_unicode', 'extract_features', 'predict',
+         'predict_no_explain', 'generate_explanations', 'calibrate', 'detect_scam', 'batch_detect')
+
+# Substitutions for obfuscate: Cyrillic lookalikes and leetspeak digits
+_HOMOGLYPHS = {'a': '\u0430', 'c': '\u0441', 'e': '\u0435', 'i': '\u0456', 'o': '\u043e', 'p': '\u0440'}
+_LEET = {'a': '4', 'e': '3', 'i': '1', 'o': '0', 's': '5'}
+
+
+def generate_corpus(size: int, seed: int = 42) -> List[Tuple[str, int]]:
+    """Build a shuffled, half-scam corpus of (message, label) with the dataset generator."""
+    sys.path.insert(0, os.path.abspath(DATASET_DIR))
+    try:
+        from generate_dataset import generate_ham_messages, generate_scam_messages
+    finally:
+        sys.path.pop(0)
+
+    # The generator draws from the global random module
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        corpus = [(message, 1) for message in generate_scam_messages(size // 2)]
+        corpus += [(message, 0) for message in generate_ham_messages(size - size // 2)]
+        random.shuffle(corpus)
+    finally:
+        random.setstate(state)
+    return corpus
+
+
+def obfuscate(message: str, rng: random.Random) -> str:
+    """Disguise a message the way spam filters are evaded: lookalike letters, zero-width spaces, leetspeak."""
+    chars = []
+    for char in message:
+        roll = rng.random()
+        if char in _HOMOGLYPHS and roll < 0.15:
+            chars.append(_HOMOGLYPHS[char])
+        elif char in _LEET and roll < 0.2:
+            chars.append(_LEET[char])
+        elif char.isalpha() and roll < 0.23:
+            chars.append(char + '\u200b')
+        else:
+            chars.append(char)
+    return ''.join(chars)
+
+
+def train_benchmark_model(corpus: List[Tuple[str, int]], directory: str,
+                          cache_size: int = 0) -> ScamDetectionModel:
+    """Train a throwaway model on the corpus inside directory and load it."""
+    import pandas as pd
+    from train_model import train_model
+
+    data_path = os.path.join(directory, 'corpus.csv')
+    pd.DataFrame(corpus, columns=['message', 'label']).to_csv(data_path, index=False)
+
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        train_model(data_path)
+    finally:
+        os.chdir(cwd)
+
+    return ScamDetectionModel(
+        model_path=os.path.join(directory, 'model', 'scam_model.pkl'),
+        vectorizer_path=os.path.join(directory, 'model', 'tfidf_vectorizer.pkl'),
+        artifact_dir=os.path.join(directory, 'model', 'artifact'),
+        cache_size=cache_size,
+        calibration_path=os.path.join(directory, 'model', 'calibration.json')
+    )
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(operation: Callable[[int], object], iterations: int, warmup: int) -> dict:
+    """
+    Call operation(i) for i in range(iterations) and time every call.
+
+    Returns:
+        dict: ops_per_sec, mean/p50/p95/p99 latency in microseconds, peak_rss_mb
+    """
+    for i in range(warmup):
+        operation(i)
+
+    latencies = np.empty(iterations, dtype=np.int64)
+    clock = time.perf_counter_ns
+    started = clock()
+    for i in range(iterations):
+        start = clock()
+        operation(i)
+        latencies[i] = clock() - start
+    elapsed = (clock() - started) / 1e9
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) / 1000
+    return {
+        "iterations": iterations,
+        "ops_per_sec": round(iterations / elapsed, 2),
+        "mean_us": round(float(latencies.mean()) / 1000, 2),
+        "p50_us": round(float(p50), 2),
+        "p95_us": round(float(p95), 2),
+        "p99_us": round(float(p99), 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def build_cases(model: ScamDetectionModel, corpus: List[Tuple[str, int]],
+                batch_size: int) -> Dict[str, Callable[[int], object]]:
+    """Return one operation per benchmark case, each taking an iteration index."""
+    import app as app_module
+
+    # Route the API through the model under test
+    app_module.model = model
+    app_module.predictor = model
+    client = app_module.app.test_client()
+
+    messages = [message for message, _ in corpus]
+    cleaned = list(TextPreprocessor.clean_many(messages))
+    rng = random.Random(0)
+    obfuscated = [obfuscate(message, rng) for message in messages]
+    # Explanations depend only on which side of the threshold the probability falls
+    probabilities = [0.9 if label else 0.1 for _, label in corpus]
+    calibrator = model.calibrator or Calibrator('platt', {"a": 1.0, "b": 0.0})
+    raw_probabilities = [rng.random() for _ in range(len(messages))]
+    batches = [messages[start:start + batch_size] for start in range(0, len(messages), batch_size)]
+    n = len(messages)
+
+    def detect_scam(i):
+        response = client.post('/detect-scam', json={"message": messages[i % n]})
+        if response.status_code != 200:
+            raise RuntimeError(f"/detect-scam returned {response.status_code}: {response.get_data(as_text=True)}")
+
+    def batch_detect(i):
+        response = client.post('/batch-detect', json={"messages": batches[i % len(batches)]})
+        if response.status_code != 200:
+            raise RuntimeError(f"/batch-detect returned {response.status_code}: {response.get_data(as_text=True)}")
+
+    return {
+        'clean_text': lambda i: TextPreprocessor.clean_text(messages[i % n]),
+        'clean_text_obfuscated': lambda i: TextPreprocessor.clean_text(obfuscated[i % n]),
+        'normalize_unicode': lambda i: normalize_unicode(messages[i % n]),
+        'extract_features': lambda i: TextPreprocessor.extract_features(cleaned[i % n]),
+        'predict': lambda i: model.predict(messages[i % n]),
+        'predict_no_explain': lambda i: model.predict(messages[i % n], explain=False),
+        'generate_explanations': lambda i: model._generate_explanations(
+            messages[i % n], cleaned[i % n], probabilities[i % n]),
+        'calibrate': lambda i: calibrator.calibrate_one(raw_probabilities[i % n]),
+        'detect_scam': detect_scam,
+        'batch_detect': batch_detect,
+    }
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Compare results with a saved run.
+
+    A case regresses when its ops/sec drops, or its p50 latency rises, by more
+    than tolerance (a fraction, e.g. 0.2).
+
+    Returns:
+        list: one message per regression (empty when there are none)
+    """
+    regressions = []
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        if current["ops_per_sec"] < previous["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: {current['ops_per_sec']:.0f} ops/sec, "
+                               f"baseline {previous['ops_per_sec']:.0f}")
+        if current["p50_us"] > previous["p50_us"] * (1 + tolerance):
+            regressions.append(f"{name}: p50 {current['p50_us']:.1f} us, "
+                               f"baseline {previous['p50_us']:.1f} us")
+    return regressions
+
+
+def run_benchmarks(size: int = 2000, iterations: int = 2000, warmup: int = 200,
+                   batch_size: int = 100, seed: int = 42, cases: Optional[List[str]] = None,
+                   train: bool = False, cache: bool = False) -> dict:
+    """
+    Run the benchmark cases and return the machine-readable results.
+
+    By default the model in model/ is benchmarked with its prediction cache
+    disabled, so repeated corpus messages are really scored. With train=True a
+    throwaway model is trained on the generated corpus first.
+
+    Returns:
+        dict: {"meta": {...}, "results": {case: measurements}}
+    """
+    corpus = generate_corpus(size, seed)
+
+    cache_size = 10000 if cache else 0
+    with tempfile.TemporaryDirectory() as directory:
+        if train:
+            model = train_benchmark_model(corpus, directory, cache_size)
+        else:
+            model = ScamDetectionModel(cache_size=cache_size)
+        if model.model is None:
+            raise RuntimeError("No trained model found. Run train_model.py first or pass --train.")
+
+        operations = build_cases(model, corpus, batch_size)
+        results = {}
+        for name in cases or CASES:
+            # A batch is batch_size messages of work; keep the run time comparable
+            count = max(1, iterations // batch_size) if name == 'batch_detect' else iterations
+            results[name] = measure(operations[name], count, min(warmup, count))
+            if name == 'batch_detect':
+                results[name]["messages_per_sec"] = round(results[name]["ops_per_sec"] * batch_size, 2)
+
+        return {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "corpus_size": size,
+                "seed": seed,
+                "batch_size": batch_size,
+                "model_version": model.model_version,
+                "model_format": model.model_format,
+                "fast_scorer": model.scorer is not None,
+                "calibration": model.calibrator.method if model.calibrator else None,
+                "cache": cache,
+            },
+            "results": results,
+        }
+
+
+def print_results(results: dict):
+    print(f"\n{'case':<24}{'ops/sec':>12}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}{'RSS MB':>9}")
+    print("-" * 75)
+    for name, row in results["results"].items():
+        print(f"{name:<24}{row['ops_per_sec']:>12.1f}{row['p50_us']:>10.1f}"
+              f"{row['p95_us']:>10.1f}{row['p99_us']:>10.1f}{row['peak_rss_mb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scam detection hot path")
+    parser.add_argument("--size", type=int, default=2000, help="generated corpus size")
+    parser.add_argument("--iterations", type=int, default=2000, help="timed calls per case")
+    parser.add_argument("--warmup", type=int, default=200, help="untimed calls per case")
+    parser.add_argument("--batch-size", type=int, default=100, help="messages per /batch-detect call")
+    parser.add_argument("--seed", type=int, default=42, help="corpus seed")
+    parser.add_argument("--cases", nargs="+", choices=CASES, help="cases to run (default: all)")
+    parser.add_argument("--train", action="store_true",
+                        help="train a throwaway model on the corpus instead of using model/")
+    parser.add_argument("--cache", action="store_true", help="keep the prediction cache enabled")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare with a saved results file; exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="allowed slowdown before a case counts as a regression (fraction)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Scam Detection Benchmark")
+    print("=" * 60)
+
+    results = run_benchmarks(args.size, args.iterations, args.warmup, args.batch_size,
+                             args.seed, args.cases, args.train, args.cache)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against {args.baseline} "
+                  f"(tolerance {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print(f"\n✅ No regressions against {args.baseline}")
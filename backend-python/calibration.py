@@ -0,0 +1,253 @@
+"""
+Probability calibration and per-tenant decision thresholds.
+
+Logistic regression scores rank messages well, but a raw 0.8 does not mean
+that 80% of such messages are scams. A Calibrator maps the model's raw
+probability to a calibrated one. It is fitted in train_model.py on
+predictions the model made for rows it was not trained on, and saved under
+"calibration" in the model artifact's meta.json, so it is swapped in together
+with the weights it was fitted on:
+
+    {"method": "platt", "a": 1.93, "b": -0.41, ...}         sigmoid(a * logit(p) + b)
+    {"method": "isotonic", "x": [...], "y": [...], ...}     piecewise-linear np.interp
+
+The same object is also written to model/calibration.json, which is only
+read when the model is served from the joblib files (no artifact).
+
+Both are a handful of arithmetic operations per message (one np.interp call
+per batch), applied right after predict_proba.
+
+Decisions compare the calibrated probability (0-100) with a threshold. The
+threshold comes from the request, from the caller's tenant profile, or from
+the default profile (ThresholdProfiles), so one scoring pass serves every
+tenant's cut-off.
+"""
+
+import bisect
+import json
+import math
+import os
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+CALIBRATION_METHODS = ('platt', 'isotonic', 'none')
+
+DEFAULT_THRESHOLD = 50.0
+
+# Raw probabilities are clipped this far from 0 and 1 before taking the logit
+_EPSILON = 1e-12
+
+
+class Calibrator:
+    """Maps raw model probabilities (0-1) to calibrated ones."""
+
+    def __init__(self, method: str, params: dict, meta: Optional[dict] = None):
+        if method not in ('platt', 'isotonic'):
+            raise ValueError(f"Unknown calibration method {method!r} (use platt or isotonic)")
+        self.method = method
+        self.meta = dict(meta or {})
+        if method == 'platt':
+            self.a = float(params["a"])
+            self.b = float(params["b"])
+        else:
+            self.x = np.asarray(params["x"], dtype=np.float64)
+            self.y = np.asarray(params["y"], dtype=np.float64)
+            if self.x.ndim != 1 or len(self.x) != len(self.y) or len(self.x) < 2 \
+                    or np.any(np.diff(self.x) < 0):
+                raise ValueError("Isotonic calibration needs matching, increasing x and y points")
+            # Python lists for the single-message path (bisect beats a numpy call on one float)
+            self._x_list = self.x.tolist()
+            self._y_list = self.y.tolist()
+
+    def calibrate(self, probabilities: np.ndarray) -> np.ndarray:
+        """Calibrate an array of raw probabilities."""
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        if self.method == 'platt':
+            clipped = np.clip(probabilities, _EPSILON, 1 - _EPSILON)
+            return 1.0 / (1.0 + np.exp(-(self.a * np.log(clipped / (1 - clipped)) + self.b)))
+        return np.interp(probabilities, self.x, self.y)
+
+    def calibrate_one(self, probability: float) -> float:
+        """Calibrate one raw probability; same result as calibrate() without numpy overhead."""
+        if self.method == 'platt':
+            clipped = min(max(probability, _EPSILON), 1 - _EPSILON)
+            z = self.a * math.log(clipped / (1 - clipped)) + self.b
+            # Split on the sign so exp never overflows
+            if z >= 0:
+                return 1.0 / (1.0 + math.exp(-z))
+            e = math.exp(z)
+            return e / (1.0 + e)
+        x, y = self._x_list, self._y_list
+        if probability <= x[0]:
+            return y[0]
+        if probability >= x[-1]:
+            return y[-1]
+        i = bisect.bisect_right(x, probability)
+        x0, x1, y0, y1 = x[i - 1], x[i], y[i - 1], y[i]
+        return y0 if x1 == x0 else y0 + (y1 - y0) * (probability - x0) / (x1 - x0)
+
+    def to_dict(self) -> dict:
+        params = {"a": self.a, "b": self.b} if self.method == 'platt' \
+            else {"x": self.x.tolist(), "y": self.y.tolist()}
+        return {"method": self.method, **params, **self.meta}
+
+    def stats(self) -> dict:
+        stats = {"method": self.method}
+        stats.update({key: self.meta[key] for key in ("fitted_on", "rows", "fitted_at") if key in self.meta})
+        return stats
+
+
+def fit_calibrator(probabilities: Sequence[float], labels: Sequence[int], method: str = 'platt',
+                   meta: Optional[dict] = None) -> Optional[Calibrator]:
+    """
+    Fit a calibrator on raw probabilities of rows the model was not trained on.
+
+    Returns:
+        Calibrator, or None for method "none"
+    """
+    if method == 'none':
+        return None
+    if method not in CALIBRATION_METHODS:
+        raise ValueError(f"Unknown calibration method {method!r}. Choose one of {CALIBRATION_METHODS}")
+
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.int64)
+    if len(np.unique(labels)) < 2:
+        raise ValueError("Calibration needs both scam and legit rows")
+    meta = {"rows": int(len(labels)), "fitted_at": time.time(), **(meta or {})}
+
+    if method == 'platt':
+        from sklearn.linear_model import LogisticRegression
+
+        clipped = np.clip(probabilities, _EPSILON, 1 - _EPSILON)
+        logits = np.log(clipped / (1 - clipped)).reshape(-1, 1)
+        # Weak regularization: two parameters fitted on thousands of rows
+        platt = LogisticRegression(C=1e4).fit(logits, labels)
+        return Calibrator('platt', {"a": float(platt.coef_[0, 0]), "b": float(platt.intercept_[0])}, meta)
+
+    from sklearn.isotonic import IsotonicRegression
+
+    isotonic = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip').fit(probabilities, labels)
+    return Calibrator('isotonic', {"x": isotonic.X_thresholds_, "y": isotonic.y_thresholds_}, meta)
+
+
+def calibration_report(probabilities: Sequence[float], labels: Sequence[int], bins: int = 10) -> dict:
+    """
+    How well probabilities match outcomes.
+
+    Returns:
+        dict: brier score, log_loss and expected calibration error (ece, over
+        equal-width bins)
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.float64)
+    clipped = np.clip(probabilities, 1e-15, 1 - 1e-15)
+    bin_ids = np.minimum((probabilities * bins).astype(np.int64), bins - 1)
+    ece = 0.0
+    for b in np.unique(bin_ids):
+        in_bin = bin_ids == b
+        ece += in_bin.mean() * abs(probabilities[in_bin].mean() - labels[in_bin].mean())
+    return {
+        "brier": float(np.mean((probabilities - labels) ** 2)),
+        "log_loss": float(-np.mean(labels * np.log(clipped) + (1 - labels) * np.log(1 - clipped))),
+        "ece": float(ece),
+    }
+
+
+def save_calibrator(calibrator: Optional[Calibrator], path: str):
+    """Write the calibrator atomically; None removes a stale one so it can't apply to a new model."""
+    if calibrator is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(calibrator.to_dict(), f, indent=2)
+    os.replace(temp_path, path)
+
+
+def load_calibrator(path: Optional[str]) -> Optional[Calibrator]:
+    """Load model/calibration.json; None when there is none (raw probabilities are served)."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return calibrator_from_dict(json.load(f))
+
+
+def calibrator_from_dict(data: dict) -> Calibrator:
+    """Rebuild a Calibrator from its to_dict() form."""
+    data = dict(data)
+    method = data.pop("method", None)
+    params = {key: data.pop(key) for key in ("a", "b", "x", "y") if key in data}
+    return Calibrator(method, params, meta=data)
+
+
+def validate_threshold(value, name: str = "threshold") -> float:
+    """A Scam threshold on the 0-100 probability scale."""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{name} must be a number between 0 and 100")
+    try:
+        threshold = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number between 0 and 100")
+    if not 0.0 < threshold <= 100.0:
+        raise ValueError(f"{name} must be greater than 0 and at most 100")
+    return threshold
+
+
+def per_text_thresholds(threshold, count: int) -> List[float]:
+    """One threshold per text from None (the default), a number, or a list with None for the default."""
+    if threshold is None:
+        return [DEFAULT_THRESHOLD] * count
+    if isinstance(threshold, (int, float)):
+        return [float(threshold)] * count
+    return [DEFAULT_THRESHOLD if limit is None else float(limit) for limit in threshold]
+
+
+class ThresholdProfiles:
+    """
+    Named Scam thresholds (0-100), one per tenant, plus a default.
+
+    Loaded from the JSON file in THRESHOLD_PROFILES:
+
+        {"default": 50, "tenants": {"acme-bank": 30, "chat-app": 85}}
+    """
+
+    def __init__(self, tenants: Optional[Dict[str, float]] = None, default: float = DEFAULT_THRESHOLD):
+        self.default = validate_threshold(default, "default threshold")
+        self.tenants = {str(name): validate_threshold(value, f"threshold of tenant {name!r}")
+                        for name, value in (tenants or {}).items()}
+
+    def resolve(self, tenant: Optional[str] = None, threshold=None) -> float:
+        """
+        The threshold for one request: an explicit threshold, else the
+        tenant's, else the default. Unknown tenants get the default.
+
+        Raises:
+            ValueError: the explicit threshold is not a number in (0, 100]
+        """
+        if threshold is not None:
+            return validate_threshold(threshold)
+        if tenant is not None:
+            return self.tenants.get(str(tenant), self.default)
+        return self.default
+
+    def stats(self) -> dict:
+        return {"default": self.default, "tenants": dict(self.tenants)}
+
+
+def load_threshold_profiles(path: Optional[str]) -> ThresholdProfiles:
+    """Read threshold profiles from a JSON file; no file means a single default of 50."""
+    if not path:
+        return ThresholdProfiles()
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get("tenants", {}), dict):
+        raise ValueError(f"Threshold profiles {path} must be an object with an optional 'tenants' object")
+    unknown = set(data) - {"default", "tenants"}
+    if unknown:
+        raise ValueError(f"Unknown keys in threshold profiles {path}: {sorted(unknown)}")
+    return ThresholdProfiles(data.get("tenants"), data.get("default", DEFAULT_THRESHOLD))
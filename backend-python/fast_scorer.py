@@ -0,0 +1,159 @@
+"""
+Pure-Python/NumPy scorer for single messages.
+
+For one message, TfidfVectorizer.transform + LogisticRegression.predict_proba
+spend most of their time in input validation and scipy sparse construction.
+FastLinearScorer does the same arithmetic directly: tokenize, look up feature
+ids, weight by tf-idf, L2-normalize and take the sigmoid of the sparse dot
+product with the coefficients.
+
+float32 and int8-quantized (BlockQuantizedArray) idf and coefficient arrays
+from an artifact are read as they are, without a float64 copy per process.
+"""
+
+import math
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from model_artifact import ArtifactClassifier, ArtifactVectorizer, BlockQuantizedArray, HashingIndex
+
+
+class FastLinearScorer:
+    """Scores cleaned text with a binary linear model over TF-IDF features."""
+
+    def __init__(self, analyzer: Callable[[str], List[str]], vocabulary, idf: np.ndarray,
+                 coef: np.ndarray, intercept: float, norm: Optional[str] = "l2",
+                 sublinear_tf: bool = False, binary: bool = False):
+        if norm not in ("l2", None):
+            raise ValueError(f"Unsupported norm for fast scoring: {norm}")
+
+        self.analyzer = analyzer
+        self.vocabulary = vocabulary
+        self.idf_array = _weight_array(idf)
+        self.coef_array = _weight_array(coef)
+        # memoryviews index to plain Python floats, much faster than ndarrays
+        # (a BlockQuantizedArray does the same for its codes and scales)
+        self._idf = _element_view(self.idf_array)
+        self._coef = _element_view(self.coef_array)
+        self.intercept = float(intercept)
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self.binary = binary
+
+    @classmethod
+    def from_model(cls, model, vectorizer) -> Optional["FastLinearScorer"]:
+        """
+        Build a scorer from a loaded model and vectorizer.
+
+        Supports memory-mapped artifacts, a TfidfVectorizer and the hashing
+        pipeline from train_model.build_vectorizer, each paired with a binary
+        linear model whose predict_proba is the sigmoid of its decision
+        function. Returns None for anything else, so callers fall back to
+        the sklearn path.
+        """
+        if isinstance(model, ArtifactClassifier) and isinstance(vectorizer, ArtifactVectorizer):
+            return cls(vectorizer.analyzer, vectorizer.vocabulary_, vectorizer.idf_,
+                       model.coef, model.intercept, norm=vectorizer.norm,
+                       sublinear_tf=vectorizer.sublinear_tf, binary=vectorizer.binary)
+
+        coef = getattr(model, "coef_", None)
+        classes = getattr(model, "classes_", None)
+        if coef is None or classes is None or len(classes) != 2 or coef.shape[0] != 1:
+            return None
+        if type(model).__name__ != "LogisticRegression" and \
+                getattr(model, "loss", None) != "log_loss":
+            return None
+
+        steps = getattr(vectorizer, "steps", None)
+        if steps:
+            analyzer, transformer = steps[0][1], steps[-1][1]
+            if len(steps) != 2 or not hasattr(analyzer, "n_features") \
+                    or analyzer.alternate_sign or analyzer.norm is not None:
+                return None
+            vocabulary = HashingIndex(analyzer.n_features)
+        else:
+            analyzer = transformer = vectorizer
+            vocabulary = getattr(vectorizer, "vocabulary_", None)
+            if vocabulary is None:
+                return None
+
+        idf = getattr(transformer, "idf_", None)
+        if idf is None or not getattr(transformer, "use_idf", True) \
+                or transformer.norm not in ("l2", None):
+            return None
+
+        return cls(analyzer.build_analyzer(), vocabulary, idf, coef[0],
+                   model.intercept_[0], norm=transformer.norm,
+                   sublinear_tf=transformer.sublinear_tf, binary=analyzer.binary)
+
+    @property
+    def coef(self):
+        """Coefficients that index to plain Python floats, for per-term lookups."""
+        return self._coef
+
+    def term_weights(self, cleaned_text: str) -> Dict[int, float]:
+        """Return the normalized tf-idf weight of every known feature in the text."""
+        return self.weights_from_tokens(self.analyzer(cleaned_text))
+
+    def weights_from_tokens(self, tokens: List[str]) -> Dict[int, float]:
+        """term_weights for text already run through the analyzer."""
+        lookup = self.vocabulary.get
+        counts: Dict[int, int] = {}
+        for term in tokens:
+            feature_id = lookup(term)
+            if feature_id is not None:
+                counts[feature_id] = counts.get(feature_id, 0) + 1
+
+        idf = self._idf
+        if self.binary:
+            weights = {feature_id: idf[feature_id] for feature_id in counts}
+        elif self.sublinear_tf:
+            weights = {feature_id: (1.0 + math.log(count)) * idf[feature_id]
+                       for feature_id, count in counts.items()}
+        else:
+            weights = {feature_id: count * idf[feature_id] for feature_id, count in counts.items()}
+
+        if self.norm == "l2" and weights:
+            norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+            if norm > 0:
+                weights = {feature_id: weight / norm for feature_id, weight in weights.items()}
+        return weights
+
+    def decision_function(self, cleaned_text: str) -> float:
+        return self.decision_from_weights(self.term_weights(cleaned_text))
+
+    def decision_from_weights(self, weights: Dict[int, float]) -> float:
+        """Decision function for weights already computed by term_weights."""
+        coef = self._coef
+        return sum(weight * coef[feature_id] for feature_id, weight in weights.items()) + self.intercept
+
+    def predict_proba(self, cleaned_text: str) -> float:
+        """Return the probability of the positive (scam) class."""
+        return _sigmoid(self.decision_function(cleaned_text))
+
+    def predict_proba_from_weights(self, weights: Dict[int, float]) -> float:
+        """Probability of the scam class for weights already computed by term_weights."""
+        return _sigmoid(self.decision_from_weights(weights))
+
+
+def _weight_array(values):
+    """float32/float64 arrays and BlockQuantizedArrays as they are, anything else as float64."""
+    if isinstance(values, BlockQuantizedArray):
+        return values
+    values = np.asarray(values)
+    if values.dtype not in (np.float32, np.float64):
+        values = values.astype(np.float64)
+    return np.ascontiguousarray(values)
+
+
+def _element_view(values):
+    return values if isinstance(values, BlockQuantizedArray) else memoryview(values)
+
+
+def _sigmoid(z: float) -> float:
+    """Numerically stable logistic function (same values as scipy.special.expit)."""
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    exp_z = math.exp(z)
+    return exp_z / (1.0 + exp_z)
@@ -0,0 +1,121 @@
+"""
+Multi-pattern keyword matcher (Aho-Corasick) used for feature extraction.
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over named groups of keywords.
+
+    The automaton is built once; scan() then finds every keyword of every
+    group in a single pass over the text, so the cost of a scan grows with the
+    length of the text and not with the number of keywords.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self.groups = {name: sorted(set(keywords)) for name, keywords in groups.items()}
+
+        # Unique keywords and the groups each one belongs to
+        keyword_groups: Dict[str, List[str]] = {}
+        for name, keywords in self.groups.items():
+            for keyword in keywords:
+                if not keyword:
+                    raise ValueError(f"Empty keyword in group '{name}'")
+                keyword_groups.setdefault(keyword, []).append(name)
+
+        self.keywords: List[str] = list(keyword_groups)
+        self._keyword_groups: List[Tuple[str, ...]] = [
+            tuple(keyword_groups[keyword]) for keyword in self.keywords
+        ]
+        self._lengths: List[int] = [len(keyword) for keyword in self.keywords]
+        self._build()
+
+    def _build(self):
+        """Build the goto, failure and output tables."""
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+
+        # Trie of all keywords
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(index)
+
+        # Failure links in breadth-first order, merging the outputs of each
+        # state's failure target so a scan never has to follow output links
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(ch, 0)
+                fail[next_state] = target if target != next_state else 0
+                outputs[next_state].extend(outputs[fail[next_state]])
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [tuple(output) for output in outputs]
+
+    def scan(self, text: str) -> Dict[int, int]:
+        """
+        Scan text once and count keyword matches.
+
+        Matches of the same keyword are counted without overlap, scanning left
+        to right, which is what re.findall would count for that keyword.
+
+        Returns:
+            dict: keyword index -> number of non-overlapping matches
+        """
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        lengths = self._lengths
+        counts: Dict[int, int] = {}
+        last_end: Dict[int, int] = {}
+        state = 0
+
+        for position, ch in enumerate(text):
+            next_state = goto[state].get(ch)
+            while next_state is None and state:
+                state = fail[state]
+                next_state = goto[state].get(ch)
+            if next_state is None:
+                state = 0
+                continue
+            state = next_state
+
+            output = outputs[state]
+            if output:
+                end = position + 1
+                for index in output:
+                    if end - lengths[index] >= last_end.get(index, 0):
+                        counts[index] = counts.get(index, 0) + 1
+                        last_end[index] = end
+
+        return counts
+
+    def count_groups(self, text: str) -> Dict[str, Tuple[int, int]]:
+        """
+        Count each group's matches in one scan.
+
+        Returns:
+            dict: group name -> (distinct keywords found, total matches)
+        """
+        result = {name: (0, 0) for name in self.groups}
+        for index, count in self.scan(text).items():
+            for name in self._keyword_groups[index]:
+                distinct, total = result[name]
+                result[name] = (distinct + 1, total + count)
+        return result
@@ -0,0 +1,342 @@
+"""
+Lightweight in-process metrics in the Prometheus text exposition format.
+
+Counters and fixed-bucket histograms are plain Python lists behind a lock, so
+recording a value costs well under a microsecond and can stay on in
+production. Values that already live elsewhere (cache counters, model
+version) are read through callbacks when /metrics is scraped.
+
+Set METRICS_ENABLED=0 to turn recording off.
+"""
+
+import bisect
+import math
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Seconds, from 10 microseconds (a cache hit) to a few seconds (a large batch)
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+                   0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _HistogramChild:
+    """Bucket counts, sum and count for one label combination."""
+
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...], lock: threading.Lock):
+        self._bounds = bounds
+        # One slot per bucket plus the +Inf overflow
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0.0
+        # Shared by all children of a histogram, see Histogram.observe_many
+        self._lock = lock
+
+    def observe(self, value: float):
+        if not ENABLED:
+            return
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Return the child for these label values; bind it once and reuse it on hot paths."""
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].inc(amount)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for values, child in sorted(self._children.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._values_lock = threading.Lock()
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets, self._values_lock)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def observe_many(self, observations: Iterable[Tuple[_HistogramChild, float]]):
+        """
+        Record (child, value) pairs for children of this histogram under one lock.
+
+        The lock is the dominant cost of an observation, so a request records
+        all of its stages with one call.
+        """
+        if not ENABLED:
+            return
+        bisect_left = bisect.bisect_left
+        bounds = self.buckets
+        with self._values_lock:
+            for child, value in observations:
+                child._counts[bisect_left(bounds, value)] += 1
+                child._sum += value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        bounds = self.buckets + (math.inf,)
+        for values, child in sorted(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class GaugeCallback(_Metric):
+    """
+    Gauge (or counter) whose samples are computed at scrape time.
+
+    The callback returns a list of (label values, value) pairs.
+    """
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], List[Tuple[Sequence[str], float]]],
+                 labelnames: Sequence[str] = (), kind: str = "gauge"):
+        self.callback = callback
+        self.kind = kind
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self):
+        return None
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for values, value in self.callback():
+            if value is None:
+                continue
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together for /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric, or return the one already registered under its name."""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge_callback(self, name: str, help_text: str, callback, labelnames: Sequence[str] = (),
+                       kind: str = "gauge") -> GaugeCallback:
+        """Register (or replace) a callback-backed metric."""
+        metric = GaugeCallback(name, help_text, callback, labelnames, kind)
+        with self._lock:
+            self._metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Return every metric in the text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # One broken callback must not take the whole scrape down
+                lines.append(f"# {metric.name} unavailable: {_escape(e)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Time per stage of a prediction request; bind children with stage_timer() and
+# record a request's stages together with record_stages()
+STAGE_SECONDS = registry.histogram(
+    "scam_stage_duration_seconds",
+    "Time spent in each stage of scam detection",
+    labelnames=("stage",)
+)
+
+BATCH_SIZE = registry.histogram(
+    "scam_batch_size",
+    "Messages per batch prediction call",
+    buckets=BATCH_SIZE_BUCKETS
+)
+
+
+def stage_timer(stage: str) -> _HistogramChild:
+    """Return the histogram child for one stage, to observe durations in seconds."""
+    return STAGE_SECONDS.labels(stage)
+
+
+def record_stages(observations: Iterable[Tuple[_HistogramChild, float]]):
+    """Record the (stage timer, seconds) pairs of one request."""
+    STAGE_SECONDS.observe_many(observations)
+
+
+def _histograms() -> List[Histogram]:
+    with registry._lock:
+        return [metric for metric in registry._metrics.values() if isinstance(metric, Histogram)]
+
+
+def take_observations() -> List[Tuple[str, Tuple[str, ...], Dict[int, int], float]]:
+    """
+    Remove and return what the histograms recorded since the last call.
+
+    Forked inference workers send these back with each result (see
+    worker_pool), so the parent's /metrics includes the stages they ran.
+
+    Returns:
+        list: (metric name, label values, {bucket index: count}, sum) per
+        label combination with new observations
+    """
+    taken = []
+    for metric in _histograms():
+        with metric._values_lock:
+            for values, child in metric._children.items():
+                if not any(child._counts):
+                    continue
+                buckets = {index: count for index, count in enumerate(child._counts) if count}
+                taken.append((metric.name, values, buckets, child._sum))
+                child._counts = [0] * len(child._counts)
+                child._sum = 0.0
+    return taken
+
+
+def merge_observations(observations: Iterable[Tuple[str, Tuple[str, ...], Dict[int, int], float]]):
+    """Add observations taken in another process (see take_observations)."""
+    for name, values, buckets, total in observations:
+        metric = registry._metrics.get(name)
+        if not isinstance(metric, Histogram):
+            continue
+        child = metric.labels(*values)
+        with metric._values_lock:
+            for index, count in buckets.items():
+                child._counts[index] += count
+            child._sum += total
+
+
+def reset_after_fork():
+    """
+    In a forked child: give every metric fresh locks and empty histograms.
+
+    Another thread of the parent may have held a lock at fork time, and the
+    inherited counts already belong to the parent.
+    """
+    registry._lock = threading.Lock()
+    for metric in registry._metrics.values():
+        metric._lock = threading.Lock()
+        if isinstance(metric, Histogram):
+            metric._values_lock = threading.Lock()
+            for child in metric._children.values():
+                child._lock = metric._values_lock
+                child._counts = [0] * len(child._counts)
+                child._sum = 0.0
+        elif isinstance(metric, Counter):
+            for child in metric._children.values():
+                child._lock = threading.Lock()
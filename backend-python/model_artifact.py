@@ -0,0 +1,556 @@
+"""
+Pickle-free, memory-mapped model artifact format.
+
+An artifact is a directory holding plain NumPy arrays plus a small JSON
+metadata file:
+
+    meta.json          vectorizer settings, classes, intercept, sizes, weight type
+    idf.npy            float64 (or float32) idf weight per feature
+    coef.npy           float64 (or float32) coefficient per feature
+    vocab_terms.npy    uint8 UTF-8 bytes of every term, concatenated in feature order
+    vocab_offsets.npy  int64 start offset of each term in vocab_terms (plus end)
+    vocab_table.npy    int32 open-addressing hash table (feature id + 1, 0 = empty)
+
+Artifacts of hashing-mode models have no vocab_* files: terms are mapped to
+columns with the same murmurhash3 scheme as sklearn's HashingVectorizer.
+
+The artifact path is a symlink to a versioned directory next to it, replaced
+atomically on every export (see _write_artifact). Every array is opened with
+np.load(mmap_mode='r'), so all worker processes on a box share one physical
+copy through the page cache, and loading is just a few mmap calls.
+
+The idf and coefficient arrays can be exported with smaller weights (meta.json
+"weights"): float32 halves them, and int8 stores each array as
+
+    <name>_codes.npy   int8 code per feature
+    <name>_scales.npy  float32 scale per block of block_size features
+
+with value = code * scale, the scale being the block's largest magnitude / 127.
+Quantized artifacts are format version 2, so older loaders reject them and
+fall back to the joblib files.
+"""
+
+import json
+import os
+import re
+import shutil
+import time
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+from scipy import sparse
+from scipy.special import expit
+from sklearn.preprocessing import normalize
+from sklearn.utils import murmurhash3_32
+
+FORMAT_VERSION = 2
+SUPPORTED_FORMAT_VERSIONS = (1, 2)
+META_FILE = "meta.json"
+
+WEIGHT_TYPES = ("float64", "float32", "int8")
+DEFAULT_BLOCK_SIZE = 256
+
+
+def quantize_blocks(values: np.ndarray, block_size: int = DEFAULT_BLOCK_SIZE):
+    """
+    Quantize a float vector to int8 codes with one float32 scale per block.
+
+    Returns:
+        tuple: (codes, scales); block i of codes times scales[i] approximates
+        the same block of values to within half a scale step
+    """
+    if block_size < 1 or block_size & (block_size - 1):
+        raise ValueError(f"Block size must be a power of two, got {block_size}")
+    values = np.asarray(values, dtype=np.float64)
+    n_blocks = -(-len(values) // block_size)
+    padded = np.zeros(n_blocks * block_size)
+    padded[:len(values)] = values
+    peaks = np.abs(padded.reshape(n_blocks, block_size)).max(axis=1)
+    scales = (peaks / 127.0).astype(np.float32)
+    # All-zero blocks keep a scale of 0 and codes of 0
+    divisors = np.where(scales > 0, scales, 1.0).astype(np.float64)
+    codes = np.rint(padded.reshape(n_blocks, block_size) / divisors[:, None])
+    codes = np.clip(codes, -127, 127).astype(np.int8).ravel()[:len(values)]
+    return codes, scales
+
+
+class BlockQuantizedArray:
+    """
+    Read-only float vector stored as int8 codes with per-block float32 scales.
+
+    Indexing with an int returns a Python float, with an array or slice a
+    float32 array, so it can stand in for the idf and coefficient arrays;
+    np.asarray() dequantizes the whole vector.
+    """
+
+    def __init__(self, codes: np.ndarray, scales: np.ndarray, block_size: int):
+        if block_size < 1 or block_size & (block_size - 1):
+            raise ValueError(f"Block size must be a power of two, got {block_size}")
+        if len(scales) != -(-len(codes) // block_size):
+            raise ValueError("Quantized weights need one scale per block")
+        self.codes = codes
+        self.scales = scales
+        self.block_size = block_size
+        self._shift = block_size.bit_length() - 1
+        # memoryviews index to plain Python numbers much faster than ndarrays
+        self._codes = memoryview(codes)
+        self._scales = memoryview(scales)
+
+    def __getitem__(self, index):
+        try:
+            return self._codes[index] * self._scales[index >> self._shift]
+        except TypeError:
+            # Arrays and slices of feature ids
+            ids = np.arange(len(self.codes))[index] if isinstance(index, slice) else np.asarray(index)
+            return self.codes[ids] * self.scales[ids >> self._shift]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def shape(self):
+        return (len(self.codes),)
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes
+
+    def __array__(self, dtype=None, copy=None):
+        values = np.repeat(self.scales, self.block_size)[:len(self.codes)] * self.codes
+        return values if dtype is None else values.astype(dtype)
+
+
+def quantize_weights(arrays: Dict[str, np.ndarray], weights: str = "float64",
+                     block_size: int = DEFAULT_BLOCK_SIZE) -> Dict[str, np.ndarray]:
+    """Convert the idf and coef entries of artifact arrays to the given weight type."""
+    if weights not in WEIGHT_TYPES:
+        raise ValueError(f"Unknown weight type {weights!r}. Choose one of {WEIGHT_TYPES}")
+    converted = dict(arrays)
+    for name in ("idf", "coef"):
+        if weights == "int8":
+            values = converted.pop(name)
+            converted[f"{name}_codes"], converted[f"{name}_scales"] = quantize_blocks(values, block_size)
+        else:
+            converted[name] = np.asarray(converted[name], dtype=weights)
+    return converted
+
+
+def weight_files(meta: dict) -> List[str]:
+    """File names of an artifact's idf and coefficient arrays."""
+    if meta.get("weights", {}).get("dtype") == "int8":
+        return [f"{name}_{part}.npy" for name in ("idf", "coef") for part in ("codes", "scales")]
+    return ["idf.npy", "coef.npy"]
+
+
+def build_word_analyzer(config: dict) -> Callable[[str], List[str]]:
+    """
+    Build a text -> terms function equivalent to TfidfVectorizer's word analyzer.
+
+    Args:
+        config: the "vectorizer" section of an artifact's meta.json
+    """
+    lowercase = config.get("lowercase", True)
+    tokenize = re.compile(config["token_pattern"]).findall
+    stop_words = frozenset(config.get("stop_words") or ())
+    min_n, max_n = config.get("ngram_range", (1, 1))
+
+    def analyze(doc: str) -> List[str]:
+        if lowercase:
+            doc = doc.lower()
+        tokens = tokenize(doc)
+        if stop_words:
+            tokens = [token for token in tokens if token not in stop_words]
+        if max_n == 1:
+            return tokens
+
+        # Same n-gram construction as sklearn's _VectorizerMixin._word_ngrams
+        terms = list(tokens) if min_n == 1 else []
+        n_tokens = len(tokens)
+        for n in range(max(min_n, 2), min(max_n + 1, n_tokens + 1)):
+            for i in range(n_tokens - n + 1):
+                terms.append(" ".join(tokens[i:i + n]))
+        return terms
+
+    return analyze
+
+
+class VocabularyIndex:
+    """
+    Read-only term -> feature id lookup over memory-mapped arrays.
+
+    Behaves like the vocabulary_ dict for lookups (get, in, len), but holds no
+    per-process Python objects for the terms.
+    """
+
+    def __init__(self, terms: np.ndarray, offsets: np.ndarray, table: np.ndarray):
+        self._terms_array = terms
+        self._offsets_array = offsets
+        self._table_array = table
+        # memoryviews index to plain Python ints/bytes much faster than ndarrays
+        self._terms = memoryview(terms)
+        self._offsets = memoryview(offsets)
+        self._table = memoryview(table)
+        self._mask = len(table) - 1
+
+    @staticmethod
+    def build(terms: List[str]) -> Dict[str, np.ndarray]:
+        """Build the vocabulary arrays for terms listed in feature id order."""
+        encoded = [term.encode("utf-8") for term in terms]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(term) for term in encoded], out=offsets[1:])
+
+        table_size = 8
+        while table_size < 2 * len(encoded):
+            table_size *= 2
+        mask = table_size - 1
+        table = np.zeros(table_size, dtype=np.int32)
+        for feature_id, term in enumerate(encoded):
+            slot = zlib.crc32(term) & mask
+            while table[slot]:
+                slot = (slot + 1) & mask
+            table[slot] = feature_id + 1
+
+        return {
+            "vocab_terms": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "vocab_offsets": offsets,
+            "vocab_table": table,
+        }
+
+    def get(self, term: str, default: Optional[int] = None) -> Optional[int]:
+        """Return the feature id of term, or default if it is not in the vocabulary."""
+        encoded = term.encode("utf-8")
+        table = self._table
+        offsets = self._offsets
+        terms = self._terms
+        mask = self._mask
+        slot = zlib.crc32(encoded) & mask
+        while True:
+            entry = table[slot]
+            if not entry:
+                return default
+            feature_id = entry - 1
+            if terms[offsets[feature_id]:offsets[feature_id + 1]] == encoded:
+                return feature_id
+            slot = (slot + 1) & mask
+
+    def term(self, feature_id: int) -> str:
+        """Return the term for a feature id."""
+        offsets = self._offsets
+        return bytes(self._terms[offsets[feature_id]:offsets[feature_id + 1]]).decode("utf-8")
+
+    def __contains__(self, term: str) -> bool:
+        return self.get(term) is not None
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+
+class HashingIndex:
+    """
+    Term -> column lookup for hashing-mode models.
+
+    Maps terms exactly like HashingVectorizer(alternate_sign=False): the
+    signed murmurhash3 of the UTF-8 term, absolute value, modulo n_features.
+    Every term has a column, so there is nothing to store.
+    """
+
+    def __init__(self, n_features: int):
+        self.n_features = n_features
+
+    def get(self, term: str, default: Optional[int] = None) -> int:
+        h = murmurhash3_32(term, seed=0)
+        if h == -2147483648:
+            # Same special case as sklearn for abs(-2**31)
+            return (2147483647 - (self.n_features - 1)) % self.n_features
+        return abs(h) % self.n_features
+
+    def __contains__(self, term: str) -> bool:
+        return True
+
+    def __len__(self) -> int:
+        return self.n_features
+
+
+class ArtifactVectorizer:
+    """TF-IDF transform over an artifact's vocabulary (or hashing) index and idf array (or BlockQuantizedArray)."""
+
+    def __init__(self, config: dict, vocabulary, idf: np.ndarray):
+        self.config = config
+        self.vocabulary_ = vocabulary
+        self.idf_ = idf
+        self.norm = config.get("norm", "l2")
+        self.sublinear_tf = config.get("sublinear_tf", False)
+        self.binary = config.get("binary", False)
+        self.analyzer = build_word_analyzer(config)
+
+    def build_analyzer(self) -> Callable[[str], List[str]]:
+        return self.analyzer
+
+    def transform(self, raw_documents: Iterable[str]) -> sparse.csr_matrix:
+        """Transform documents to a TF-IDF matrix, like TfidfVectorizer.transform."""
+        analyze = self.analyzer
+        lookup = self.vocabulary_.get
+        indptr = [0]
+        indices: List[int] = []
+        values: List[float] = []
+
+        for doc in raw_documents:
+            counts: Dict[int, int] = {}
+            for term in analyze(doc):
+                feature_id = lookup(term)
+                if feature_id is not None:
+                    counts[feature_id] = counts.get(feature_id, 0) + 1
+            for feature_id in sorted(counts):
+                indices.append(feature_id)
+                values.append(counts[feature_id])
+            indptr.append(len(indices))
+
+        data = np.asarray(values, dtype=np.float64)
+        column_ids = np.asarray(indices, dtype=np.int32)
+        if self.binary:
+            data[:] = 1.0
+        elif self.sublinear_tf:
+            np.log(data, out=data)
+            data += 1.0
+        data *= self.idf_[column_ids]
+
+        matrix = sparse.csr_matrix(
+            (data, column_ids, np.asarray(indptr, dtype=np.int64)),
+            shape=(len(indptr) - 1, len(self.idf_)),
+        )
+        if self.norm:
+            matrix = normalize(matrix, norm=self.norm, copy=False)
+        return matrix
+
+
+class ArtifactClassifier:
+    """Binary linear classifier over memory-mapped (float or BlockQuantizedArray) coefficients."""
+
+    def __init__(self, coef: np.ndarray, intercept: float, classes: List[int], weights: str = "float64"):
+        self.coef = coef
+        self.intercept = intercept
+        self.classes_ = np.asarray(classes)
+        self.weights = weights
+
+    def decision_function(self, X) -> np.ndarray:
+        if isinstance(self.coef, BlockQuantizedArray):
+            # Dequantize only the coefficients of features present in X
+            X = sparse.csr_matrix(X)
+            rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+            contributions = X.data * self.coef[X.indices]
+            return np.bincount(rows, weights=contributions, minlength=X.shape[0]) + self.intercept
+        return np.asarray(X @ self.coef).ravel() + self.intercept
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Return [P(class 0), P(class 1)] per row, like LogisticRegression."""
+        probability = expit(self.decision_function(X))
+        return np.column_stack([1.0 - probability, probability])
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+
+def export_artifact(model, vectorizer, output_dir: str = "model/artifact", weights: str = "float64",
+                    block_size: int = DEFAULT_BLOCK_SIZE, calibrator=None) -> str:
+    """
+    Export a fitted vectorizer + binary linear model as an artifact.
+
+    The vectorizer is either a TfidfVectorizer or a HashingVectorizer ->
+    TfidfTransformer pipeline (see train_model.build_vectorizer). The directory
+    is written as a new versioned directory and the output_dir symlink is
+    atomically repointed at it, so readers never see a missing or
+    half-written artifact. weights is float64, float32 or int8 (with
+    one scale per block_size features) for the idf and coefficient arrays.
+    A calibrator fitted with the model is stored in meta.json under
+    "calibration", so it is swapped in with the weights.
+
+    Returns:
+        str: the artifact directory
+    """
+    meta, arrays = _artifact_contents(model, vectorizer, weights, block_size)
+    if calibrator is not None:
+        meta["calibration"] = calibrator.to_dict()
+    _write_artifact(output_dir, meta, arrays)
+    return output_dir
+
+
+def build_artifact(model, vectorizer, weights: str = "float64", block_size: int = DEFAULT_BLOCK_SIZE):
+    """
+    The (classifier, vectorizer) pair export_artifact + load_artifact would
+    give, built in memory (e.g. to measure the accuracy of quantized weights).
+    """
+    meta, arrays = _artifact_contents(model, vectorizer, weights, block_size)
+    return _open_artifact(meta, arrays.__getitem__)
+
+
+def _artifact_contents(model, vectorizer, weights: str, block_size: int):
+    """Return the meta.json contents and arrays of an artifact."""
+    coef = np.asarray(model.coef_, dtype=np.float64)
+    if coef.shape[0] != 1 or len(model.classes_) != 2:
+        raise ValueError("Only binary linear models can be exported")
+
+    config, arrays = _describe_vectorizer(vectorizer)
+    meta = {
+        "format_version": 1 if weights == "float64" else FORMAT_VERSION,
+        "model_type": type(model).__name__,
+        "classes": [int(c) for c in model.classes_],
+        "intercept": float(model.intercept_[0]),
+        "n_features": len(arrays["idf"]),
+        "vectorizer": config,
+    }
+    if weights != "float64":
+        meta["weights"] = {"dtype": weights}
+        if weights == "int8":
+            meta["weights"]["block_size"] = block_size
+    arrays["coef"] = coef[0]
+    return meta, quantize_weights(arrays, weights, block_size)
+
+
+def _describe_vectorizer(vectorizer):
+    """Return the meta.json config and arrays for a fitted vectorizer."""
+    steps = getattr(vectorizer, "steps", None)
+    if steps:
+        # HashingVectorizer -> TfidfTransformer pipeline
+        analyzer, transformer = steps[0][1], steps[-1][1]
+        kind = "hashing"
+        if len(steps) != 2 or not hasattr(analyzer, "n_features") or not hasattr(transformer, "idf_"):
+            raise ValueError("Only HashingVectorizer -> TfidfTransformer pipelines can be exported")
+        if analyzer.alternate_sign or analyzer.norm is not None:
+            raise ValueError("Hashing vectorizers must use alternate_sign=False and norm=None")
+    else:
+        analyzer = transformer = vectorizer
+        kind = "tfidf"
+        if not hasattr(vectorizer, "vocabulary_") or not hasattr(vectorizer, "idf_"):
+            raise ValueError("Only fitted TfidfVectorizers can be exported")
+
+    if analyzer.analyzer != "word" or analyzer.tokenizer is not None \
+            or analyzer.preprocessor is not None or analyzer.strip_accents is not None:
+        raise ValueError("Only vectorizers with the default word analyzer can be exported")
+
+    stop_words = analyzer.get_stop_words()
+    config = {
+        "kind": kind,
+        "lowercase": bool(analyzer.lowercase),
+        "token_pattern": analyzer.token_pattern,
+        "ngram_range": list(analyzer.ngram_range),
+        "stop_words": sorted(stop_words) if stop_words else None,
+        "norm": transformer.norm,
+        "sublinear_tf": bool(transformer.sublinear_tf),
+        "binary": bool(analyzer.binary),
+    }
+    arrays = {"idf": np.asarray(transformer.idf_, dtype=np.float64)}
+
+    if kind == "tfidf":
+        terms = [None] * len(vectorizer.vocabulary_)
+        for term, feature_id in vectorizer.vocabulary_.items():
+            terms[feature_id] = term
+        arrays.update(VocabularyIndex.build(terms))
+    return config, arrays
+
+
+def _write_artifact(output_dir: str, meta: dict, arrays: Dict[str, np.ndarray], keep_versions: int = 2):
+    """
+    Write meta.json and the arrays to a new versioned directory, then point
+    output_dir at it.
+
+    output_dir is a symlink to a sibling "<name>.v<timestamp>-<pid>" directory
+    and is replaced with one rename, so readers always find a complete
+    artifact. The newest keep_versions directories are kept (the previous one
+    may still be in the middle of being opened); older ones are removed.
+    """
+    output_dir = os.path.abspath(output_dir)
+    parent, name = os.path.split(output_dir)
+    os.makedirs(parent, exist_ok=True)
+    version_name = f"{name}.v{time.time_ns():020d}-{os.getpid()}"
+    version_dir = os.path.join(parent, version_name)
+    staging_dir = f"{version_dir}.tmp"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    for array_name, array in arrays.items():
+        np.save(os.path.join(staging_dir, f"{array_name}.npy"), np.ascontiguousarray(array))
+    with open(os.path.join(staging_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.rename(staging_dir, version_dir)
+
+    if os.path.isdir(output_dir) and not os.path.islink(output_dir):
+        # A plain directory from before versioned artifacts: move it aside
+        # once (a directory can't be atomically replaced by a symlink)
+        os.rename(output_dir, os.path.join(parent, f"{name}.v{0:020d}-{os.getpid()}"))
+
+    # A relative link, so the model directory can be moved or mounted elsewhere
+    link_path = os.path.join(parent, f".{name}.link-{os.getpid()}")
+    if os.path.lexists(link_path):
+        os.remove(link_path)
+    os.symlink(version_name, link_path)
+    os.replace(link_path, output_dir)
+
+    # Processes that already mapped the old files keep reading them until
+    # they reload; the files are only unlinked, not overwritten.
+    versions = sorted(entry for entry in os.listdir(parent)
+                      if entry.startswith(f"{name}.v") and not entry.endswith(".tmp"))
+    for entry in versions[:-keep_versions]:
+        shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+def resolve_artifact_dir(artifact_dir: str) -> str:
+    """The versioned directory artifact_dir currently points to, so every file is read from one version."""
+    return os.path.realpath(artifact_dir)
+
+
+def artifact_exists(artifact_dir: str) -> bool:
+    return os.path.exists(os.path.join(artifact_dir, META_FILE))
+
+
+def load_artifact(artifact_dir: str = "model/artifact"):
+    """
+    Memory-map an artifact.
+
+    Returns:
+        tuple: (classifier, vectorizer) with the predict_proba/transform
+        interface used by ScamDetectionModel
+    """
+    artifact_dir = resolve_artifact_dir(artifact_dir)
+    meta = read_artifact_meta(artifact_dir)
+
+    def load(name: str) -> np.ndarray:
+        return np.load(os.path.join(artifact_dir, f"{name}.npy"), mmap_mode="r")
+
+    return _open_artifact(meta, load)
+
+
+def read_artifact_meta(artifact_dir: str) -> dict:
+    """Read and check an artifact's meta.json."""
+    with open(os.path.join(artifact_dir, META_FILE), encoding="utf-8") as f:
+        meta = json.load(f)
+
+    if meta.get("format_version") not in SUPPORTED_FORMAT_VERSIONS:
+        raise ValueError(f"Unsupported artifact format version: {meta.get('format_version')}")
+    weights = meta.get("weights", {}).get("dtype", "float64")
+    if weights not in WEIGHT_TYPES:
+        raise ValueError(f"Unsupported artifact weight type: {weights}")
+    return meta
+
+
+def _open_artifact(meta: dict, load: Callable[[str], np.ndarray]):
+    """Build the classifier and vectorizer from meta.json and an array loader."""
+    weights = meta.get("weights", {})
+
+    def load_weights(name: str):
+        if weights.get("dtype") == "int8":
+            return BlockQuantizedArray(load(f"{name}_codes"), load(f"{name}_scales"), weights["block_size"])
+        return load(name)
+
+    if meta["vectorizer"].get("kind", "tfidf") == "hashing":
+        vocabulary = HashingIndex(meta["n_features"])
+    else:
+        vocabulary = VocabularyIndex(load("vocab_terms"), load("vocab_offsets"), load("vocab_table"))
+    vectorizer = ArtifactVectorizer(meta["vectorizer"], vocabulary, load_weights("idf"))
+    classifier = ArtifactClassifier(load_weights("coef"), meta["intercept"], meta["classes"],
+                                    weights.get("dtype", "float64"))
+    return classifier, vectorizer
@@ -0,0 +1,138 @@
+"""
+Hot model reload for the API.
+
+A newly trained model is picked up without restarting the server. A reload
+can be triggered three ways:
+
+- the admin endpoint (POST /admin/reload in app.py)
+- SIGHUP (kill -HUP <pid>)
+- a file watcher that polls the model files for changes
+
+The new model is loaded and checked against a canary set in the background
+(see ScamDetectionModel.reload) and then swapped in atomically. Requests
+already running finish on the old model.
+"""
+
+import signal
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from model_utils import ModelReloadError, ScamDetectionModel
+
+
+class ModelReloader:
+    """Runs model reloads one at a time and records how they went."""
+
+    def __init__(self, model: ScamDetectionModel, canary: Optional[List[Tuple[str, int]]] = None,
+                 min_canary_accuracy: float = 1.0, on_swap: Optional[Callable[[], None]] = None):
+        self.model = model
+        self.canary = canary
+        self.min_canary_accuracy = min_canary_accuracy
+        # Called after a successful swap, e.g. to recycle forked inference workers
+        self.on_swap = on_swap
+        self.watch_interval: Optional[float] = None
+
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._running = False
+        self.reloads = 0
+        self.failures = 0
+        self.last_trigger: Optional[str] = None
+        self.last_attempt_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def reload(self, trigger: str = "manual") -> dict:
+        """
+        Reload now, in the calling thread.
+
+        Raises:
+            ModelReloadError: the new model was rejected; the old one keeps serving
+
+        Returns:
+            dict: result of ScamDetectionModel.reload
+        """
+        with self._reload_lock:
+            self.last_trigger = trigger
+            self.last_attempt_at = time.time()
+            try:
+                result = self.model.reload(self.canary, self.min_canary_accuracy)
+            except ModelReloadError as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"⚠️  Model reload ({trigger}) rejected: {e}")
+                raise
+
+            self.last_error = None
+            if result["swapped"]:
+                self.reloads += 1
+            if (result["swapped"] or result.get("reputation_swapped")) and self.on_swap is not None:
+                self.on_swap()
+            return result
+
+    def reload_async(self, trigger: str) -> bool:
+        """Start a reload in a background thread; returns False if one is already running."""
+        with self._lock:
+            if self._running:
+                return False
+            self._running = True
+
+        def run():
+            try:
+                self.reload(trigger)
+            except Exception:
+                pass  # Recorded in last_error
+            finally:
+                with self._lock:
+                    self._running = False
+
+        threading.Thread(target=run, name="model-reload", daemon=True).start()
+        return True
+
+    def install_signal_handler(self, signum: int = getattr(signal, "SIGHUP", None)) -> bool:
+        """
+        Reload on SIGHUP. Must be called from the main thread.
+
+        Returns:
+            bool: False where the signal doesn't exist (Windows)
+        """
+        if signum is None:
+            return False
+        signal.signal(signum, lambda *_: self.reload_async("signal"))
+        return True
+
+    def watch(self, interval: float = 5.0):
+        """
+        Poll the model files every interval seconds and reload when they change.
+
+        A change is acted on once the files have stayed the same for one more
+        interval, so a model that is still being written isn't loaded.
+        """
+        self.watch_interval = interval
+
+        def run():
+            loaded = self.model.source_signature()
+            previous = loaded
+            while True:
+                time.sleep(interval)
+                current = self.model.source_signature()
+                # Once settled, try each new set of files once (not again if rejected)
+                if current != loaded and current == previous and self.reload_async("file-watch"):
+                    loaded = current
+                previous = current
+
+        threading.Thread(target=run, name="model-watch", daemon=True).start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            running = self._running
+        return {
+            "in_progress": running,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_trigger": self.last_trigger,
+            "last_attempt_at": self.last_attempt_at,
+            "last_error": self.last_error,
+            "loaded_at": self.model.loaded_at,
+            "watch_interval": self.watch_interval,
+        }
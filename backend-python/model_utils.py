@@ -1,76 +1,840 @@
+import hashlib
+import heapq
 import joblib
+import json
+import numpy as np
 import os
-from typing import Tuple, List
+import threading
+import time
+from typing import Optional, Tuple, List
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
+from calibration import DEFAULT_THRESHOLD, Calibrator, calibrator_from_dict, load_calibrator, per_text_thresholds
+from fast_scorer import FastLinearScorer
+from metrics import BATCH_SIZE, record_stages, stage_timer
+from model_artifact import (ArtifactClassifier, artifact_exists, load_artifact, read_artifact_meta,
+                            resolve_artifact_dir, weight_files)
+from prefilter import PrefilterCascade, decision_holds, decision_result
+from prediction_cache import PredictionCache
+from reputation_index import META_FILE as REPUTATION_META_FILE, ReputationIndex
 from text_preprocessor import TextPreprocessor
 
+# Per-stage latency histograms, bound once so the hot path only observes
+_PREFILTER_TIMER = stage_timer("prefilter")
+_CLEAN_TIMER = stage_timer("clean_text")
+_REPUTATION_TIMER = stage_timer("reputation")
+_CACHE_TIMER = stage_timer("cache_lookup")
+_TRANSFORM_TIMER = stage_timer("transform")
+_PREDICT_TIMER = stage_timer("predict_proba")
+_EXPLAIN_TIMER = stage_timer("explanations")
+_BATCH_PREFILTER_TIMER = stage_timer("batch_prefilter")
+_BATCH_CLEAN_TIMER = stage_timer("batch_clean_text")
+_BATCH_REPUTATION_TIMER = stage_timer("batch_reputation")
+_BATCH_TRANSFORM_TIMER = stage_timer("batch_transform")
+_BATCH_PREDICT_TIMER = stage_timer("batch_predict_proba")
+_BATCH_EXPLAIN_TIMER = stage_timer("batch_explanations")
+
+class ModelReloadError(Exception):
+    """Raised when a newly trained model fails to load or to pass the canary check."""
+
+class _ModelState:
+    """
+    One loaded model generation: model, vectorizer and everything derived from them.
+    
+    Never mutated after construction. A reload builds a new state and swaps the
+    reference, so a request that took a snapshot finishes on the old model.
+    """
+    
+    def __init__(self, model=None, vectorizer=None, model_version: Optional[str] = None,
+                 model_format: Optional[str] = None, scorer: Optional[FastLinearScorer] = None,
+                 source_version: Optional[str] = None, calibrator: Optional[Calibrator] = None):
+        self.model = model
+        self.vectorizer = vectorizer
+        self.model_version = model_version
+        self.model_format = model_format
+        self.scorer = scorer
+        # Maps raw model probabilities to calibrated ones (None: served raw)
+        self.calibrator = calibrator
+        # Version of the model files this generation came from (differs from
+        # model_version once online updates are applied, see update_weights)
+        self.source_version = source_version or model_version
+        self.loaded_at = time.time()
+        
+        # Linear coefficients and term lookup for top-term explanations
+        self.coef = None
+        self.analyzer = None
+        self.vocabulary = None
+        if scorer is not None:
+            self.coef = scorer.coef
+            self.analyzer = scorer.analyzer
+            self.vocabulary = scorer.vocabulary
+        else:
+            # sklearn estimators have coef_ (1, n); ArtifactClassifier has coef (n,)
+            coef = getattr(model, "coef_", getattr(model, "coef", None))
+            # (binary models only: a single row of coefficients)
+            if coef is not None and np.size(coef) == np.shape(coef)[-1] and hasattr(vectorizer, "vocabulary_"):
+                self.coef = memoryview(np.ascontiguousarray(np.ravel(coef), dtype=np.float64))
+                self.analyzer = vectorizer.build_analyzer() if hasattr(vectorizer, "build_analyzer") \
+                    else vectorizer.analyzer
+                self.vocabulary = vectorizer.vocabulary_
+    
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None and self.vectorizer is not None
+
+class AnalyzedMessage:
+    """
+    Everything computed about one message in a single analysis pass.
+    
+    Prediction fills in the cleaned text, tokens, sparse feature vector,
+    reputation hits and (calibrated) probability. The prediction is the
+    probability compared with the threshold (0-100) the message was scored
+    for. The handcrafted keyword features that only explanations use are
+    computed on first access.
+    """
+    
+    __slots__ = ("text", "cleaned_text", "tokens", "vector", "scam_probability",
+                 "reputation", "reputation_logit", "threshold", "_features")
+    
+    def __init__(self, text: str, cleaned_text: str, tokens: Optional[List[str]] = None,
+                 vector=None, scam_probability: float = 0.0,
+                 reputation: Optional[List[Tuple[str, float]]] = None, reputation_logit: float = 0.0,
+                 threshold: float = DEFAULT_THRESHOLD):
+        self.text = text
+        self.cleaned_text = cleaned_text
+        self.tokens = tokens
+        # Sparse tf-idf vector as {feature id: weight}
+        self.vector = vector
+        self.scam_probability = scam_probability
+        # Known domains/phone numbers as (indicator, score), and the logit they added
+        self.reputation = reputation or []
+        self.reputation_logit = reputation_logit
+        self.threshold = threshold
+        self._features: Optional[dict] = None
+    
+    @property
+    def prediction(self) -> str:
+        return _label(self.scam_probability * 100, self.threshold)
+    
+    @property
+    def features(self) -> dict:
+        if self._features is None:
+            self._features = TextPreprocessor.extract_features(self.cleaned_text)
+        return self._features
+
+# Messages every deployable model must classify correctly (label 1 = Scam).
+# Override with a JSON file of [{"message": ..., "label": 0|1}, ...] via MODEL_CANARY_FILE.
+DEFAULT_CANARY = [
+    ("URGENT! Your bank account has been suspended. Click here immediately: http://secure-verify.com", 1),
+    ("Congratulations! You have won $5000! Call 555-123-4567 to claim your prize!", 1),
+    ("Your package delivery failed. Pay $2.99 to reschedule: http://track-parcel.net", 1),
+    ("Hey, are we still meeting for lunch tomorrow?", 0),
+    ("Thanks for your help with the project yesterday", 0),
+    ("Can you pick up some milk on your way home?", 0),
+]
+
+def load_canary(path: Optional[str]) -> List[Tuple[str, int]]:
+    """Read a canary set from a JSON file, or return DEFAULT_CANARY when no path is given."""
+    if not path:
+        return list(DEFAULT_CANARY)
+    with open(path, 'r', encoding='utf-8') as f:
+        return [(str(item['message']), int(item['label'])) for item in json.load(f)]
+
+def _label(probability: float, threshold: float) -> str:
+    """Scam or Legit for a 0-100 probability and threshold; the one comparison every path uses."""
+    return "Scam" if probability >= threshold else "Legit"
+
+def _shift_logit(probability, logit):
+    """Add logit to a probability (or array of probabilities) on the log-odds scale."""
+    probability = np.clip(probability, 1e-12, 1 - 1e-12)
+    return 1.0 / (1.0 + np.exp(-(np.log(probability / (1 - probability)) + logit)))
+
+def _reputation_cache_text(cleaned_text: str, hits: List[Tuple[str, float]], index_version: str) -> str:
+    """Cache key text: the cleaned text misses the links and numbers the reputation score depends on."""
+    if not hits:
+        return cleaned_text
+    return cleaned_text + "\x1f" + index_version + "".join(f"\x1f{indicator}={score:.6f}" for indicator, score in hits)
+
+def _reputation_explanations(hits: List[Tuple[str, float]], is_scam: bool) -> List[str]:
+    """Explanations for the known domains and phone numbers that agree with the prediction."""
+    explanations = []
+    for indicator, score in hits:
+        kind = "Phone number" if indicator.isdigit() else "Domain"
+        if is_scam and score > 0.5:
+            explanations.append(f"{kind} {indicator} has a bad reputation (score {score:.2f})")
+        elif not is_scam and score < 0.5:
+            explanations.append(f"{kind} {indicator} has a good reputation (score {score:.2f})")
+    return explanations
+
+def _cache_usable(entry: Optional[tuple], explain: bool, threshold: float) -> bool:
+    """
+    Whether a cache entry answers a request: entries scored with explain=False
+    have no explanations, and explanations only fit the side of the threshold
+    they were written for.
+    """
+    if entry is None:
+        return False
+    return not explain or (entry[2] is not None and entry[0] == _label(entry[1], threshold))
+
+def _cached_result(entry: tuple, explain: bool,
+                   threshold: float = DEFAULT_THRESHOLD) -> Tuple[str, float, List[str], List[dict]]:
+    """Turn a cache entry into a fresh (prediction, probability, explanations, top_terms) result."""
+    _, probability, explanations, terms = entry
+    prediction = _label(probability, threshold)
+    if not explain:
+        return prediction, probability, [], []
+    return prediction, probability, list(explanations), [{"term": term, "weight": weight} for term, weight in terms]
+
 class ScamDetectionModel:
     """Manages the scam detection model and predictions."""
     
     def __init__(self, model_path: str = "model/scam_model.pkl", 
-                 vectorizer_path: str = "model/tfidf_vectorizer.pkl"):
+                 vectorizer_path: str = "model/tfidf_vectorizer.pkl",
+                 cache_size: int = 10000, cache_ttl: float = 300.0,
+                 artifact_dir: str = "model/artifact", top_k_terms: int = 5,
+                 prefilter: Optional[PrefilterCascade] = None,
+                 reputation: Optional[ReputationIndex] = None,
+                 calibration_path: Optional[str] = "model/calibration.json"):
         self.model_path = model_path
         self.vectorizer_path = vectorizer_path
-        self.model = None
-        self.vectorizer = None
+        self.artifact_dir = artifact_dir
+        self.calibration_path = calibration_path
+        self.top_k_terms = top_k_terms
+        self._state = _ModelState()
+        self._reload_lock = threading.Lock()
         self.preprocessor = TextPreprocessor()
+        self.cache = PredictionCache(max_size=cache_size, ttl=cache_ttl)
+        # Cheap checks that settle obvious messages before the model (see prefilter.py)
+        self.prefilter = prefilter
+        # Domain / phone number reputation added to the model's score (see reputation_index.py)
+        self.reputation = reputation
         self.load_model()
     
+    # Read-only views of the current model generation
+    @property
+    def model(self):
+        return self._state.model
+    
+    @property
+    def vectorizer(self):
+        return self._state.vectorizer
+    
+    @property
+    def model_version(self) -> Optional[str]:
+        return self._state.model_version
+    
+    @property
+    def model_format(self) -> Optional[str]:
+        return self._state.model_format
+    
+    @property
+    def scorer(self) -> Optional[FastLinearScorer]:
+        return self._state.scorer
+    
+    @property
+    def loaded_at(self) -> float:
+        return self._state.loaded_at
+    
+    @property
+    def source_version(self) -> Optional[str]:
+        return self._state.source_version
+    
+    @property
+    def calibrator(self) -> Optional[Calibrator]:
+        return self._state.calibrator
+    
     def load_model(self):
-        """Load trained model and vectorizer from disk."""
+        """
+        Load trained model and vectorizer from disk.
+        
+        A memory-mapped artifact (see model_artifact.py) is preferred; the
+        joblib pickles are used as a fallback.
+        """
+        self._state = self._load_state()
+        
+        # Cached predictions belong to the previous model
+        self.cache.clear()
+    
+    def reload(self, canary: Optional[List[Tuple[str, int]]] = None,
+               min_canary_accuracy: float = 1.0) -> dict:
+        """
+        Load the model files again and swap them in if they pass the canary check.
+        
+        The new model is loaded and validated while requests keep being served
+        by the current one. Requests already running finish on the model they
+        started with. Cached predictions are keyed on the model version, so the
+        cache doesn't need clearing; old entries age out. A rebuilt reputation
+        index is swapped in with the model, so not if the model fails the
+        canary check; if the model files are unchanged it is swapped in alone.
+        
+        Raises:
+            ModelReloadError: the files could not be loaded or failed the canary
+            check; the current model stays in place
+        
+        Returns:
+            dict: previous_version, model_version, swapped, canary_accuracy,
+            reputation_swapped
+        """
+        with self._reload_lock:
+            reputation_table = self._load_reputation()
+            previous = self._state
+            state = self._load_state()
+            if not state.loaded:
+                raise ModelReloadError("New model files could not be loaded")
+            
+            if state.model_version == previous.source_version:
+                reputation_swapped = self._swap_reputation(reputation_table)
+                return {
+                    "previous_version": previous.model_version,
+                    "model_version": state.model_version,
+                    "swapped": False,
+                    "canary_accuracy": None,
+                    "reputation_swapped": reputation_swapped
+                }
+            
+            accuracy = self._check_canary(state, DEFAULT_CANARY if canary is None else canary)
+            if accuracy < min_canary_accuracy:
+                raise ModelReloadError(
+                    f"Model {state.model_version} failed the canary check "
+                    f"({accuracy:.0%} correct, {min_canary_accuracy:.0%} required)")
+            
+            # Single reference assignments: atomic for concurrent readers
+            reputation_swapped = self._swap_reputation(reputation_table)
+            self._state = state
+            print(f"✅ Model reloaded: {previous.model_version} -> {state.model_version}")
+            return {
+                "previous_version": previous.model_version,
+                "model_version": state.model_version,
+                "swapped": True,
+                "canary_accuracy": accuracy,
+                "reputation_swapped": reputation_swapped
+            }
+    
+    def _load_reputation(self) -> Optional[tuple]:
+        """Load a rebuilt reputation index (None if unchanged); a broken one is reported and skipped."""
+        if self.reputation is None:
+            return None
         try:
-            if os.path.exists(self.model_path) and os.path.exists(self.vectorizer_path):
-                self.model = joblib.load(self.model_path)
-                self.vectorizer = joblib.load(self.vectorizer_path)
-                print(f"Model loaded from {self.model_path}")
-            else:
-                print(f"Model files not found. Please train the model first.")
-                self.model = None
-                self.vectorizer = None
+            return self.reputation.load_changed()
+        except Exception as e:
+            print(f"⚠️  Reputation index reload failed, keeping the current one: {e}")
+            return None
+    
+    def _swap_reputation(self, table: Optional[tuple]) -> bool:
+        if table is None:
+            return False
+        self.reputation.swap_in(table)
+        return True
+    
+    def linear_weights(self) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        Coefficients and intercept of the current binary linear model.
+        
+        Returns:
+            tuple: (coef, intercept) as a float64 vector (shared, do not modify)
+            and a float, or None when no linear model is loaded
+        """
+        model = self._state.model
+        coef = getattr(model, "coef_", getattr(model, "coef", None))
+        if coef is None or np.size(coef) != np.shape(coef)[-1]:
+            return None
+        intercept = getattr(model, "intercept_", getattr(model, "intercept", 0.0))
+        return np.ravel(np.asarray(coef, dtype=np.float64)), float(np.ravel(intercept)[0])
+    
+    def update_weights(self, coef: np.ndarray, intercept: float, model_version: str,
+                       canary: Optional[List[Tuple[str, int]]] = None,
+                       min_canary_accuracy: float = 1.0) -> dict:
+        """
+        Swap in new linear weights over the current vectorizer (online learning).
+        
+        The vectorizer and feature space stay the same; only the coefficients
+        and intercept change. The candidate must pass the canary check like a
+        reloaded model, and is swapped in atomically.
+        
+        Raises:
+            ModelReloadError: no linear model is loaded, or the weights failed
+            the canary check; the current weights stay in place
+        
+        Returns:
+            dict: previous_version, model_version, swapped, canary_accuracy
+        """
+        with self._reload_lock:
+            previous = self._state
+            if not previous.loaded or self.linear_weights() is None:
+                raise ModelReloadError("Online updates need a loaded binary linear model")
+            
+            coef = np.ascontiguousarray(coef, dtype=np.float64)
+            model = ArtifactClassifier(coef, float(intercept), previous.model.classes_)
+            scorer = None
+            if previous.scorer is not None:
+                base = previous.scorer
+                scorer = FastLinearScorer(base.analyzer, base.vocabulary, base.idf_array, coef, intercept,
+                                          norm=base.norm, sublinear_tf=base.sublinear_tf, binary=base.binary)
+            # The calibration stays; it was fitted on the base weights the update starts from
+            state = _ModelState(model, previous.vectorizer, model_version, previous.model_format, scorer,
+                                source_version=previous.source_version, calibrator=previous.calibrator)
+            
+            accuracy = self._check_canary(state, DEFAULT_CANARY if canary is None else canary)
+            if accuracy < min_canary_accuracy:
+                raise ModelReloadError(
+                    f"Weights {model_version} failed the canary check "
+                    f"({accuracy:.0%} correct, {min_canary_accuracy:.0%} required)")
+            
+            self._state = state
+            return {
+                "previous_version": previous.model_version,
+                "model_version": model_version,
+                "swapped": True,
+                "canary_accuracy": accuracy
+            }
+    
+    def _check_canary(self, state: _ModelState, canary: List[Tuple[str, int]]) -> float:
+        """Score the canary messages with a candidate model and return the fraction labelled correctly."""
+        if not canary:
+            return 1.0
+        
+        cleaned = list(self.preprocessor.clean_many([message for message, _ in canary]))
+        try:
+            probabilities = state.model.predict_proba(state.vectorizer.transform(cleaned))[:, 1]
         except Exception as e:
-            print(f"Error loading model: {e}")
-            self.model = None
-            self.vectorizer = None
+            raise ModelReloadError(f"Model {state.model_version} failed to score the canary set: {e}")
+        
+        if not np.all(np.isfinite(probabilities)):
+            raise ModelReloadError(f"Model {state.model_version} produced non-finite probabilities")
+        if state.calibrator is not None:
+            probabilities = state.calibrator.calibrate(probabilities)
+        
+        predicted = probabilities * 100 >= DEFAULT_THRESHOLD
+        expected = np.array([label == 1 for _, label in canary])
+        return float(np.mean(predicted == expected))
+    
+    def source_signature(self) -> Tuple:
+        """Size and modification time of every model file (and the reputation index), to detect retraining."""
+        paths = [self.model_path, self.vectorizer_path]
+        if self.artifact_dir:
+            paths.append(os.path.join(self.artifact_dir, "meta.json"))
+        if self.calibration_path:
+            paths.append(self.calibration_path)
+        if self.reputation is not None:
+            paths.append(os.path.join(self.reputation.index_dir, REPUTATION_META_FILE))
+        signature = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+    
+    def _load_state(self) -> _ModelState:
+        """Load the model files into a new _ModelState without touching the current one."""
+        model = vectorizer = model_format = model_version = scorer = artifact_meta = None
+        
+        if self.artifact_dir and artifact_exists(self.artifact_dir):
+            try:
+                # Read every file from the version the artifact link points to now
+                artifact_dir = resolve_artifact_dir(self.artifact_dir)
+                model, vectorizer = load_artifact(artifact_dir)
+                artifact_meta = read_artifact_meta(artifact_dir)
+                # "artifact", or e.g. "artifact-int8" for quantized weights
+                model_format = "artifact" if model.weights == "float64" else f"artifact-{model.weights}"
+                model_version = self._compute_model_version([
+                    os.path.join(artifact_dir, name)
+                    for name in ["meta.json"] + weight_files(artifact_meta)
+                ])
+                print(f"Model loaded from {self.artifact_dir}")
+            except Exception as e:
+                print(f"Error loading model artifact: {e}. Falling back to joblib files.")
+                model = None
+                vectorizer = None
+                artifact_meta = None
+        
+        if model is None:
+            try:
+                if os.path.exists(self.model_path) and os.path.exists(self.vectorizer_path):
+                    model = joblib.load(self.model_path)
+                    vectorizer = joblib.load(self.vectorizer_path)
+                    model_format = "joblib"
+                    model_version = self._compute_model_version([self.model_path, self.vectorizer_path])
+                    print(f"Model loaded from {self.model_path}")
+                else:
+                    print(f"Model files not found. Please train the model first.")
+            except Exception as e:
+                print(f"Error loading model: {e}")
+                model = None
+                vectorizer = None
+                model_format = None
+                model_version = None
+        
+        # Direct single-message scorer, when the model/vectorizer pair supports it
+        calibrator = None
+        if model is not None:
+            try:
+                scorer = FastLinearScorer.from_model(model, vectorizer)
+            except Exception as e:
+                print(f"Fast scorer unavailable, using sklearn scoring: {e}")
+                scorer = None
+            
+            # Calibration fitted with this model (train_model.py). An artifact
+            # carries its own in meta.json (already part of the model version);
+            # the standalone file only applies to the joblib files.
+            if artifact_meta is not None:
+                try:
+                    if artifact_meta.get("calibration"):
+                        calibrator = calibrator_from_dict(artifact_meta["calibration"])
+                        print(f"Calibration loaded from {self.artifact_dir} ({calibrator.method})")
+                except Exception as e:
+                    print(f"⚠️  Artifact calibration not loaded, serving raw probabilities: {e}")
+            else:
+                try:
+                    calibrator = load_calibrator(self.calibration_path)
+                except Exception as e:
+                    print(f"⚠️  Calibration {self.calibration_path} not loaded, serving raw probabilities: {e}")
+                if calibrator is not None:
+                    model_version = self._compute_model_version([self.calibration_path], model_version)
+                    print(f"Calibration loaded from {self.calibration_path} ({calibrator.method})")
+        
+        return _ModelState(model, vectorizer, model_version, model_format, scorer, calibrator=calibrator)
+    
+    @staticmethod
+    def _compute_model_version(paths: List[str], base: Optional[str] = None) -> str:
+        """Identify the loaded model files by path, size and modification time."""
+        digest = hashlib.blake2b(digest_size=6)
+        if base:
+            digest.update(base.encode())
+        for path in paths:
+            stat = os.stat(path)
+            digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        return digest.hexdigest()
+    
+    def analyze(self, text: str, state: Optional[_ModelState] = None) -> AnalyzedMessage:
+        """
+        Clean, tokenize, vectorize and score one message in a single pass.
+        
+        The returned AnalyzedMessage can then be explained with explain()
+        without repeating any of that work.
+        """
+        state = state or self._state
+        if not state.loaded:
+            raise ValueError("Model not loaded. Please train the model first.")
+        return self._analyze(text, state, self.preprocessor.clean_text(text), [],
+                             self.reputation.lookup(text) if self.reputation is not None else None)
+    
+    def _analyze(self, text: str, state: _ModelState, cleaned_text: str, timings: list,
+                 reputation: Optional[List[Tuple[str, float]]] = None,
+                 threshold: float = DEFAULT_THRESHOLD) -> AnalyzedMessage:
+        start = time.perf_counter()
+        if state.scorer is not None:
+            # Same TF-IDF + sigmoid arithmetic without sklearn/scipy overhead
+            tokens = state.scorer.analyzer(cleaned_text)
+            vector = state.scorer.weights_from_tokens(tokens)
+            stage_end = time.perf_counter()
+            timings.append((_TRANSFORM_TIMER, stage_end - start))
+            
+            start = stage_end
+            scam_probability = state.scorer.predict_proba_from_weights(vector)
+        else:
+            # Transform text using TF-IDF
+            tokens = None
+            row = state.vectorizer.transform([cleaned_text])
+            vector = dict(zip(row.indices.tolist(), row.data.tolist()))
+            stage_end = time.perf_counter()
+            timings.append((_TRANSFORM_TIMER, stage_end - start))
+            
+            # Get prediction and probability
+            start = stage_end
+            prediction_proba = state.model.predict_proba(row)[0]
+            scam_probability = float(prediction_proba[1])  # Assuming 1 = Scam, 0 = Legit
+        if state.calibrator is not None:
+            scam_probability = state.calibrator.calibrate_one(scam_probability)
+        
+        # Known domains and phone numbers shift the score on the log-odds scale
+        reputation_logit = 0.0
+        if reputation:
+            reputation_logit = self.reputation.logit(reputation)
+            scam_probability = float(_shift_logit(scam_probability, reputation_logit))
+        timings.append((_PREDICT_TIMER, time.perf_counter() - start))
+        return AnalyzedMessage(text, cleaned_text, tokens, vector, scam_probability,
+                               reputation, reputation_logit, threshold)
+    
+    def explain(self, analyzed: AnalyzedMessage) -> List[str]:
+        """Explanations for an analyzed message's prediction, reusing its computed features."""
+        explanations = self._generate_explanations(analyzed.text, analyzed.cleaned_text,
+                                                   analyzed.scam_probability, analyzed.features,
+                                                   analyzed.threshold)
+        if analyzed.reputation:
+            explanations = _reputation_explanations(analyzed.reputation,
+                                                    analyzed.prediction == "Scam") + explanations
+        return explanations
+    
+    def top_terms(self, analyzed: AnalyzedMessage, k: Optional[int] = None,
+                  state: Optional[_ModelState] = None) -> List[Tuple[str, float]]:
+        """
+        Terms that contributed most to the prediction, by coefficient x tf-idf weight.
+        
+        Only terms that pushed toward the predicted class are returned (positive
+        contributions for Scam, negative for Legit), strongest first. Works on
+        the sparse vector directly; nothing is densified. The reputation logit
+        competes as one more term, named after the worst known indicator.
+        
+        Returns:
+            list: (term, contribution) pairs, at most k
+        """
+        state = state or self._state
+        k = self.top_k_terms if k is None else k
+        if k <= 0:
+            return []
+        terms = self._vector_top_terms(analyzed, k, state)
+        
+        sign = 1.0 if analyzed.prediction == "Scam" else -1.0
+        if analyzed.reputation_logit * sign > 0:
+            indicator = max(analyzed.reputation, key=lambda hit: hit[1])[0]
+            terms = sorted(terms + [(indicator, analyzed.reputation_logit)],
+                           key=lambda term: -term[1] * sign)[:k]
+        return terms
     
-    def predict(self, text: str) -> Tuple[str, float, List[str]]:
+    def _vector_top_terms(self, analyzed: AnalyzedMessage, k: int, state: _ModelState) -> List[Tuple[str, float]]:
+        """The k strongest tf-idf term contributions toward the predicted class."""
+        if state.coef is None or not analyzed.vector:
+            return []
+        
+        coef = state.coef
+        sign = 1.0 if analyzed.prediction == "Scam" else -1.0
+        contributions = [(weight * coef[feature_id], feature_id)
+                         for feature_id, weight in analyzed.vector.items()]
+        # Ties (e.g. a unigram and the bigram it always appears in) go to the lower id
+        top = heapq.nlargest(k, (c for c in contributions if c[0] * sign > 0),
+                             key=lambda c: (c[0] * sign, -c[1]))
+        if not top:
+            return []
+        
+        # Map feature ids back to terms through the message's own tokens; this
+        # also works for hashed features, which have no reverse vocabulary
+        wanted = {feature_id for _, feature_id in top}
+        names = {}
+        tokens = analyzed.tokens if analyzed.tokens is not None else state.analyzer(analyzed.cleaned_text)
+        lookup = state.vocabulary.get
+        for token in tokens:
+            feature_id = lookup(token)
+            if feature_id in wanted and feature_id not in names:
+                names[feature_id] = token
+                if len(names) == len(wanted):
+                    break
+        return [(names.get(feature_id, f"feature_{feature_id}"), contribution)
+                for contribution, feature_id in top]
+    
+    def predict(self, text: str, explain: bool = True,
+                threshold: Optional[float] = None) -> Tuple[str, float, List[str], List[dict]]:
         """
         Predict if text is a scam.
         
+        The message is Scam when its (calibrated) probability is at least
+        threshold (0-100, default 50). With explain=False neither the
+        explanations nor the top terms are computed and empty lists are
+        returned in their place. Messages the pre-filter cascade settles are
+        answered without the model and have no top terms, unless the tier's
+        fixed probability falls on the other side of the threshold.
+        
         Returns:
-            tuple: (prediction, probability, explanations)
+            tuple: (prediction, probability, explanations, top_terms) where
+            top_terms is a list of {"term", "weight"} dicts (see top_terms())
         """
-        if self.model is None or self.vectorizer is None:
+        # One snapshot per request, so a concurrent reload can't mix two models
+        state = self._state
+        if not state.loaded:
             raise ValueError("Model not loaded. Please train the model first.")
+        threshold = DEFAULT_THRESHOLD if threshold is None else threshold
+        
+        # Stage timings are recorded together once the request is done
+        timings = []
+        if self.prefilter is not None:
+            start = time.perf_counter()
+            decision = self.prefilter.check(text)
+            timings.append((_PREFILTER_TIMER, time.perf_counter() - start))
+            if decision is not None and decision_holds(decision, threshold):
+                record_stages(timings)
+                return decision_result(decision, explain)
         
         # Preprocess text
+        start = time.perf_counter()
         cleaned_text = self.preprocessor.clean_text(text)
+        stage_end = time.perf_counter()
+        timings.append((_CLEAN_TIMER, stage_end - start))
+        
+        # Known domains and phone numbers, which clean_text has just removed
+        reputation = None
+        if self.reputation is not None:
+            reputation = self.reputation.lookup(text)
+            start, stage_end = stage_end, time.perf_counter()
+            timings.append((_REPUTATION_TIMER, stage_end - start))
+        
+        if (not cleaned_text or len(cleaned_text.strip()) == 0) and not reputation:
+            record_stages(timings)
+            return "Legit", 0.0, ["Empty or invalid text input"] if explain else [], []
+        
+        # Identical campaign messages skip vectorization and inference
+        start = stage_end
+        cache_key = self.cache.make_key(
+            _reputation_cache_text(cleaned_text, reputation, self.reputation.version or "") if reputation
+            else cleaned_text, state.model_version or "")
+        cached = self.cache.get(cache_key)
+        timings.append((_CACHE_TIMER, time.perf_counter() - start))
+        if _cache_usable(cached, explain, threshold):
+            record_stages(timings)
+            return _cached_result(cached, explain, threshold)
+        
+        analyzed = self._analyze(text, state, cleaned_text, timings, reputation, threshold)
+        prediction, probability = analyzed.prediction, analyzed.scam_probability * 100
         
-        if not cleaned_text or len(cleaned_text.strip()) == 0:
-            return "Legit", 0.0, ["Empty or invalid text input"]
+        explanations = terms = None
+        if explain:
+            # Generate explanations
+            start = time.perf_counter()
+            explanations = tuple(self.explain(analyzed))
+            terms = tuple(self.top_terms(analyzed, state=state))
+            timings.append((_EXPLAIN_TIMER, time.perf_counter() - start))
+        record_stages(timings)
+        
+        entry = (prediction, probability, explanations, terms)
+        self.cache.put(cache_key, entry)
+        return _cached_result(entry, explain, threshold)
+    
+    def predict_batch(self, texts: List[str], explain=True, threshold=None,
+                      cleaned_texts: Optional[List[str]] = None,
+                      indicators: Optional[List[dict]] = None) -> List[Tuple[str, float, List[str], List[dict]]]:
+        """
+        Predict many texts with a single vectorizer and model call.
+        
+        Texts the pre-filter cascade settles are answered directly. The rest
+        are cleaned and looked up in the reputation index, and the non-empty
+        ones are stacked into one sparse matrix and scored with one
+        predict_proba call. explain is a bool for the whole batch or one bool
+        per text; threshold (0-100, default 50) is one number or one per
+        text, so texts of different tenants share the scoring pass. Callers
+        that already cleaned the texts pass cleaned_texts to skip cleaning,
+        and indicators (TextPreprocessor.extract_indicators per text) to skip
+        extracting them again for the reputation lookup.
+        
+        Returns:
+            list: (prediction, probability, explanations, top_terms) per input text, in order
+        """
+        state = self._state
+        if not state.loaded:
+            raise ValueError("Model not loaded. Please train the model first.")
+        
+        explain_flags = [explain] * len(texts) if isinstance(explain, bool) else list(explain)
+        thresholds = per_text_thresholds(threshold, len(texts))
+        
+        BATCH_SIZE.observe(len(texts))
+        timings = []
+        # Messages settled by the pre-filter cascade skip cleaning and the model
+        decisions = [None] * len(texts)
+        if self.prefilter is not None:
+            start = time.perf_counter()
+            decisions = [decision if decision is not None and decision_holds(decision, limit) else None
+                         for decision, limit in zip(self.prefilter.check_many(texts), thresholds)]
+            timings.append((_BATCH_PREFILTER_TIMER, time.perf_counter() - start))
+        
+        if cleaned_texts is None:
+            start = time.perf_counter()
+            clean_text = self.preprocessor.clean_text
+            cleaned_texts = [clean_text(text) if decision is None else ""
+                             for text, decision in zip(texts, decisions)]
+            timings.append((_BATCH_CLEAN_TIMER, time.perf_counter() - start))
+        else:
+            cleaned_texts = [cleaned if decision is None else ""
+                             for cleaned, decision in zip(cleaned_texts, decisions)]
+        results = [("Legit", 0.0, ["Empty or invalid text input"] if wanted else [], [])
+                   if decision is None else decision_result(decision, wanted)
+                   for decision, wanted in zip(decisions, explain_flags)]
+        
+        # Known domains and phone numbers of the undecided texts, one index search for all
+        reputations = [None] * len(texts)
+        if self.reputation is not None:
+            start = time.perf_counter()
+            pending = [i for i, decision in enumerate(decisions) if decision is None]
+            pending_indicators = [indicators[i] for i in pending] if indicators is not None else None
+            for i, hits in zip(pending, self.reputation.lookup_many([texts[i] for i in pending],
+                                                                    pending_indicators)):
+                reputations[i] = hits
+            timings.append((_BATCH_REPUTATION_TIMER, time.perf_counter() - start))
+        
+        # Only non-empty, uncached texts go through the vectorizer and model
+        scored_indices = []
+        cache_keys = {}
+        for i, cleaned in enumerate(cleaned_texts):
+            if not cleaned.strip() and not reputations[i]:
+                continue
+            cache_key = self.cache.make_key(
+                _reputation_cache_text(cleaned, reputations[i], self.reputation.version or "")
+                if reputations[i] else cleaned, state.model_version or "")
+            cached = self.cache.get(cache_key)
+            if _cache_usable(cached, explain_flags[i], thresholds[i]):
+                results[i] = _cached_result(cached, explain_flags[i], thresholds[i])
+            else:
+                cache_keys[i] = cache_key
+                scored_indices.append(i)
         
-        # Transform text using TF-IDF
-        text_vector = self.vectorizer.transform([cleaned_text])
+        if not scored_indices:
+            record_stages(timings)
+            return results
         
-        # Get prediction and probability
-        prediction_proba = self.model.predict_proba(text_vector)[0]
-        scam_probability = prediction_proba[1]  # Assuming 1 = Scam, 0 = Legit
+        # With an artifact, the vectorizer and model read the same float32 or
+        # int8 idf and coefficient arrays as the fast scorer (not float64
+        # copies), so a message scores the same in a batch as on its own
+        start = time.perf_counter()
+        text_matrix = state.vectorizer.transform([cleaned_texts[i] for i in scored_indices])
+        stage_end = time.perf_counter()
+        timings.append((_BATCH_TRANSFORM_TIMER, stage_end - start))
         
-        # Determine prediction
-        prediction = "Scam" if scam_probability >= 0.5 else "Legit"
+        scam_probabilities = state.model.predict_proba(text_matrix)[:, 1]
+        if state.calibrator is not None:
+            scam_probabilities = state.calibrator.calibrate(scam_probabilities)
+        reputation_logits = np.zeros(len(scored_indices))
+        if self.reputation is not None:
+            reputation_logits = np.array([self.reputation.logit(reputations[i]) if reputations[i] else 0.0
+                                          for i in scored_indices])
+            shifted = reputation_logits != 0
+            if shifted.any():
+                scam_probabilities = scam_probabilities.copy()
+                scam_probabilities[shifted] = _shift_logit(scam_probabilities[shifted], reputation_logits[shifted])
+        start = time.perf_counter()
+        timings.append((_BATCH_PREDICT_TIMER, start - stage_end))
         
-        # Generate explanations
-        explanations = self._generate_explanations(text, cleaned_text, scam_probability)
+        indptr, indices, data = text_matrix.indptr, text_matrix.indices, text_matrix.data
+        for row, (i, scam_probability) in enumerate(zip(scored_indices, scam_probabilities)):
+            scam_probability = float(scam_probability)
+            prediction = _label(scam_probability * 100, thresholds[i])
+            explanations = terms = None
+            if explain_flags[i]:
+                # Sparse row as {feature id: weight}, sliced straight from the CSR arrays
+                row_slice = slice(indptr[row], indptr[row + 1])
+                analyzed = AnalyzedMessage(texts[i], cleaned_texts[i],
+                                           vector=dict(zip(indices[row_slice].tolist(),
+                                                           data[row_slice].tolist())),
+                                           scam_probability=scam_probability,
+                                           reputation=reputations[i],
+                                           reputation_logit=float(reputation_logits[row]),
+                                           threshold=thresholds[i])
+                explanations = tuple(self.explain(analyzed))
+                terms = tuple(self.top_terms(analyzed, state=state))
+            entry = (prediction, scam_probability * 100, explanations, terms)
+            self.cache.put(cache_keys[i], entry)
+            results[i] = _cached_result(entry, explain_flags[i], thresholds[i])
+        timings.append((_BATCH_EXPLAIN_TIMER, time.perf_counter() - start))
+        record_stages(timings)
         
-        return prediction, scam_probability * 100, explanations
+        return results
     
     def _generate_explanations(self, original_text: str, cleaned_text: str, 
-                              scam_probability: float) -> List[str]:
+                              scam_probability: float, features: Optional[dict] = None,
+                              threshold: float = DEFAULT_THRESHOLD) -> List[str]:
         """Generate explanations for why a message is classified as scam or legit."""
         explanations = []
-        features = self.preprocessor.extract_features(cleaned_text)
+        if features is None:
+            features = self.preprocessor.extract_features(cleaned_text)
         
-        if scam_probability >= 0.5:
+        if _label(scam_probability * 100, threshold) == "Scam":
             # Scam explanations
             if features['urgency_count'] > 0:
                 explanations.append(f"Contains {features['urgency_count']} urgency-indicating word(s)")
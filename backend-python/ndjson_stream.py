@@ -0,0 +1,169 @@
+"""
+Incremental NDJSON scoring for POST /stream-detect.
+
+The request body is newline-delimited JSON, one message per line, either a
+JSON string or an object with "message" and an optional "id":
+
+    {"id": "a1", "message": "Your account has been suspended..."}
+    "Lunch at noon?"
+
+Lines are collected into micro-batches of batch_size messages, each batch is
+scored with one predict_batch call, and one result line per input line is
+written back in input order:
+
+    {"index": 0, "id": "a1", "prediction": "Scam", "probability": 87.5, ...}
+
+The stream ends with a summary line, {"summary": {"total", "scored", "errors"}},
+so a client can tell a complete response from a cut-off one. Only the current
+batch and one partial line are held in memory, however long the stream is.
+"""
+
+import json
+from typing import Iterator, List, Optional, Tuple
+
+
+class NDJSONScorer:
+    """
+    Turns chunks of an NDJSON request body into chunks of NDJSON results.
+
+    feed() accepts chunks split anywhere (ASGI body events) or whole lines
+    (WSGI readline); finish() flushes the last batch and the summary.
+    """
+
+    def __init__(self, predictor, batch_size: int = 256, explain: bool = True,
+                 max_line_bytes: int = 1024 * 1024, threshold: Optional[float] = None):
+        self.predictor = predictor
+        self.batch_size = batch_size
+        self.explain = explain
+        # Scam threshold (0-100) for every message of the stream; None is the model default
+        self.threshold = threshold
+        self.max_line_bytes = max_line_bytes
+
+        self._partial = b""
+        self._skipping = False
+        # (index, id, text) waiting to be scored, and error lines already decided
+        self._batch: List[Tuple[int, Optional[object], str]] = []
+        self._ready: List[dict] = []
+        self.total = 0
+        self.scored = 0
+        self.errors = 0
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Consume a chunk of the request body; returns the result lines completed by it."""
+        output = []
+        lines = chunk.split(b"\n")
+        for position, line in enumerate(lines):
+            last = position == len(lines) - 1
+            if self._skipping:
+                # Rest of an over-long line that was already reported
+                self._skipping = last
+                continue
+            if last:
+                self._partial += line
+                if len(self._partial) > self.max_line_bytes:
+                    self._reject(f"Line longer than {self.max_line_bytes} bytes")
+                    self._partial = b""
+                    self._skipping = True
+                break
+            self._add_line(self._partial + line if self._partial else line)
+            self._partial = b""
+            if len(self._batch) + len(self._ready) >= self.batch_size:
+                output.append(self._flush())
+        return b"".join(output)
+
+    def finish(self) -> bytes:
+        """Score whatever is left (including an unterminated last line) and write the summary."""
+        if self._partial and not self._skipping:
+            self._add_line(self._partial)
+        self._partial = b""
+        tail = self._flush()
+        summary = json.dumps({"summary": {"total": self.total, "scored": self.scored, "errors": self.errors}})
+        return tail + summary.encode("utf-8") + b"\n"
+
+    def _add_line(self, line: bytes):
+        if len(line) > self.max_line_bytes:
+            self._reject(f"Line longer than {self.max_line_bytes} bytes")
+            return
+        line = line.strip()
+        if not line:
+            return
+
+        index = self.total
+        self.total += 1
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            self._error(index, None, f"Invalid JSON: {e}")
+            return
+
+        item_id = None
+        if isinstance(item, dict):
+            item_id = item.get("id")
+            item = item.get("message")
+        if not isinstance(item, str) or not item.strip():
+            self._error(index, item_id, "Message must be a non-empty string")
+            return
+        self._batch.append((index, item_id, item.strip()))
+
+    def _reject(self, reason: str):
+        index = self.total
+        self.total += 1
+        self._error(index, None, reason)
+
+    def _error(self, index: int, item_id, reason: str):
+        self.errors += 1
+        result = {"index": index, "error": reason}
+        if item_id is not None:
+            result["id"] = item_id
+        self._ready.append(result)
+
+    def _flush(self) -> bytes:
+        """Score the current batch and serialize it together with pending error lines, in input order."""
+        batch, self._batch = self._batch, []
+        results, self._ready = self._ready, []
+
+        if batch:
+            texts = [text for _, _, text in batch]
+            try:
+                predictions = self.predictor.predict_batch(texts, explain=self.explain,
+                                                           threshold=self.threshold)
+            except Exception:
+                # Fall back to per-message scoring so errors are reported per item
+                predictions = None
+
+            for position, (index, item_id, text) in enumerate(batch):
+                result = {"index": index}
+                if item_id is not None:
+                    result["id"] = item_id
+                try:
+                    if predictions is not None:
+                        prediction, probability, explanations, top_terms = predictions[position]
+                    else:
+                        prediction, probability, explanations, top_terms = self.predictor.predict(
+                            text, explain=self.explain, threshold=self.threshold)
+                    result.update({
+                        "prediction": prediction,
+                        "probability": round(probability, 2),
+                        "explanations": explanations,
+                        "top_terms": [{"term": item["term"], "weight": round(item["weight"], 4)}
+                                      for item in top_terms]
+                    })
+                    self.scored += 1
+                except Exception as e:
+                    result["error"] = str(e)
+                    self.errors += 1
+                results.append(result)
+
+        if not results:
+            return b""
+        results.sort(key=lambda result: result["index"])
+        return "".join(json.dumps(result) + "\n" for result in results).encode("utf-8")
+
+
+def iter_results(chunks: Iterator[bytes], scorer: NDJSONScorer) -> Iterator[bytes]:
+    """Feed body chunks through scorer, yielding result chunks as soon as batches complete."""
+    for chunk in chunks:
+        output = scorer.feed(chunk)
+        if output:
+            yield output
+    yield scorer.finish()
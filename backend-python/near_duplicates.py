@@ -0,0 +1,155 @@
+"""
+Exact and near-duplicate grouping of batch messages.
+
+Bulk jobs often contain thousands of copies of one campaign message, some
+with small variations (names, amounts, links). cluster_messages groups them
+so each group is scored once:
+
+- exact: identical cleaned text
+- near (optional): MinHash signatures over character shingles of the cleaned
+  text, bucketed with LSH banding; candidates are confirmed by their
+  estimated Jaccard similarity
+
+clean_text drops links and phone numbers, which the reputation index scores,
+so callers pass the extracted indicators as well: messages are only grouped
+when those match too.
+"""
+
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_MASK_32 = np.uint64(0xFFFFFFFF)
+
+
+class MinHashLSH:
+    """
+    MinHash + LSH banding for near-duplicate detection.
+
+    With the defaults (64 hashes in 8 bands of 8 rows) pairs with Jaccard
+    similarity above ~0.77 almost always share a bucket, and candidates are
+    kept only when their estimated similarity reaches threshold.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 8, shingle_size: int = 5,
+                 threshold: float = 0.8, seed: int = 42):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+
+        # Multiply-shift hash family: h(x) = ((a * x + b) mod 2^64) >> 32, a odd
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """32-bit hashes of the distinct character shingles of text."""
+        size = self.shingle_size
+        if len(text) <= size:
+            grams = {text}
+        else:
+            grams = {text[i:i + size] for i in range(len(text) - size + 1)}
+        return np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams),
+                           dtype=np.uint64, count=len(grams))
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature (num_perm values) of text."""
+        hashes = self.shingles(text)
+        with np.errstate(over="ignore"):
+            permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+        return permuted.min(axis=1) & _MASK_32
+
+    def cluster(self, texts: List[str]) -> List[int]:
+        """
+        Group near-duplicate texts.
+
+        Returns:
+            list: for each text, the index of the first text in its group
+        """
+        n = len(texts)
+        if n < 2:
+            return list(range(n))
+
+        signatures = np.vstack([self.signature(text) for text in texts])
+        parent = list(range(n))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for band in range(self.bands):
+            band_keys = signatures[:, band * self.rows:(band + 1) * self.rows]
+            buckets: Dict[bytes, int] = {}
+            for i in range(n):
+                key = band_keys[i].tobytes()
+                first = buckets.setdefault(key, i)
+                if first == i:
+                    continue
+                # Compare against the bucket's first member only, so a large
+                # campaign costs O(n) comparisons rather than O(n^2)
+                root_i, root_first = find(i), find(first)
+                if root_i != root_first and \
+                        np.count_nonzero(signatures[i] == signatures[first]) >= self.threshold * self.num_perm:
+                    parent[max(root_i, root_first)] = min(root_i, root_first)
+
+        return [find(i) for i in range(n)]
+
+
+def cluster_messages(cleaned_texts: List[str], near_duplicates: Optional[MinHashLSH] = None,
+                     indicator_keys: Optional[List[str]] = None) -> Tuple[List[int], List[int]]:
+    """
+    Group messages by exact cleaned text and, optionally, by near-duplicate similarity.
+
+    With indicator_keys (see cluster_indicator_key), messages are only grouped when
+    their keys are equal as well.
+
+    Returns:
+        tuple: (cluster_ids, representatives) where cluster_ids[i] is the
+        cluster of message i (numbered 0, 1, ... in order of first appearance)
+        and representatives[c] is the index of the first message of cluster c
+    """
+    # Exact duplicates: one entry per distinct cleaned text
+    keys = cleaned_texts if indicator_keys is None else list(zip(cleaned_texts, indicator_keys))
+    unique_index: Dict[object, int] = {}
+    unique_first: List[int] = []
+    unique_of = []
+    for i, key in enumerate(keys):
+        u = unique_index.setdefault(key, len(unique_first))
+        if u == len(unique_first):
+            unique_first.append(i)
+        unique_of.append(u)
+
+    if near_duplicates is not None:
+        # Empty texts are never similar to anything
+        candidates = [u for u, i in enumerate(unique_first) if cleaned_texts[i]]
+        roots = near_duplicates.cluster([cleaned_texts[unique_first[u]] for u in candidates])
+        group_of = list(range(len(unique_first)))
+        # Split each similar group by indicator key; its first member leads each part
+        leaders: Dict[Tuple[int, str], int] = {}
+        for u, root in zip(candidates, roots):
+            indicators = indicator_keys[unique_first[u]] if indicator_keys is not None else ""
+            group_of[u] = leaders.setdefault((root, indicators), u)
+    else:
+        group_of = list(range(len(unique_first)))
+
+    cluster_of_group: Dict[int, int] = {}
+    representatives: List[int] = []
+    cluster_ids = []
+    for i, u in enumerate(unique_of):
+        cluster = cluster_of_group.setdefault(group_of[u], len(representatives))
+        if cluster == len(representatives):
+            representatives.append(i)
+        cluster_ids.append(cluster)
+    return cluster_ids, representatives
+
+
+def cluster_indicator_key(indicators: Dict[str, List[str]]) -> str:
+    """Grouping key of TextPreprocessor.extract_indicators output."""
+    return " ".join(indicators["domains"]) + "|" + " ".join(indicators["phones"])
@@ -0,0 +1,414 @@
+"""
+Incremental learning from analyst feedback.
+
+Analysts' labelled corrections are appended to a feedback store (SQLite, or a
+JSONL file for testing). OnlineLearner consumes the feedback that arrived
+since its last update and takes a few SGD steps on the log loss of the
+current linear model, over the model's existing feature space (the fitted
+TF-IDF vocabulary or the hashing space). Nothing is refit from scratch. A
+proximal L2 term pulls the weights towards the trained model, so a handful of
+corrections moves the decision for a new campaign without forgetting
+everything else.
+
+Every update is checkpointed as a versioned weight vector in checkpoint_dir:
+
+    v000001/meta.json   base model version, intercept, feedback cursor, losses
+    v000001/coef.npy    float64 coefficient per feature
+
+The newest keep_checkpoints checkpoints are kept. The latest one whose base
+matches the loaded model is restored on startup. Retraining with
+train_model.py produces a new base model that was not trained on the
+feedback, so online updates start again from it with the feedback cursor
+rewound: every stored correction is applied to the new base.
+"""
+
+import contextlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy.special import expit
+
+from model_artifact import META_FILE, _write_artifact
+from model_utils import ModelReloadError, ScamDetectionModel
+from text_preprocessor import TextPreprocessor
+
+LABELS = {"scam": 1, "legit": 0, "1": 1, "0": 0}
+
+
+def parse_label(value) -> int:
+    """Accept 1/0, true/false or "Scam"/"Legit"; raise ValueError otherwise."""
+    if isinstance(value, bool):
+        return int(value)
+    label = LABELS.get(str(value).strip().lower())
+    if label is None:
+        raise ValueError(f"Invalid label {value!r}: use 1/0 or Scam/Legit")
+    return label
+
+
+class SQLiteFeedbackStore:
+    """Feedback in a SQLite table; ids are the autoincrement row ids."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._ready = False
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self._ready:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS feedback ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, message TEXT NOT NULL, "
+                "label INTEGER NOT NULL, source TEXT, created_at REAL NOT NULL)")
+            connection.commit()
+            self._ready = True
+        return contextlib.closing(connection)
+
+    def add(self, items: Iterable[Tuple[str, int]], source: Optional[str] = None) -> int:
+        """Store (message, label) pairs; returns how many were stored."""
+        now = time.time()
+        rows = [(message, label, source, now) for message, label in items]
+        with self._connect() as connection, connection:
+            connection.executemany(
+                "INSERT INTO feedback (message, label, source, created_at) VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def fetch(self, after_id: int = 0, limit: int = 10000) -> List[Tuple[int, str, int]]:
+        """Return up to limit (id, message, label) rows with id > after_id, oldest first."""
+        with self._connect() as connection:
+            return connection.execute(
+                "SELECT id, message, label FROM feedback WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit)).fetchall()
+
+    def count(self, after_id: int = 0) -> int:
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM feedback WHERE id > ?", (after_id,)).fetchone()[0]
+
+
+class JSONLFeedbackStore:
+    """Feedback as one JSON object per line; ids are 1-based line numbers."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def add(self, items: Iterable[Tuple[str, int]], source: Optional[str] = None) -> int:
+        now = time.time()
+        lines = [json.dumps({"message": message, "label": label, "source": source, "created_at": now})
+                 for message, label in items]
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(line + "\n" for line in lines))
+        return len(lines)
+
+    def fetch(self, after_id: int = 0, limit: int = 10000) -> List[Tuple[int, str, int]]:
+        rows = []
+        if not os.path.exists(self.path):
+            return rows
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if line_number <= after_id or not line.strip():
+                    continue
+                item = json.loads(line)
+                rows.append((line_number, str(item["message"]), parse_label(item["label"])))
+                if len(rows) >= limit:
+                    break
+        return rows
+
+    def count(self, after_id: int = 0) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            return sum(1 for line_number, line in enumerate(f, start=1) if line_number > after_id and line.strip())
+
+
+def open_feedback_store(path: str):
+    """A JSONLFeedbackStore for .jsonl paths, otherwise a SQLiteFeedbackStore."""
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        return JSONLFeedbackStore(path)
+    return SQLiteFeedbackStore(path)
+
+
+class OnlineLearner:
+    """
+    Applies feedback to a ScamDetectionModel with mini-batch SGD on the log loss.
+
+    learning_rate is the step size on the mean gradient of a batch; anchor is
+    the strength of the L2 pull towards the trained model's weights. Each
+    update makes epochs passes over the new feedback in batches of batch_size,
+    with the classes weighted to balance each update. Only the newest
+    keep_checkpoints checkpoints are kept on disk.
+    """
+
+    def __init__(self, model: ScamDetectionModel, store, checkpoint_dir: str = "model/online",
+                 learning_rate: float = 0.2, anchor: float = 0.01, epochs: int = 5, batch_size: int = 64,
+                 canary: Optional[List[Tuple[str, int]]] = None, min_canary_accuracy: float = 1.0,
+                 keep_checkpoints: int = 5):
+        self.model = model
+        self.store = store
+        self.checkpoint_dir = checkpoint_dir
+        self.learning_rate = learning_rate
+        self.anchor = anchor
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.canary = canary
+        self.min_canary_accuracy = min_canary_accuracy
+        self.keep_checkpoints = keep_checkpoints
+
+        self._lock = threading.Lock()
+        # Feedback rows up to this id have been applied (or rejected) to the
+        # trained model with source version _cursor_base
+        self.cursor = 0
+        self._cursor_base: Optional[str] = None
+        self.version = 0
+        self.updates = 0
+        self.rejected = 0
+        self.samples = 0
+        self.last_update: Optional[dict] = None
+        # (source version, coef, intercept) of the trained model being anchored to
+        self._base = None
+
+    def restore(self) -> Optional[dict]:
+        """
+        Load the latest checkpoint if it was trained from the model that is
+        loaded now. Otherwise only its version number is kept and the
+        feedback cursor stays at the start, so the retrained model gets every
+        stored correction.
+
+        Returns:
+            dict: the checkpoint's meta.json, or None when there is none
+        """
+        with self._lock:
+            latest = self._latest_checkpoint()
+            if latest is None:
+                return None
+            path, meta = latest
+            self.version = meta["version"]
+            if meta["base_version"] != self.model.source_version:
+                print(f"⚠️  Online checkpoint v{meta['version']} was trained from model "
+                      f"{meta['base_version']}, not {self.model.source_version}; not restored, "
+                      f"feedback will be applied again from the start")
+                return meta
+            self.cursor = meta["feedback_cursor"]
+            self._cursor_base = meta["base_version"]
+            self._base_weights()
+            coef = np.load(os.path.join(path, "coef.npy"), mmap_mode="r")
+            try:
+                self.model.update_weights(coef, meta["intercept"], meta["model_version"],
+                                          self.canary, self.min_canary_accuracy)
+            except ModelReloadError as e:
+                print(f"⚠️  Online checkpoint v{meta['version']} not restored: {e}")
+                return meta
+            print(f"✅ Online weights restored: {meta['model_version']}")
+            return meta
+
+    def add_feedback(self, items: Iterable[Tuple[str, object]], source: Optional[str] = None) -> int:
+        """Validate and store (message, label) feedback; returns how many were stored."""
+        rows = []
+        for message, label in items:
+            message = str(message).strip()
+            if not message:
+                raise ValueError("Feedback messages cannot be empty")
+            rows.append((message, parse_label(label)))
+        return self.store.add(rows, source)
+
+    def pending(self) -> int:
+        with self._lock:
+            self._rewind_if_rebased()
+            return self.store.count(self.cursor)
+
+    def _rewind_if_rebased(self):
+        """Start the feedback over when a retrained model was loaded since the last update."""
+        if self._cursor_base is not None and self._cursor_base != self.model.source_version:
+            print(f"↩️  Model retrained ({self._cursor_base} -> {self.model.source_version}); "
+                  f"applying feedback again from the start")
+            self.cursor = 0
+            self._cursor_base = None
+
+    def update(self, limit: int = 10000) -> dict:
+        """
+        Apply up to limit feedback rows received since the last update.
+
+        The new weights must pass the canary check before they are swapped in.
+        If they don't, the rows are skipped (counted in rejected) so one bad
+        batch doesn't block later feedback.
+
+        Returns:
+            dict: updated, samples, model_version, loss_before/loss_after on the
+            feedback, pending rows left
+        """
+        with self._lock:
+            self._rewind_if_rebased()
+            rows = self.store.fetch(self.cursor, limit)
+            if not rows:
+                return {"updated": False, "samples": 0, "model_version": self.model.model_version,
+                        "pending": 0}
+
+            weights = self.model.linear_weights()
+            if weights is None:
+                raise ModelReloadError("Online updates need a loaded binary linear model")
+            base_coef, base_intercept = self._base_weights()
+            coef, intercept = weights
+            coef = np.array(coef, dtype=np.float64)
+
+            cleaned = list(TextPreprocessor.clean_many([message for _, message, _ in rows]))
+            X = self.model.vectorizer.transform(cleaned).tocsr()
+            y = np.array([label for _, _, label in rows], dtype=np.float64)
+
+            loss_before = _log_loss(X, y, coef, intercept)
+            intercept = self._sgd(X, y, coef, intercept, base_coef, base_intercept)
+            loss_after = _log_loss(X, y, coef, intercept)
+
+            version = self.version + 1
+            model_version = f"{self.model.source_version}+online{version}"
+            cursor = rows[-1][0]
+            try:
+                swap = self.model.update_weights(coef, intercept, model_version,
+                                                 self.canary, self.min_canary_accuracy)
+            except ModelReloadError as e:
+                self.cursor = cursor
+                self._cursor_base = self.model.source_version
+                self.rejected += len(rows)
+                self.last_update = {"updated": False, "samples": len(rows), "error": str(e),
+                                    "at": time.time()}
+                print(f"⚠️  Online update rejected: {e}")
+                raise
+
+            meta = {
+                "version": version,
+                "model_version": model_version,
+                "base_version": self.model.source_version,
+                "intercept": intercept,
+                "feedback_cursor": cursor,
+                "samples": len(rows),
+                "loss_before": loss_before,
+                "loss_after": loss_after,
+                "canary_accuracy": swap["canary_accuracy"],
+                "created_at": time.time(),
+            }
+            _write_artifact(os.path.join(self.checkpoint_dir, f"v{version:06d}"), meta, {"coef": coef})
+            self._prune_checkpoints()
+
+            self.version = version
+            self.cursor = cursor
+            self._cursor_base = meta["base_version"]
+            self.updates += 1
+            self.samples += len(rows)
+            self.last_update = {"updated": True, "samples": len(rows), "model_version": model_version,
+                                "at": meta["created_at"]}
+            print(f"✅ Online update: {swap['previous_version']} -> {model_version} "
+                  f"({len(rows)} samples, loss {loss_before:.4f} -> {loss_after:.4f})")
+            return {
+                "updated": True,
+                "samples": len(rows),
+                "previous_version": swap["previous_version"],
+                "model_version": model_version,
+                "loss_before": round(loss_before, 6),
+                "loss_after": round(loss_after, 6),
+                "canary_accuracy": swap["canary_accuracy"],
+                "pending": self.store.count(cursor),
+            }
+
+    def watch(self, interval: float = 60.0, on_update=None):
+        """
+        Apply pending feedback every interval seconds in a background thread.
+
+        on_update is called after each applied update (e.g. to recycle forked
+        inference workers).
+        """
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    if self.pending() and self.update()["updated"] and on_update is not None:
+                        on_update()
+                except Exception as e:
+                    print(f"⚠️  Online learning failed: {e}")
+
+        threading.Thread(target=run, name="online-learning", daemon=True).start()
+
+    def _base_weights(self) -> Tuple[np.ndarray, float]:
+        """Weights of the trained model the current online weights started from."""
+        source_version = self.model.source_version
+        if self._base is None or self._base[0] != source_version:
+            if self.model.model_version == source_version:
+                weights = self.model.linear_weights()
+            else:
+                # Online weights are already loaded: read the base from disk
+                base = ScamDetectionModel(self.model.model_path, self.model.vectorizer_path, cache_size=0,
+                                          artifact_dir=self.model.artifact_dir)
+                if base.source_version != source_version:
+                    raise ModelReloadError("The model files changed since they were loaded; reload first")
+                weights = base.linear_weights()
+            self._base = (source_version,) + weights
+        return self._base[1], self._base[2]
+
+    def _sgd(self, X, y: np.ndarray, coef: np.ndarray, intercept: float,
+             base_coef: np.ndarray, base_intercept: float) -> float:
+        """Update coef in place; returns the new intercept."""
+        positives = y.sum()
+        if 0 < positives < len(y):
+            sample_weight = np.where(y == 1, len(y) / (2 * positives), len(y) / (2 * (len(y) - positives)))
+        else:
+            sample_weight = np.ones(len(y))
+
+        # Fixed seed: the same feedback always gives the same weights
+        rng = np.random.default_rng(self.version + 1)
+        for _ in range(self.epochs):
+            order = rng.permutation(len(y))
+            for start in range(0, len(y), self.batch_size):
+                rows = order[start:start + self.batch_size]
+                X_batch = X[rows]
+                weight = sample_weight[rows]
+                error = (expit(X_batch @ coef + intercept) - y[rows]) * weight / weight.sum()
+                coef -= self.learning_rate * (X_batch.T @ error + self.anchor * (coef - base_coef))
+                intercept -= self.learning_rate * (error.sum() + self.anchor * (intercept - base_intercept))
+        return float(intercept)
+
+    def _checkpoint_names(self) -> List[str]:
+        """Checkpoint names (v000001, ...), oldest first."""
+        if not os.path.isdir(self.checkpoint_dir):
+            return []
+        return sorted(name for name in os.listdir(self.checkpoint_dir)
+                      if name.startswith("v") and name[1:].isdigit())
+
+    def _prune_checkpoints(self):
+        """Remove all but the newest keep_checkpoints checkpoints and their versioned directories."""
+        for name in self._checkpoint_names()[:-self.keep_checkpoints]:
+            path = os.path.join(self.checkpoint_dir, name)
+            if os.path.islink(path):
+                os.remove(path)
+            else:
+                shutil.rmtree(path, ignore_errors=True)
+            for entry in os.listdir(self.checkpoint_dir):
+                if entry.startswith(f"{name}.v"):
+                    shutil.rmtree(os.path.join(self.checkpoint_dir, entry), ignore_errors=True)
+
+    def _latest_checkpoint(self) -> Optional[Tuple[str, dict]]:
+        for name in reversed(self._checkpoint_names()):
+            path = os.path.join(self.checkpoint_dir, name)
+            try:
+                with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+                    return path, json.load(f)
+            except (OSError, ValueError):
+                continue  # Partially written or damaged; try the one before
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "updates": self.updates,
+            "rejected": self.rejected,
+            "samples": self.samples,
+            "cursor": self.cursor,
+            "last_update": self.last_update,
+        }
+
+
+def _log_loss(X, y: np.ndarray, coef: np.ndarray, intercept: float) -> float:
+    probability = np.clip(expit(X @ coef + intercept), 1e-15, 1 - 1e-15)
+    return float(-np.mean(y * np.log(probability) + (1 - y) * np.log(1 - probability)))
@@ -0,0 +1,370 @@
+"""
+Cheap pre-filter cascade that runs in front of the full model.
+
+Each tier looks at the raw message in time linear in its length and either
+decides it (Scam or Legit) or passes it on. Only messages that no tier
+decides are cleaned, vectorized and scored by the model:
+
+1. domains: the hosts of links (with or without a scheme) and email
+   addresses, taken from the raw text before clean_text strips them, are
+   checked against a blocklist (a hit means Scam). Allowlisted links are
+   ignored by the next tier.
+2. features: handcrafted thresholds. A short message is Legit if it has no
+   untrusted links or email addresses, no money symbols, few digits, low
+   caps, at most one "!" and none of the scam or lure keywords. A message
+   is Scam if it has an untrusted link plus keywords from at least
+   min_scam_groups of the keyword groups.
+
+Tiers are configured with a JSON file (PREFILTER_CONFIG) that overrides the
+defaults below per tier, e.g.
+
+    {"enabled": true,
+     "domains": {"blocklist_file": "model/domain_blocklist.txt", "allowlist": ["mybank.com"]},
+     "features": {"max_words": 12, "scam": false}}
+
+The cascade is off by default, because settled messages get a tier's fixed
+probability and rule-based explanations instead of the model's. Enable it
+with "enabled": true or PREFILTER_ENABLED=1.
+"""
+
+import json
+import re
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from text_preprocessor import (DOTTED_RE, EMAIL_DOMAIN_RE, LINK_RE, TextPreprocessor, fold_leetspeak,
+                               normalize_host, normalize_unicode)
+
+DEFAULT_CONFIG = {
+    # Opt-in, see the module docstring
+    "enabled": False,
+    "domains": {
+        "enabled": True,
+        # Domains (matching subdomains too) or URL prefixes such as "bit.ly/3xYz"
+        "blocklist": [],
+        "allowlist": [],
+        # Plain text files with one entry per line ("#" starts a comment)
+        "blocklist_file": None,
+        "allowlist_file": None,
+        "scam_probability": 99.0,
+    },
+    "features": {
+        "enabled": True,
+        "legit": True,
+        "max_chars": 160,
+        "max_words": 20,
+        "max_digits": 4,
+        "max_exclamations": 1,
+        "max_caps_ratio": 0.3,
+        # Words that keep a message away from the Legit shortcut on top of the
+        # scam keyword groups (lures with no urgency or money wording)
+        "lure_keywords": ["account", "bank", "password", "refund", "payment", "transfer", "wire",
+                          "package", "delivery", "lottery", "inheritance", "loan", "invest",
+                          "bitcoin", "crypto", "gift card", "beautiful", "handsome", "dear",
+                          "lonely", "profile", "opportunity", "earn", "guaranteed"],
+        "legit_probability": 1.0,
+        "scam": True,
+        "min_scam_groups": 3,
+        "scam_probability": 95.0,
+    },
+}
+
+TIERS = ("domains", "features")
+
+_DIGIT_RE = re.compile(r'[0-9]')
+_MONEY_SYMBOLS = ('$', '£', '€', '₹')
+_LEGIT_EXPLANATIONS = ("No urgency-indicating words detected", "Few or no monetary references",
+                       "No suspicious phrases detected")
+
+# (prediction, probability, explanations, tier)
+Decision = Tuple[str, float, Tuple[str, ...], str]
+
+
+def decision_result(decision: Decision, explain: bool) -> Tuple[str, float, List[str], List[dict]]:
+    """Turn a Decision into a (prediction, probability, explanations, top_terms) result."""
+    prediction, probability, explanations, _ = decision
+    return prediction, probability, list(explanations) if explain else [], []
+
+
+def decision_holds(decision: Decision, threshold: float) -> bool:
+    """
+    Whether a tier's decision stands at a Scam threshold (0-100). A tier's
+    fixed probability on the other side of a tenant's threshold leaves the
+    message to the model.
+    """
+    return (decision[1] >= threshold) == (decision[0] == "Scam")
+
+
+def read_list_file(path: str) -> List[str]:
+    """Read one entry per line, skipping blank lines and # comments."""
+    with open(path, encoding='utf-8') as f:
+        return [line.split('#', 1)[0].strip() for line in f if line.split('#', 1)[0].strip()]
+
+
+def load_prefilter_config(path: Optional[str]) -> dict:
+    """
+    Read a cascade configuration from a JSON file, falling back to the defaults.
+
+    Returns:
+        dict: DEFAULT_CONFIG with the file's settings applied per tier
+    """
+    config = {key: dict(value) if isinstance(value, dict) else value for key, value in DEFAULT_CONFIG.items()}
+    if not path:
+        return config
+    with open(path, encoding='utf-8') as f:
+        loaded = json.load(f)
+    if not isinstance(loaded, dict):
+        raise ValueError(f"Pre-filter config {path} must contain a JSON object")
+    for key, value in loaded.items():
+        if key in TIERS:
+            if not isinstance(value, dict):
+                raise ValueError(f"Pre-filter tier '{key}' in {path} must be a JSON object")
+            unknown = set(value) - set(DEFAULT_CONFIG[key])
+            if unknown:
+                raise ValueError(f"Unknown settings for pre-filter tier '{key}': {sorted(unknown)}")
+            config[key].update(value)
+        elif key == "enabled":
+            config[key] = bool(value)
+        else:
+            raise ValueError(f"Unknown pre-filter setting '{key}' in {path}")
+    return config
+
+
+def keyword_pattern(keywords: Sequence[str]):
+    """
+    Compile keywords into one regex shaped like their trie ("c(?:all|l(?:aim|ick))").
+
+    A plain "a|b|c" alternation retries every keyword at every position; the
+    trie shape follows a single branch per character, which makes the search
+    about twice as fast for the keyword lists used here.
+
+    Returns:
+        re.Pattern or None when keywords is empty
+    """
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+    if not trie:
+        return None
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A keyword ends here, so the longer continuations are optional
+        return f'(?:{body})?' if '' in node else body
+
+    return re.compile(build(trie))
+
+
+class DomainList:
+    """
+    Set of domains and URL prefixes.
+
+    A domain entry matches the domain itself and every subdomain; an entry
+    with a path ("bit.ly/3xYz") matches links on that host whose path starts
+    with it. Lookups cost one set probe per label of the host.
+    """
+
+    def __init__(self, entries: Sequence[str] = ()):
+        self.domains = set()
+        self.prefixes: Dict[str, Tuple[str, ...]] = {}
+        for entry in entries:
+            entry = re.sub(r'^[a-z]+://', '', entry.strip().lower())
+            host, slash, path = entry.partition('/')
+            host = normalize_host(host)
+            if not host:
+                continue
+            if slash and path:
+                self.prefixes[host] = self.prefixes.get(host, ()) + ('/' + path,)
+            else:
+                self.domains.add(host)
+
+    def __len__(self) -> int:
+        return len(self.domains) + sum(len(paths) for paths in self.prefixes.values())
+
+    def match(self, host: str, path: str = "") -> Optional[str]:
+        """Return the entry that matches host (and path), or None."""
+        paths = self.prefixes.get(host)
+        if paths and path:
+            for prefix in paths:
+                if path.startswith(prefix):
+                    return host + prefix
+        domains = self.domains
+        if not domains:
+            return None
+        while True:
+            if host in domains:
+                return host
+            dot = host.find('.')
+            if dot < 0:
+                return None
+            host = host[dot + 1:]
+
+
+class PrefilterCascade:
+    """
+    Runs the pre-filter tiers on raw messages and counts their decisions.
+
+    check() returns a Decision for messages a tier settles, or None when
+    the message has to go to the model.
+    """
+
+    def __init__(self, config: Optional[dict] = None, keyword_groups: Optional[Dict[str, List[str]]] = None):
+        self.config = config or load_prefilter_config(None)
+        self.enabled = bool(self.config["enabled"])
+        self.domains_config = self.config["domains"]
+        self.features_config = self.config["features"]
+
+        domains = self.domains_config
+        self.blocklist = DomainList(list(domains["blocklist"]) +
+                                    (read_list_file(domains["blocklist_file"]) if domains["blocklist_file"] else []))
+        self.allowlist = DomainList(list(domains["allowlist"]) +
+                                    (read_list_file(domains["allowlist_file"]) if domains["allowlist_file"] else []))
+
+        # Keyword groups as regexes, so the checks run in the regex engine
+        # instead of a Python loop; matched as substrings of the lower-cased
+        # text, like KeywordMatcher
+        groups = keyword_groups or TextPreprocessor.keyword_matcher.groups
+        keyword_groups_of: Dict[str, set] = {}
+        for group, keywords in enumerate(groups.values()):
+            for keyword in keywords:
+                keyword_groups_of.setdefault(keyword, set()).add(group)
+        # One scan finds one keyword per position, so a match also counts for
+        # every keyword inside it ("you have won" -> "won")
+        self._keyword_groups = {
+            keyword: frozenset().union(*(found for other, found in keyword_groups_of.items() if other in keyword))
+            for keyword in keyword_groups_of
+        }
+        self._group_keyword = keyword_pattern(list(keyword_groups_of))
+        self._any_keyword = keyword_pattern(
+            list(keyword_groups_of) + [keyword.lower() for keyword in self.features_config["lure_keywords"]])
+
+        # Settings read on every message
+        features = self.features_config
+        self._domains_enabled = bool(self.domains_config["enabled"])
+        self._features_enabled = bool(features["enabled"])
+        self._legit_enabled = self._features_enabled and bool(features["legit"])
+        self._scam_enabled = self._features_enabled and bool(features["scam"])
+        self._max_chars = features["max_chars"]
+        self._max_words = features["max_words"]
+        self._max_digits = features["max_digits"]
+        self._max_exclamations = features["max_exclamations"]
+        self._max_caps_ratio = features["max_caps_ratio"]
+        self._min_scam_groups = features["min_scam_groups"]
+
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.passed = 0
+        # (tier, prediction) -> messages settled; the domain tier only ever says Scam
+        self.decisions = {("domains", "Scam"): 0, ("features", "Scam"): 0, ("features", "Legit"): 0}
+
+    def check(self, text: str) -> Optional[Decision]:
+        """Run the tiers on one raw message."""
+        return self.check_many([text])[0]
+
+    def check_many(self, texts: Sequence[str]) -> List[Optional[Decision]]:
+        """Run the tiers on each raw message, counting the outcomes once for the batch."""
+        if not self.enabled:
+            return [None] * len(texts)
+        decisions = [self._decide(text) for text in texts]
+        with self._lock:
+            self.checked += len(decisions)
+            for decision in decisions:
+                if decision is None:
+                    self.passed += 1
+                else:
+                    self.decisions[(decision[3], decision[0])] += 1
+        return decisions
+
+    def _decide(self, text: str) -> Optional[Decision]:
+        if not text or not text.strip():
+            return None  # The model path answers empty input
+        # Same homoglyph folding as clean_text, so lookalike links and keywords still match
+        text = normalize_unicode(text)
+        lowered = text.lower()
+
+        # Tier 1: link and email domains
+        untrusted_links = 0
+        if DOTTED_RE.search(lowered):
+            for match in LINK_RE.finditer(lowered):
+                host, path = normalize_host(match.group(1)), match.group(2) or ""
+                if self._domains_enabled:
+                    listed = self.blocklist.match(host, path)
+                    if listed is not None:
+                        return ("Scam", float(self.domains_config["scam_probability"]),
+                                (f"Links to blocklisted domain {listed}",), "domains")
+                    if self.allowlist.match(host, path) is not None:
+                        continue
+                untrusted_links += 1
+            if self._domains_enabled and '@' in lowered:
+                for match in EMAIL_DOMAIN_RE.finditer(lowered):
+                    listed = self.blocklist.match(normalize_host(match.group(1)))
+                    if listed is not None:
+                        return ("Scam", float(self.domains_config["scam_probability"]),
+                                (f"Email address at blocklisted domain {listed}",), "domains")
+
+        # Tier 2: handcrafted features
+        if untrusted_links:
+            if self._scam_enabled and self._group_keyword is not None:
+                keyword_groups = self._keyword_groups
+                groups = set()
+                for match in self._group_keyword.finditer(fold_leetspeak(lowered)):
+                    groups |= keyword_groups[match.group()]
+                if len(groups) >= self._min_scam_groups:
+                    return ("Scam", float(self.features_config["scam_probability"]),
+                            (f"Contains a link together with wording from {len(groups)} scam keyword groups",),
+                            "features")
+        elif self._legit_enabled:
+            return self._check_legit(text, lowered)
+        return None
+
+    def _check_legit(self, text: str, lowered: str) -> Optional[Decision]:
+        # Cheapest checks first; most messages fail one of them
+        if len(text) > self._max_chars or '@' in text:
+            return None
+        if any(symbol in text for symbol in _MONEY_SYMBOLS):
+            return None
+        if text.count('!') > self._max_exclamations:
+            return None
+        word_count = len(text.split())
+        if word_count > self._max_words:
+            return None
+        if self._any_keyword is not None and self._any_keyword.search(fold_leetspeak(lowered)):
+            return None
+        if _DIGIT_RE.search(text) and sum(map(str.isdigit, text)) > self._max_digits:
+            return None
+        if sum(map(str.isupper, text)) > self._max_caps_ratio * len(text):
+            return None
+        explanations = _LEGIT_EXPLANATIONS
+        if word_count > 10:
+            explanations += ("Message has sufficient contextual length",)
+        return "Legit", float(self.features_config["legit_probability"]), explanations, "features"
+
+    def stats(self) -> dict:
+        """Return per-tier decision counts and the share of messages that skipped the model."""
+        with self._lock:
+            decided = self.checked - self.passed
+            return {
+                "enabled": self.enabled,
+                "checked": self.checked,
+                "short_circuited": decided,
+                "short_circuit_rate": round(decided / self.checked, 4) if self.checked else 0.0,
+                "tiers": {
+                    "domains": {
+                        "enabled": bool(self.domains_config["enabled"]),
+                        "blocklist_entries": len(self.blocklist),
+                        "allowlist_entries": len(self.allowlist),
+                        "scam": self.decisions[("domains", "Scam")],
+                    },
+                    "features": {
+                        "enabled": bool(self.features_config["enabled"]),
+                        "legit": self.decisions[("features", "Legit")],
+                        "scam": self.decisions[("features", "Scam")],
+                    },
+                },
+            }
@@ -0,0 +1,338 @@
+"""
+Domain and phone number reputation index.
+
+clean_text drops links, email addresses and phone numbers before
+vectorization, although they are the strongest scam signals there are. This
+module scores them separately: TextPreprocessor.extract_indicators pulls the
+normalized domains and phone numbers out of the raw message, and each one is
+looked up in an on-disk index of known indicators with a score from 0 (known
+good) to 1 (known bad).
+
+The index is a directory in the model artifact layout (see model_artifact.py):
+
+    meta.json    format version, entry counts, logit_weight, build time, sources
+    keys.npy     uint64 sorted 64-bit hashes of "d:<domain>" / "p:<digits>"
+    scores.npy   float32 score of each key
+
+The arrays are memory-mapped and searched with np.searchsorted. That is one
+binary search per lookup, and the index can hold tens of millions of entries
+while its pages stay shared by every worker process. The builder writes a
+new versioned directory and atomically repoints the index symlink at it
+(model_artifact._write_artifact). A running server picks up the
+new index on reload (ScamDetectionModel.reload) by swapping one reference.
+
+Build an index from CSV files (indicator[,score][,type]) or plain lists:
+
+    python reputation_index.py feeds/bad_domains.txt feeds/phones.csv --output model/reputation
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from model_artifact import META_FILE, _write_artifact, resolve_artifact_dir
+from text_preprocessor import TextPreprocessor, normalize_host, normalize_phone
+
+FORMAT_VERSION = 1
+
+# Logit added to the model's decision for an indicator with score 1 (and
+# subtracted for score 0); indicators at 0.5 are neutral
+DEFAULT_LOGIT_WEIGHT = 4.0
+
+
+def indicator_key(kind: str, value: str) -> int:
+    """64-bit hash of a normalized indicator ("domain" or "phone")."""
+    digest = hashlib.blake2b(f"{kind[0]}:{value}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _parent_domains(domain: str) -> List[str]:
+    """The domain and each parent down to two labels: a.b.evil.com -> [a.b.evil.com, b.evil.com, evil.com]."""
+    domains = [domain]
+    while domain.count('.') > 1:
+        domain = domain[domain.index('.') + 1:]
+        domains.append(domain)
+    return domains
+
+
+class ReputationIndex:
+    """
+    Memory-mapped indicator -> score lookup that can be swapped while serving.
+
+    A missing index directory is an empty index, so the reputation stage can
+    stay wired in before the first index is built.
+    """
+
+    def __init__(self, index_dir: str = "model/reputation"):
+        self.index_dir = index_dir
+        self._reload_lock = threading.Lock()
+        # (keys, scores, meta, signature), replaced as a whole on reload
+        try:
+            self._table = self._load()
+        except Exception as e:
+            # Serve without reputation rather than not at all; reload retries
+            print(f"⚠️  Reputation index {index_dir} not loaded: {e}")
+            self._table = (None, None, {}, (None, None))
+        if self.loaded:
+            print(f"✅ Reputation index loaded: {self._table[2].get('entries', 0)} entries "
+                  f"(version {self.version})")
+
+    @property
+    def loaded(self) -> bool:
+        return self._table[0] is not None
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._table[2].get("version")
+
+    @property
+    def logit_weight(self) -> float:
+        return float(self._table[2].get("logit_weight", DEFAULT_LOGIT_WEIGHT))
+
+    def signature(self) -> Tuple:
+        """Size and modification time of meta.json, to detect a rebuilt index."""
+        try:
+            stat = os.stat(os.path.join(self.index_dir, META_FILE))
+            return stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return None, None
+
+    def _load(self) -> tuple:
+        signature = self.signature()
+        if signature[0] is None:
+            return None, None, {}, signature
+        # Read every file from the version the index link points to now
+        index_dir = resolve_artifact_dir(self.index_dir)
+        with open(os.path.join(index_dir, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported reputation index format version: {meta.get('format_version')}")
+        keys = np.load(os.path.join(index_dir, "keys.npy"), mmap_mode="r")
+        scores = np.load(os.path.join(index_dir, "scores.npy"), mmap_mode="r")
+        if len(keys) != len(scores):
+            raise ValueError(f"Reputation index {self.index_dir} has {len(keys)} keys but {len(scores)} scores")
+        return keys, scores, meta, signature
+
+    def reload(self) -> bool:
+        """
+        Map the index again if it was rebuilt since it was loaded.
+
+        Lookups already running finish on the old arrays; the old files stay
+        readable until their last mapping is dropped.
+
+        Returns:
+            bool: whether a new index was swapped in
+        """
+        with self._reload_lock:
+            table = self.load_changed()
+            if table is None:
+                return False
+            self.swap_in(table)
+            return True
+
+    def load_changed(self) -> Optional[tuple]:
+        """
+        Map the index if it was rebuilt since it was loaded, without serving it yet.
+
+        Lets a caller validate something else first (see
+        ScamDetectionModel.reload) and then call swap_in.
+
+        Returns:
+            tuple: the new index for swap_in, or None when it is unchanged
+        """
+        if self.signature() == self._table[3]:
+            return None
+        return self._load()
+
+    def swap_in(self, table: tuple):
+        """Start serving an index returned by load_changed."""
+        # Single reference assignment: atomic for concurrent lookups
+        self._table = table
+        print(f"✅ Reputation index loaded: {table[2].get('entries', 0)} entries "
+              f"(version {table[2].get('version')})")
+
+    def lookup(self, text: str) -> List[Tuple[str, float]]:
+        """Known indicators in a raw message, as (indicator, score) pairs."""
+        return self.lookup_many([text])[0]
+
+    def lookup_many(self, texts: Sequence[str],
+                    indicators: Optional[Sequence[Dict[str, List[str]]]] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Known indicators of each raw message, with one searchsorted call for the batch.
+
+        A subdomain without its own entry takes the score of its closest
+        listed parent domain. Callers that already ran
+        TextPreprocessor.extract_indicators pass its output as indicators.
+
+        Returns:
+            list: per text, (indicator, score) pairs for the indicators found
+        """
+        keys, scores, _, _ = self._table
+        if keys is None or not len(keys):
+            return [[] for _ in texts]
+
+        # (text index, indicator, candidate keys most specific first)
+        probes = []
+        probe_keys = []
+        for i, text in enumerate(texts):
+            text_indicators = (TextPreprocessor.extract_indicators(text) if indicators is None
+                                else indicators[i])
+            for domain in text_indicators["domains"]:
+                candidates = [indicator_key("domain", parent) for parent in _parent_domains(domain)]
+                probes.append((i, domain, len(probe_keys), len(candidates)))
+                probe_keys.extend(candidates)
+            for phone in text_indicators["phones"]:
+                probes.append((i, phone, len(probe_keys), 1))
+                probe_keys.append(indicator_key("phone", phone))
+
+        results: List[List[Tuple[str, float]]] = [[] for _ in texts]
+        if not probe_keys:
+            return results
+        wanted = np.array(probe_keys, dtype=np.uint64)
+        positions = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+        found = keys[positions] == wanted
+        for i, indicator, start, count in probes:
+            for offset in range(start, start + count):
+                if found[offset]:
+                    results[i].append((indicator, float(scores[positions[offset]])))
+                    break
+        return results
+
+    def logit(self, hits: List[Tuple[str, float]]) -> float:
+        """
+        Logit contribution of a message's known indicators: the worst score
+        mapped to [-logit_weight, +logit_weight].
+        """
+        if not hits:
+            return 0.0
+        return self.logit_weight * (2.0 * max(score for _, score in hits) - 1.0)
+
+    def stats(self) -> dict:
+        keys, _, meta, _ = self._table
+        return {
+            "loaded": keys is not None,
+            "index_dir": self.index_dir,
+            "version": meta.get("version"),
+            "entries": int(len(keys)) if keys is not None else 0,
+            "logit_weight": self.logit_weight,
+            "built_at": meta.get("built_at"),
+        }
+
+
+def read_indicators(path: str, default_score: float, chunk_size: int = 1_000_000) -> Iterator[pd.DataFrame]:
+    """
+    Yield (indicator, score, type) frames from a CSV file or a plain list.
+
+    CSV files (.csv) need an "indicator" column and may have "score" (0-1)
+    and "type" ("domain" or "phone") columns. Other files hold one indicator
+    per line ("#" starts a comment). Missing scores are default_score, and
+    missing types are guessed (anything with a letter and a dot is a domain).
+    """
+    if path.lower().endswith(".csv"):
+        chunks = pd.read_csv(path, chunksize=chunk_size, dtype={"indicator": str, "type": str})
+    else:
+        chunks = pd.read_csv(path, chunksize=chunk_size, header=None, names=["indicator"], comment="#",
+                             dtype=str, skip_blank_lines=True, sep="\t", quoting=3)
+    for chunk in chunks:
+        if "indicator" not in chunk:
+            raise ValueError(f"{path} has no 'indicator' column")
+        chunk = chunk.dropna(subset=["indicator"])
+        indicators = chunk["indicator"].str.strip()
+        scores = chunk["score"].astype(float) if "score" in chunk else pd.Series(default_score, index=chunk.index)
+        if "type" in chunk:
+            types = chunk["type"].fillna("").str.strip().str.lower()
+        else:
+            types = pd.Series("", index=chunk.index)
+        guessed = indicators.str.contains(r"[A-Za-z]", regex=True) & indicators.str.contains(".", regex=False)
+        types = types.where(types != "", np.where(guessed, "domain", "phone"))
+        yield pd.DataFrame({"indicator": indicators, "score": scores.fillna(default_score), "type": types})
+
+
+def _normalize_indicator(indicator: str, kind: str) -> str:
+    if kind == "domain":
+        # Accept full URLs and email addresses as well as bare hosts
+        host = indicator.lower().split("://", 1)[-1].split("/", 1)[0].rsplit("@", 1)[-1]
+        return normalize_host(host.split(":", 1)[0])
+    if kind == "phone":
+        return normalize_phone(indicator)
+    raise ValueError(f"Unknown indicator type {kind!r} (use domain or phone)")
+
+
+def build_index(sources: Iterable[str], output_dir: str = "model/reputation", default_score: float = 1.0,
+                logit_weight: float = DEFAULT_LOGIT_WEIGHT) -> dict:
+    """
+    Build a reputation index from indicator files and swap it into output_dir.
+
+    Duplicate indicators keep their highest score.
+
+    Returns:
+        dict: the index's meta.json
+    """
+    started = time.perf_counter()
+    sources = list(sources)
+    key_chunks: List[np.ndarray] = []
+    score_chunks: List[np.ndarray] = []
+    counts: Dict[str, int] = {"domain": 0, "phone": 0}
+    skipped = 0
+
+    for source in sources:
+        for frame in read_indicators(source, default_score):
+            keys = np.empty(len(frame), dtype=np.uint64)
+            valid = np.ones(len(frame), dtype=bool)
+            for row, (indicator, kind) in enumerate(zip(frame["indicator"], frame["type"])):
+                value = _normalize_indicator(indicator, kind)
+                if not value:
+                    valid[row] = False
+                    continue
+                keys[row] = indicator_key(kind, value)
+                counts[kind] += 1
+            skipped += int((~valid).sum())
+            key_chunks.append(keys[valid])
+            score_chunks.append(np.clip(frame["score"].to_numpy(dtype=np.float32)[valid], 0.0, 1.0))
+        print(f"   {source}: {counts['domain']} domains, {counts['phone']} phone numbers so far")
+
+    keys = np.concatenate(key_chunks) if key_chunks else np.empty(0, dtype=np.uint64)
+    scores = np.concatenate(score_chunks) if score_chunks else np.empty(0, dtype=np.float32)
+    order = np.argsort(keys, kind="stable")
+    keys, scores = keys[order], scores[order]
+    if len(keys):
+        # One entry per key, keeping the highest score
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        keys, scores = keys[starts], np.maximum.reduceat(scores, starts)
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "version": hashlib.blake2b(keys.tobytes() + scores.tobytes(), digest_size=6).hexdigest(),
+        "entries": int(len(keys)),
+        "domains": counts["domain"],
+        "phones": counts["phone"],
+        "skipped": skipped,
+        "logit_weight": logit_weight,
+        "built_at": time.time(),
+        "sources": [os.path.abspath(source) for source in sources],
+    }
+    _write_artifact(output_dir, meta, {"keys": keys, "scores": scores.astype(np.float32)})
+    print(f"✅ Reputation index: {len(keys)} entries written to {output_dir} "
+          f"in {time.perf_counter() - started:.1f}s")
+    return meta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the domain / phone number reputation index")
+    parser.add_argument("sources", nargs="+",
+                        help="CSV files (indicator[,score][,type]) or plain lists, one indicator per line")
+    parser.add_argument("--output", default="model/reputation", help="index directory (swapped in atomically)")
+    parser.add_argument("--default-score", type=float, default=1.0,
+                        help="score of entries without one (1 = known bad, 0 = known good)")
+    parser.add_argument("--logit-weight", type=float, default=DEFAULT_LOGIT_WEIGHT,
+                        help="logit added to the model's decision for a score-1 indicator")
+    args = parser.parse_args()
+
+    build_index(args.sources, args.output, default_score=args.default_score, logit_weight=args.logit_weight)
@@ -0,0 +1,282 @@
+"""
+Offline bulk scoring of CSV or Parquet files.
+
+Reads the input in chunks (the same "message" column layout as
+dataset/scam_dataset.csv), scores every chunk with one vectorized
+ScamDetectionModel.predict_batch call on a pool of worker processes, and
+appends prediction and probability columns to an output CSV in input order.
+
+After every chunk the output is flushed and a checkpoint records how many
+rows are done, so an interrupted run continues where it stopped with
+--resume.
+
+Usage:
+    python score_file.py ../dataset/scam_dataset.csv predictions.csv
+    python score_file.py archive.parquet predictions.csv --processes 16 --resume
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+from calibration import validate_threshold
+from model_utils import ScamDetectionModel
+from reputation_index import ReputationIndex
+
+# Set in the parent before the pool forks, or loaded by _init_worker
+_model: Optional[ScamDetectionModel] = None
+
+
+def load_model(model_dir: str = "model") -> ScamDetectionModel:
+    """Load the model from model_dir without a prediction cache (bulk rows rarely repeat)."""
+    return ScamDetectionModel(
+        model_path=os.path.join(model_dir, "scam_model.pkl"),
+        vectorizer_path=os.path.join(model_dir, "tfidf_vectorizer.pkl"),
+        artifact_dir=os.path.join(model_dir, "artifact"),
+        cache_size=0,
+        reputation=ReputationIndex(os.path.join(model_dir, "reputation")),
+        calibration_path=os.path.join(model_dir, "calibration.json")
+    )
+
+
+def _init_worker(model_dir: str):
+    """Pool initializer: forked workers inherit the parent's model, others load their own."""
+    global _model
+    if _model is None:
+        _model = load_model(model_dir)
+
+
+def _score_chunk(texts: List[str], explain: bool, threshold: Optional[float] = None) -> dict:
+    """Score one chunk (runs in a worker process) and return its output columns."""
+    predictions = _model.predict_batch(texts, explain=explain, threshold=threshold)
+    columns = {
+        "prediction": [prediction for prediction, _, _, _ in predictions],
+        "probability": [round(probability, 2) for _, probability, _, _ in predictions],
+    }
+    if explain:
+        columns["explanations"] = [" | ".join(explanations) for _, _, explanations, _ in predictions]
+        columns["top_terms"] = [" ".join(f"{item['term']}:{item['weight']:.4f}" for item in top_terms)
+                                for _, _, _, top_terms in predictions]
+    return columns
+
+
+def read_chunks(path: str, column: str, chunk_size: int, keep_columns: List[str],
+                skip_rows: int = 0) -> Iterator[pd.DataFrame]:
+    """
+    Yield DataFrames of at most chunk_size rows with the message and kept columns.
+
+    The first skip_rows data rows are skipped by the reader: CSV rows are
+    not parsed into frames, and Parquet reading starts at the row group
+    holding the first wanted row.
+    """
+    columns = [column] + [name for name in keep_columns if name != column]
+    if path.lower().endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Reading Parquet needs pyarrow: pip install pyarrow")
+        parquet = pq.ParquetFile(path)
+        first_group = 0
+        while first_group < parquet.num_row_groups and \
+                skip_rows >= parquet.metadata.row_group(first_group).num_rows:
+            skip_rows -= parquet.metadata.row_group(first_group).num_rows
+            first_group += 1
+        if first_group == parquet.num_row_groups:
+            return
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns,
+                                          row_groups=range(first_group, parquet.num_row_groups)):
+            if skip_rows >= batch.num_rows:
+                skip_rows -= batch.num_rows
+                continue
+            if skip_rows:
+                batch = batch.slice(skip_rows)
+                skip_rows = 0
+            yield batch.to_pandas()
+    else:
+        # Line 0 is the header, so data rows are skipped from line 1
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns,
+                               skiprows=range(1, skip_rows + 1) if skip_rows else None)
+
+
+def count_rows(path: str) -> Optional[int]:
+    """Total rows when cheaply known (Parquet metadata), else None."""
+    if path.lower().endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            return None
+        return pq.ParquetFile(path).metadata.num_rows
+    return None
+
+
+def _input_fingerprint(path: str) -> dict:
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def _write_checkpoint(path: str, checkpoint: dict):
+    """Write the checkpoint atomically, so a crash leaves the old or the new one."""
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def _load_checkpoint(path: str, expected: dict) -> Optional[dict]:
+    """Return the checkpoint to resume from, or None; raises if it belongs to a different job."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    for key, value in expected.items():
+        if checkpoint.get(key) != value:
+            raise ValueError(f"Checkpoint {path} was written with a different {key} "
+                             f"({checkpoint.get(key)!r}, now {value!r}); remove it or drop --resume")
+    return checkpoint
+
+
+def score_file(input_path: str, output_path: str, column: str = "message", chunk_size: int = 20000,
+               processes: Optional[int] = None, explain: bool = False, keep_columns: Optional[List[str]] = None,
+               model_dir: str = "model", resume: bool = False, checkpoint_path: Optional[str] = None,
+               progress_every: float = 5.0, threshold: Optional[float] = None) -> dict:
+    """
+    Score every row of input_path and write the results to output_path (CSV).
+
+    Each output row has the kept input columns, then prediction and
+    probability (0-100), plus explanations and top_terms with explain=True.
+    A row is Scam when its probability is at least threshold (default 50).
+    Chunks are scored in parallel with at most two per process in flight, and
+    written in input order.
+
+    Returns:
+        dict: rows, scam count, seconds and rows_per_sec for this run
+    """
+    global _model
+
+    keep_columns = list(keep_columns or [])
+    threshold = None if threshold is None else validate_threshold(threshold)
+    checkpoint_path = checkpoint_path or output_path + ".checkpoint.json"
+    processes = processes or os.cpu_count() or 1
+
+    _model = load_model(model_dir)
+    if _model.model is None:
+        raise RuntimeError(f"No trained model found in {model_dir}. Run train_model.py first.")
+
+    job = {
+        "input": _input_fingerprint(input_path),
+        "column": column,
+        "chunk_size": chunk_size,
+        "keep_columns": keep_columns,
+        "explain": explain,
+        "threshold": threshold,
+        "model_version": _model.model_version,
+        "reputation_version": _model.reputation.version,
+    }
+    checkpoint = _load_checkpoint(checkpoint_path, job) if resume else None
+    rows_done = checkpoint["rows_done"] if checkpoint else 0
+    chunks_done = checkpoint["chunks_done"] if checkpoint else 0
+
+    if checkpoint:
+        # Drop anything written after the last checkpoint
+        output = open(output_path, "r+b")
+        output.truncate(checkpoint["output_bytes"])
+        output.seek(0, os.SEEK_END)
+        print(f"↩️  Resuming after {rows_done} rows ({chunks_done} chunks)")
+    else:
+        output = open(output_path, "wb")
+
+    total_rows = count_rows(input_path)
+    started = time.perf_counter()
+    last_report = started
+    rows_this_run = 0
+    scams = 0
+
+    print(f"Scoring {input_path} -> {output_path} with {processes} processes "
+          f"(model {_model.model_version}, chunks of {chunk_size})")
+
+    context = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else mp.get_context()
+    in_flight = deque()
+
+    def write_oldest():
+        nonlocal rows_done, chunks_done, rows_this_run, scams, last_report
+        frame, pending = in_flight.popleft()
+        for name, values in pending.get().items():
+            frame[name] = values
+        frame.to_csv(output, header=output.tell() == 0, index=False)
+        output.flush()
+        os.fsync(output.fileno())
+
+        rows_done += len(frame)
+        chunks_done += 1
+        rows_this_run += len(frame)
+        scams += int((frame["prediction"] == "Scam").sum())
+        _write_checkpoint(checkpoint_path, {**job, "rows_done": rows_done, "chunks_done": chunks_done,
+                                            "output_bytes": output.tell(), "updated_at": time.time()})
+
+        now = time.perf_counter()
+        if now - last_report >= progress_every:
+            last_report = now
+            rate = rows_this_run / (now - started)
+            eta = f", ETA {(total_rows - rows_done) / rate:.0f}s" if total_rows and rate else ""
+            done = f"{rows_done}/{total_rows}" if total_rows else f"{rows_done}"
+            print(f"   {done} rows, {rate:,.0f} rows/sec{eta}")
+
+    try:
+        with context.Pool(processes, initializer=_init_worker, initargs=(model_dir,)) as pool:
+            # Rows scored before the resume are skipped by the reader
+            for chunk in read_chunks(input_path, column, chunk_size, keep_columns, skip_rows=rows_done):
+                texts = chunk[column].fillna("").astype(str).tolist()
+                frame = chunk[keep_columns].copy() if keep_columns else pd.DataFrame(index=chunk.index)
+                in_flight.append((frame, pool.apply_async(_score_chunk, (texts, explain, threshold))))
+                if len(in_flight) >= 2 * processes:
+                    write_oldest()
+            while in_flight:
+                write_oldest()
+    finally:
+        output.close()
+
+    os.remove(checkpoint_path)
+    elapsed = time.perf_counter() - started
+    summary = {
+        "rows": rows_this_run,
+        "total_rows": rows_done,
+        "scam": scams,
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": round(rows_this_run / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    print(f"\n✅ Scored {rows_this_run} rows in {elapsed:.1f}s "
+          f"({summary['rows_per_sec']:,.0f} rows/sec), {scams} flagged as scam")
+    print(f"   Output: {output_path} ({rows_done} rows)")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of messages offline")
+    parser.add_argument("input", help="CSV or Parquet (.parquet) file with a message column")
+    parser.add_argument("output", help="output CSV with prediction and probability columns")
+    parser.add_argument("--column", default="message", help="column holding the message text")
+    parser.add_argument("--keep-columns", nargs="+", default=[],
+                        help="input columns to copy to the output (e.g. an id column)")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="rows per chunk")
+    parser.add_argument("--processes", type=int, default=None, help="scoring processes (default: all cores)")
+    parser.add_argument("--explain", action="store_true", help="also write explanations and top terms")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="Scam at or above this probability (0-100, default 50)")
+    parser.add_argument("--model-dir", default="model", help="directory with the trained model")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from its checkpoint")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint.json)")
+    args = parser.parse_args()
+
+    score_file(args.input, args.output, column=args.column, chunk_size=args.chunk_size,
+               processes=args.processes, explain=args.explain, keep_columns=args.keep_columns,
+               model_dir=args.model_dir, resume=args.resume, checkpoint_path=args.checkpoint,
+               threshold=args.threshold)
@@ -0,0 +1,108 @@
+"""
+Shared fixtures: a small model trained on train_model's sample messages.
+
+Run from backend-python/ with:  python -m pytest tests
+"""
+
+import os
+import sys
+
+import joblib
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_artifact import export_artifact  # noqa: E402
+from model_utils import ScamDetectionModel  # noqa: E402
+from text_preprocessor import TextPreprocessor  # noqa: E402
+from train_model import build_classifier, build_vectorizer, generate_sample_data  # noqa: E402
+
+SCAM_TEXT = "URGENT! Your account has been suspended. Click here immediately to verify: http://verify-now.com"
+LEGIT_TEXT = "Hi, just wanted to check if you're free for lunch tomorrow?"
+
+
+def train_sample_model(feature_mode: str = "tfidf"):
+    """Fit the vectorizer and classifier on the built-in sample messages."""
+    data = generate_sample_data()
+    cleaned = list(TextPreprocessor.clean_many(data["message"]))
+    vectorizer = build_vectorizer(feature_mode, hash_features=2 ** 12)
+    model = build_classifier().fit(vectorizer.fit_transform(cleaned), data["label"].values)
+    return model, vectorizer
+
+
+@pytest.fixture(scope="session")
+def model_dir(tmp_path_factory):
+    """A model directory with the joblib files and the memory-mapped artifact."""
+    directory = tmp_path_factory.mktemp("model")
+    model, vectorizer = train_sample_model()
+    joblib.dump(model, str(directory / "scam_model.pkl"))
+    joblib.dump(vectorizer, str(directory / "tfidf_vectorizer.pkl"))
+    export_artifact(model, vectorizer, str(directory / "artifact"))
+    return directory
+
+
+@pytest.fixture
+def make_model(model_dir):
+    """Build a ScamDetectionModel over model_dir; keyword arguments override the defaults."""
+    def make(**kwargs):
+        options = {
+            "model_path": str(model_dir / "scam_model.pkl"),
+            "vectorizer_path": str(model_dir / "tfidf_vectorizer.pkl"),
+            "artifact_dir": str(model_dir / "artifact"),
+            "calibration_path": None,
+        }
+        options.update(kwargs)
+        return ScamDetectionModel(**options)
+    return make
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """The Flask app module, imported from an empty directory so it writes nothing here."""
+    cwd = os.getcwd()
+    os.chdir(str(tmp_path_factory.mktemp("app")))
+    try:
+        import app
+    finally:
+        os.chdir(cwd)
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    """A Flask test client; set app_module.predictor with monkeypatch to choose the model."""
+    return app_module.app.test_client()
+
+
+@pytest.fixture(scope="session")
+def asgi_module(app_module):
+    """The ASGI entry point (asgi_app), on top of app_module."""
+    import asgi_app
+    return asgi_app
+
+
+def call_asgi(asgi, method: str, path: str, body: bytes = b"", headers=(), query: bytes = b""):
+    """Run one HTTP request through an ASGI callable; returns (status, headers, body)."""
+    import asyncio
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": query,
+             "headers": [(name.lower(), value) for name, value in headers],
+             "http_version": "1.1", "scheme": "http", "server": ("test", 80), "client": ("test", 1),
+             "root_path": "", "raw_path": path.encode()}
+    sent = []
+    delivered = False
+
+    async def receive():
+        nonlocal delivered
+        if not delivered:
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi(scope, receive, send))
+    start = next(message for message in sent if message["type"] == "http.response.start")
+    payload = b"".join(message.get("body", b"") for message in sent if message["type"] == "http.response.body")
+    return start["status"], dict(start["headers"]), payload
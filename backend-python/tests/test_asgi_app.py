@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+
+from conftest import call_asgi
+
+
+def _coalescer(asgi_module, score_batch, score_one=None, **kwargs):
+    return asgi_module.RequestCoalescer(score_batch, score_one or (lambda *args: ("Legit", 0.0, [], [])), **kwargs)
+
+
+def _submit_all(coalescer, texts):
+    async def run():
+        return await asyncio.gather(*(coalescer.submit(text, True, None) for text in texts),
+                                    return_exceptions=True)
+    return asyncio.run(run())
+
+
+def test_requests_within_the_window_share_one_batch(asgi_module):
+    batches = []
+
+    def score_batch(texts, explain_flags, thresholds):
+        batches.append(list(texts))
+        return [("Scam", float(len(text)), [], []) for text in texts]
+
+    coalescer = _coalescer(asgi_module, score_batch, max_wait=0.05)
+    results = _submit_all(coalescer, ["a", "bb", "ccc"])
+    assert batches == [["a", "bb", "ccc"]]
+    assert [result[1] for result in results] == [1.0, 2.0, 3.0]
+    assert coalescer.stats()["largest_batch"] == 3
+
+
+def test_a_full_batch_is_flushed_without_waiting(asgi_module):
+    batches = []
+
+    def score_batch(texts, explain_flags, thresholds):
+        batches.append(len(texts))
+        return [("Legit", 0.0, [], []) for _ in texts]
+
+    coalescer = _coalescer(asgi_module, score_batch, max_batch_size=2, max_wait=10.0)
+    _submit_all(coalescer, ["a", "b", "c", "d"])
+    assert batches == [2, 2]
+
+
+def test_failed_batch_falls_back_to_per_caller_scoring(asgi_module):
+    def score_batch(texts, explain_flags, thresholds):
+        raise RuntimeError("batch failed")
+
+    def score_one(text, explain, threshold):
+        if text == "bad":
+            raise ValueError("bad message")
+        return "Legit", 1.0, [], []
+
+    results = _submit_all(_coalescer(asgi_module, score_batch, score_one, max_wait=0.05), ["ok", "bad", "fine"])
+    assert results[0] == ("Legit", 1.0, [], []) and results[2] == ("Legit", 1.0, [], [])
+    assert isinstance(results[1], ValueError)
+
+
+@pytest.mark.parametrize("body, content_type", [
+    (b"{not json", b"application/json"),
+    (b'{"message": "hi"}', b"text/plain"),
+])
+def test_malformed_detect_requests_get_the_flask_response(asgi_module, client, body, content_type):
+    status, _, payload = call_asgi(asgi_module.app, "POST", "/detect-scam", body,
+                                   [(b"content-type", content_type)])
+    expected = client.post("/detect-scam", data=body, headers={"Content-Type": content_type.decode()})
+    assert status == expected.status_code
+    assert json.loads(payload) == expected.get_json()
+
+
+def _metric(asgi_module, prefix):
+    _, _, body = call_asgi(asgi_module.app, "GET", "/metrics")
+    values = [float(line.rsplit(" ", 1)[1]) for line in body.decode().splitlines() if line.startswith(prefix)]
+    return values[0] if values else 0.0
+
+
+def test_natively_served_requests_are_recorded_in_metrics(asgi_module, app_module, make_model, monkeypatch):
+    model = make_model()
+    monkeypatch.setattr(app_module, "model", model)
+    monkeypatch.setattr(asgi_module, "model", model)
+    monkeypatch.setattr(asgi_module, "coalescer", _coalescer(asgi_module, model.predict_batch, model.predict))
+    requests = 'scam_http_requests_total{endpoint="/detect-scam",method="POST",status="200"}'
+    durations = 'scam_http_request_duration_seconds_count{endpoint="/detect-scam"}'
+    parses = 'scam_stage_duration_seconds_count{stage="parse_json"}'
+    before = [_metric(asgi_module, name) for name in (requests, durations, parses)]
+
+    status, _, _ = call_asgi(asgi_module.app, "POST", "/detect-scam", b'{"message": "hello there"}',
+                             [(b"content-type", b"application/json")])
+    assert status == 200
+    assert [_metric(asgi_module, name) for name in (requests, durations, parses)] == [v + 1 for v in before]
+
+    status, _, _ = call_asgi(asgi_module.app, "POST", "/stream-detect", b'{"message": "hi"}\n')
+    assert status == 200
+    assert _metric(asgi_module, 'scam_http_requests_total{endpoint="/stream-detect",method="POST",status="200"}') >= 1
@@ -0,0 +1,135 @@
+import json
+
+import numpy as np
+import pytest
+
+from calibration import (Calibrator, ThresholdProfiles, calibration_report, fit_calibrator, load_calibrator,
+                         load_threshold_profiles, per_text_thresholds, save_calibrator)
+from conftest import SCAM_TEXT, train_sample_model
+from model_artifact import export_artifact
+
+
+def _overconfident_scores(rows=4000, seed=0):
+    """Labels drawn with probability p, and scores that push p towards 0 and 1."""
+    rng = np.random.default_rng(seed)
+    true = rng.uniform(0.05, 0.95, rows)
+    labels = (rng.uniform(size=rows) < true).astype(np.int64)
+    logits = np.log(true / (1 - true)) * 3.0
+    return 1.0 / (1.0 + np.exp(-logits)), labels
+
+
+@pytest.mark.parametrize("method", ["platt", "isotonic"])
+def test_fitted_calibration_reduces_calibration_error(method):
+    scores, labels = _overconfident_scores()
+    calibrator = fit_calibrator(scores, labels, method)
+    before = calibration_report(scores, labels)["ece"]
+    after = calibration_report(calibrator.calibrate(scores), labels)["ece"]
+    assert after < before / 2
+
+
+@pytest.mark.parametrize("calibrator", [
+    Calibrator("platt", {"a": 0.4, "b": -0.2}),
+    Calibrator("isotonic", {"x": [0.1, 0.3, 0.3, 0.8], "y": [0.0, 0.2, 0.5, 0.9]}),
+])
+def test_calibrate_one_matches_the_vectorized_lookup(calibrator):
+    probabilities = np.concatenate(([0.0, 1e-20, 0.1, 0.3, 0.8, 1.0], np.linspace(0, 1, 101)))
+    expected = calibrator.calibrate(probabilities)
+    assert [calibrator.calibrate_one(float(p)) for p in probabilities] == pytest.approx(expected.tolist())
+
+
+def test_isotonic_points_must_increase():
+    with pytest.raises(ValueError):
+        Calibrator("isotonic", {"x": [0.5, 0.2], "y": [0.1, 0.9]})
+
+
+def test_saved_calibrator_loads_and_none_removes_it(tmp_path):
+    path = str(tmp_path / "calibration.json")
+    scores, labels = _overconfident_scores(500)
+    calibrator = fit_calibrator(scores, labels, "platt", meta={"fitted_on": "test rows"})
+    save_calibrator(calibrator, path)
+
+    loaded = load_calibrator(path)
+    assert loaded.stats()["fitted_on"] == "test rows"
+    assert loaded.calibrate(scores) == pytest.approx(calibrator.calibrate(scores))
+
+    save_calibrator(None, path)
+    assert load_calibrator(path) is None
+
+
+def test_model_serves_calibrated_probabilities(make_model, tmp_path):
+    raw = make_model().predict(SCAM_TEXT, explain=False)[1]
+    path = tmp_path / "calibration.json"
+    save_calibrator(Calibrator("platt", {"a": 0.5, "b": 0.0}), str(path))
+
+    # The standalone file is the calibration of the joblib files
+    model = make_model(artifact_dir=None, calibration_path=str(path))
+    assert model.model_format == "joblib"
+    probability = model.predict(SCAM_TEXT, explain=False)[1]
+    expected = 100 * model.calibrator.calibrate_one(raw / 100)
+    assert probability == pytest.approx(expected)
+    assert model.predict_batch([SCAM_TEXT], explain=False)[0][1] == pytest.approx(expected)
+
+
+def test_artifact_carries_its_own_calibration(make_model, tmp_path):
+    raw = make_model().predict(SCAM_TEXT, explain=False)[1]
+    artifact_dir = str(tmp_path / "artifact")
+    export_artifact(*train_sample_model(), artifact_dir,
+                    calibrator=Calibrator("platt", {"a": 0.5, "b": 0.0}, {"fitted_on": "test rows"}))
+    # A standalone file left from another model is not mixed with the artifact's weights
+    stale = tmp_path / "calibration.json"
+    save_calibrator(Calibrator("platt", {"a": 3.0, "b": 1.0}), str(stale))
+
+    model = make_model(artifact_dir=artifact_dir, calibration_path=str(stale))
+    assert model.model_format == "artifact"
+    assert model.calibrator.stats()["fitted_on"] == "test rows"
+    expected = 100 * model.calibrator.calibrate_one(raw / 100)
+    assert model.predict(SCAM_TEXT, explain=False)[1] == pytest.approx(expected)
+
+
+def test_threshold_changes_the_label_but_not_the_probability(make_model):
+    model = make_model()
+    prediction, probability, _, _ = model.predict(SCAM_TEXT, explain=False)
+    assert prediction == "Scam"
+    above = min(100.0, probability + 1)
+    assert model.predict(SCAM_TEXT, explain=False, threshold=above)[:2] == ("Legit", probability)
+    # Per-text thresholds share one scoring pass
+    results = model.predict_batch([SCAM_TEXT, SCAM_TEXT], explain=False, threshold=[None, above])
+    assert [result[0] for result in results] == ["Scam", "Legit"]
+
+
+def test_threshold_profiles_resolve_explicit_then_tenant_then_default():
+    profiles = ThresholdProfiles({"acme-bank": 30}, default=60)
+    assert profiles.resolve() == 60
+    assert profiles.resolve("acme-bank") == 30
+    assert profiles.resolve("unknown") == 60
+    assert profiles.resolve("acme-bank", "75") == 75
+    for bad in (0, 101, "high", True):
+        with pytest.raises(ValueError):
+            profiles.resolve(threshold=bad)
+    assert per_text_thresholds(None, 2) == [50.0, 50.0]
+    assert per_text_thresholds([None, 70], 2) == [50.0, 70.0]
+
+
+def test_threshold_profiles_file(tmp_path):
+    path = tmp_path / "thresholds.json"
+    path.write_text(json.dumps({"default": 40, "tenants": {"chat-app": 85}}))
+    assert load_threshold_profiles(str(path)).stats() == {"default": 40.0, "tenants": {"chat-app": 85.0}}
+
+    path.write_text(json.dumps({"tenant": {"chat-app": 85}}))
+    with pytest.raises(ValueError):
+        load_threshold_profiles(str(path))
+
+
+def test_detect_scam_applies_the_tenant_profile(client, app_module, make_model, monkeypatch):
+    model = make_model()
+    monkeypatch.setattr(app_module, "model", model)
+    monkeypatch.setattr(app_module, "predictor", model)
+    monkeypatch.setattr(app_module, "threshold_profiles", ThresholdProfiles({"strict": 99.9}))
+
+    default = client.post("/detect-scam", json={"message": SCAM_TEXT}).get_json()
+    strict = client.post("/detect-scam", json={"message": SCAM_TEXT},
+                         headers={"X-Tenant-Id": "strict"}).get_json()
+    assert (default["prediction"], default["threshold"]) == ("Scam", 50.0)
+    assert (strict["prediction"], strict["threshold"]) == ("Legit", 99.9)
+    assert strict["probability"] == default["probability"]
+    assert client.post("/detect-scam", json={"message": SCAM_TEXT, "threshold": 0}).status_code == 400
@@ -0,0 +1,41 @@
+import random
+import re
+
+import pytest
+
+from keyword_matcher import KeywordMatcher
+from text_preprocessor import DEFAULT_KEYWORDS
+
+
+def _regex_counts(matcher, text):
+    return {index: len(re.findall(re.escape(keyword), text))
+            for index, keyword in enumerate(matcher.keywords)
+            if re.search(re.escape(keyword), text)}
+
+
+def test_counts_match_findall_for_overlapping_keywords():
+    matcher = KeywordMatcher({"a": ["he", "she", "hers", "his"], "b": ["aa"]})
+    text = "ushers said his aaaa heshe"
+    assert matcher.scan(text) == _regex_counts(matcher, text)
+    assert matcher.scan("aaaaa") == {matcher.keywords.index("aa"): 2}
+
+
+def test_counts_match_findall_on_random_text():
+    matcher = KeywordMatcher(DEFAULT_KEYWORDS)
+    words = [keyword for keywords in DEFAULT_KEYWORDS.values() for keyword in keywords]
+    rng = random.Random(7)
+    for _ in range(50):
+        text = " ".join(rng.choice(words + ["x", "now now", "act"]) for _ in range(20))
+        assert matcher.scan(text) == _regex_counts(matcher, text)
+
+
+def test_count_groups_reports_distinct_and_total_matches():
+    matcher = KeywordMatcher({"urgency": ["urgent", "now"], "action": ["click", "now"]})
+    groups = matcher.count_groups("urgent: click now, now!")
+    assert groups == {"urgency": (2, 3), "action": (2, 3)}
+    assert matcher.count_groups("nothing here") == {"urgency": (0, 0), "action": (0, 0)}
+
+
+def test_empty_keyword_is_rejected():
+    with pytest.raises(ValueError):
+        KeywordMatcher({"urgency": ["urgent", ""]})
@@ -0,0 +1,109 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from conftest import LEGIT_TEXT, SCAM_TEXT, train_sample_model
+from fast_scorer import FastLinearScorer
+from model_artifact import BlockQuantizedArray, artifact_exists, export_artifact, load_artifact, quantize_blocks
+from model_utils import ScamDetectionModel
+from text_preprocessor import TextPreprocessor
+
+
+@pytest.mark.parametrize("feature_mode", ["tfidf", "hashing"])
+def test_artifact_matches_sklearn(tmp_path, feature_mode):
+    model, vectorizer = train_sample_model(feature_mode)
+    export_artifact(model, vectorizer, str(tmp_path / "artifact"))
+    classifier, artifact_vectorizer = load_artifact(str(tmp_path / "artifact"))
+
+    texts = list(TextPreprocessor.clean_many([SCAM_TEXT, LEGIT_TEXT, "free prize call now"]))
+    expected = model.predict_proba(vectorizer.transform(texts))[:, 1]
+    actual = classifier.predict_proba(artifact_vectorizer.transform(texts))[:, 1]
+    np.testing.assert_allclose(actual, expected, atol=1e-9)
+
+    scorer = FastLinearScorer.from_model(classifier, artifact_vectorizer)
+    np.testing.assert_allclose([scorer.predict_proba(text) for text in texts], expected, atol=1e-9)
+
+
+def test_export_repoints_a_symlink_and_keeps_the_previous_version(tmp_path):
+    model, vectorizer = train_sample_model()
+    target = str(tmp_path / "artifact")
+    for _ in range(3):
+        export_artifact(model, vectorizer, target)
+
+    assert os.path.islink(target) and artifact_exists(target)
+    versions = sorted(name for name in os.listdir(tmp_path) if name.startswith("artifact.v"))
+    assert len(versions) == 2
+    assert os.readlink(target) == versions[-1]
+
+
+def test_export_replaces_a_plain_directory_from_the_old_layout(tmp_path):
+    model, vectorizer = train_sample_model()
+    target = tmp_path / "artifact"
+    target.mkdir()
+    (target / "meta.json").write_text("{}")
+    export_artifact(model, vectorizer, str(target))
+    assert os.path.islink(target)
+    load_artifact(str(target))
+
+
+def test_artifact_is_never_missing_during_an_export(tmp_path):
+    model, vectorizer = train_sample_model()
+    target = str(tmp_path / "artifact")
+    export_artifact(model, vectorizer, target)
+
+    missing = []
+    done = threading.Event()
+
+    def watch():
+        while not done.is_set():
+            if not artifact_exists(target):
+                missing.append(True)
+
+    watcher = threading.Thread(target=watch)
+    watcher.start()
+    try:
+        for _ in range(10):
+            export_artifact(model, vectorizer, target)
+    finally:
+        done.set()
+        watcher.join()
+    assert not missing
+
+
+def test_quantization_error_is_within_half_a_scale_step():
+    rng = np.random.default_rng(3)
+    values = rng.normal(size=1000) * np.repeat([1e-3, 1.0, 50.0, 0.0], 250)
+    codes, scales = quantize_blocks(values, block_size=64)
+    quantized = BlockQuantizedArray(codes, scales, 64)
+
+    dequantized = np.asarray(quantized)
+    step = np.repeat(scales, 64)[:len(values)]
+    assert np.all(np.abs(dequantized - values) <= step / 2 + 1e-6 * np.abs(values))
+    assert np.all(dequantized[750:] == 0)
+    # Scalar, array and slice indexing agree with the dequantized vector
+    assert quantized[500] == pytest.approx(float(dequantized[500]))
+    np.testing.assert_allclose(quantized[np.array([3, 64, 999])], dequantized[[3, 64, 999]])
+    np.testing.assert_allclose(quantized[10:200:7], dequantized[10:200:7])
+
+
+@pytest.mark.parametrize("weights", ["float32", "int8"])
+@pytest.mark.parametrize("feature_mode", ["tfidf", "hashing"])
+def test_single_and_batch_scores_agree_on_smaller_weights(tmp_path, feature_mode, weights):
+    model, vectorizer = train_sample_model(feature_mode)
+    texts = [SCAM_TEXT, LEGIT_TEXT, "free prize call now", "Your package is waiting, pay the fee"]
+    scored = {}
+    for exported in ("float64", weights):
+        export_artifact(model, vectorizer, str(tmp_path / exported), exported, block_size=256)
+        served = ScamDetectionModel(model_path=str(tmp_path / "missing.pkl"),
+                                    vectorizer_path=str(tmp_path / "missing.pkl"),
+                                    artifact_dir=str(tmp_path / exported), calibration_path=None, cache_size=0)
+        assert served.model_format == ("artifact" if exported == "float64" else f"artifact-{exported}")
+        single = [served.predict(text, explain=False)[1] for text in texts]
+        batch = [result[1] for result in served.predict_batch(texts, explain=False)]
+        np.testing.assert_allclose(batch, single, atol=1e-6)
+        scored[exported] = np.array(batch)
+
+    # Smaller weights move the 0-100 probability only slightly
+    assert np.max(np.abs(scored[weights] - scored["float64"])) < 1.0
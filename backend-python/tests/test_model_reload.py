@@ -0,0 +1,92 @@
+import shutil
+
+import joblib
+import numpy as np
+import pytest
+
+from conftest import SCAM_TEXT
+from model_artifact import export_artifact
+from model_utils import ModelReloadError
+from reputation_index import ReputationIndex, build_index
+
+
+@pytest.fixture
+def reload_dir(model_dir, tmp_path):
+    """A writable copy of the sample model with a reputation index."""
+    directory = tmp_path / "model"
+    shutil.copytree(str(model_dir), str(directory), symlinks=True)
+    _build_reputation(tmp_path, directory, ["evil-pay.com"])
+    return directory
+
+
+def _build_reputation(tmp_path, directory, domains):
+    feed = tmp_path / "feed.txt"
+    feed.write_text("\n".join(domains) + "\n")
+    build_index([str(feed)], output_dir=str(directory / "reputation"))
+
+
+def _make(make_model, directory):
+    return make_model(model_path=str(directory / "scam_model.pkl"),
+                      vectorizer_path=str(directory / "tfidf_vectorizer.pkl"),
+                      artifact_dir=str(directory / "artifact"),
+                      reputation=ReputationIndex(str(directory / "reputation")))
+
+
+def _retrain(directory, flip: bool):
+    """Write a new model version; flip=True makes one that gets every canary wrong."""
+    model = joblib.load(str(directory / "scam_model.pkl"))
+    vectorizer = joblib.load(str(directory / "tfidf_vectorizer.pkl"))
+    if flip:
+        model.coef_ = -model.coef_
+        model.intercept_ = -model.intercept_
+    else:
+        model.intercept_ = model.intercept_ + 0.01
+    joblib.dump(model, str(directory / "scam_model.pkl"))
+    export_artifact(model, vectorizer, str(directory / "artifact"))
+
+
+def test_scorer_exposes_coefficients(make_model):
+    model = make_model()
+    scorer = model._state.scorer
+    coef = model.linear_weights()[0]
+    assert scorer.coef[int(np.argmax(coef))] == pytest.approx(coef.max())
+
+
+def test_failed_canary_keeps_model_and_reputation(make_model, reload_dir, tmp_path):
+    model = _make(make_model, reload_dir)
+    version, reputation_version = model.model_version, model.reputation.version
+    assert model.reputation.lookup("pay at http://evil-pay.com")
+
+    _build_reputation(tmp_path, reload_dir, ["other-scam.net"])
+    _retrain(reload_dir, flip=True)
+    with pytest.raises(ModelReloadError):
+        model.reload()
+
+    assert model.model_version == version
+    assert model.reputation.version == reputation_version
+    assert model.reputation.lookup("pay at http://evil-pay.com")
+    assert model.predict(SCAM_TEXT, explain=False)[0] == "Scam"
+
+
+def test_reload_swaps_model_and_reputation_together(make_model, reload_dir, tmp_path):
+    model = _make(make_model, reload_dir)
+    version = model.model_version
+
+    _build_reputation(tmp_path, reload_dir, ["other-scam.net"])
+    _retrain(reload_dir, flip=False)
+    result = model.reload()
+
+    assert result["swapped"] and result["reputation_swapped"]
+    assert model.model_version != version
+    assert model.reputation.lookup("visit other-scam.net today")
+    assert not model.reputation.lookup("pay at http://evil-pay.com")
+
+
+def test_rebuilt_reputation_is_swapped_in_without_a_new_model(make_model, reload_dir, tmp_path):
+    model = _make(make_model, reload_dir)
+
+    _build_reputation(tmp_path, reload_dir, ["other-scam.net"])
+    result = model.reload()
+
+    assert not result["swapped"] and result["reputation_swapped"]
+    assert model.reputation.lookup("visit other-scam.net today")
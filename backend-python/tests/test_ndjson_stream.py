@@ -0,0 +1,68 @@
+import json
+
+from ndjson_stream import NDJSONScorer, iter_results
+
+
+class RecordingPredictor:
+    """Scores every message as Scam with probability len(text), recording batch sizes."""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict_batch(self, texts, explain=True, threshold=None):
+        self.batches.append(len(texts))
+        return [self.predict(text) for text in texts]
+
+    def predict(self, text, explain=True, threshold=None):
+        return "Scam", float(len(text)), [], []
+
+
+BODY = ('{"id": "a1", "message": "Your account has been suspended"}\n'
+        '\n'
+        '"Lunch at noon? 🍕"\n'
+        'not json\n'
+        '{"id": 7, "message": "   "}\n'
+        '"last line without a newline"').encode("utf-8")
+
+
+def _run(chunks, **kwargs):
+    predictor = RecordingPredictor()
+    scorer = NDJSONScorer(predictor, **kwargs)
+    output = b"".join(iter_results(iter(chunks), scorer))
+    return [json.loads(line) for line in output.decode("utf-8").splitlines()], predictor
+
+
+def test_lines_split_across_chunks_give_the_same_results():
+    whole, _ = _run([BODY])
+    # Every split point, including inside the multi-byte emoji
+    for size in (1, 2, 3, 5, 17):
+        chunked, _ = _run([BODY[i:i + size] for i in range(0, len(BODY), size)])
+        assert chunked == whole
+
+
+def test_results_errors_and_summary_are_in_input_order():
+    lines, _ = _run([BODY])
+    assert [line.get("index") for line in lines[:-1]] == [0, 1, 2, 3, 4]
+    assert lines[0] == {"index": 0, "id": "a1", "prediction": "Scam", "probability": 31.0,
+                        "explanations": [], "top_terms": []}
+    assert lines[1]["probability"] == len("Lunch at noon? 🍕")
+    assert lines[2]["error"].startswith("Invalid JSON")
+    assert lines[3] == {"index": 3, "id": 7, "error": "Message must be a non-empty string"}
+    assert lines[4]["probability"] == len("last line without a newline")
+    assert lines[-1] == {"summary": {"total": 5, "scored": 3, "errors": 2}}
+
+
+def test_messages_are_scored_in_batches():
+    body = b"".join(b'"message %d"\n' % i for i in range(10))
+    lines, predictor = _run([body], batch_size=4)
+    assert predictor.batches == [4, 4, 2]
+    assert [line["index"] for line in lines[:-1]] == list(range(10))
+
+
+def test_over_long_line_is_rejected_and_skipped():
+    body = b'"ok"\n"' + b"x" * 100 + b'"\n"after"\n'
+    for size in (len(body), 7):
+        lines, _ = _run([body[i:i + size] for i in range(0, len(body), size)], max_line_bytes=50)
+        assert lines[1] == {"index": 1, "error": "Line longer than 50 bytes"}
+        assert lines[2]["probability"] == len("after")
+        assert lines[-1] == {"summary": {"total": 3, "scored": 2, "errors": 1}}
@@ -0,0 +1,50 @@
+from near_duplicates import MinHashLSH, cluster_indicator_key, cluster_messages
+from reputation_index import ReputationIndex, build_index
+from text_preprocessor import TextPreprocessor
+
+BAD_LINK = "Your invoice is ready, pay at http://evil-pay.com"
+GOOD_LINK = "Your invoice is ready, pay at http://good-shop.com"
+
+
+def _keys(texts):
+    return [cluster_indicator_key(TextPreprocessor.extract_indicators(text)) for text in texts]
+
+
+def test_exact_duplicates_share_a_cluster():
+    cleaned = ["win a prize", "hello", "win a prize"]
+    assert cluster_messages(cleaned) == ([0, 1, 0], [0, 1])
+
+
+def test_indicators_split_exact_duplicates():
+    texts = [BAD_LINK, GOOD_LINK, BAD_LINK]
+    cleaned = list(TextPreprocessor.clean_many(texts))
+    assert cleaned[0] == cleaned[1]
+    assert cluster_messages(cleaned, indicator_keys=_keys(texts)) == ([0, 1, 0], [0, 1])
+
+
+def test_indicators_split_near_duplicates():
+    texts = [BAD_LINK, "Your invoice is ready!! pay at http://evil-pay.com now",
+             "Your invoice is ready!! pay at http://good-shop.com now"]
+    cleaned = list(TextPreprocessor.clean_many(texts))
+    lsh = MinHashLSH(threshold=0.5)
+    assert cluster_messages(cleaned, lsh)[0] == [0, 0, 0]
+    assert cluster_messages(cleaned, lsh, _keys(texts)) == ([0, 0, 1], [0, 2])
+
+
+def test_batch_detect_scores_each_domain_separately(client, app_module, make_model, tmp_path, monkeypatch):
+    feed = tmp_path / "bad.txt"
+    feed.write_text("evil-pay.com\n")
+    build_index([str(feed)], output_dir=str(tmp_path / "reputation"))
+    model = make_model(reputation=ReputationIndex(str(tmp_path / "reputation")))
+    monkeypatch.setattr(app_module, "predictor", model)
+
+    response = client.post("/batch-detect", json={"messages": [BAD_LINK, GOOD_LINK, BAD_LINK]})
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert body["clusters"] == 2
+    assert [result["cluster_id"] for result in body["results"]] == [0, 1, 0]
+    expected = model.predict_batch([BAD_LINK, GOOD_LINK], explain=True, threshold=None)
+    for result, (prediction, probability, _, _) in zip(body["results"], expected):
+        assert (result["prediction"], result["probability"]) == (prediction, round(probability, 2))
+    assert body["results"][0]["probability"] > body["results"][1]["probability"]
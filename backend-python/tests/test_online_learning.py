@@ -0,0 +1,107 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from conftest import LEGIT_TEXT, SCAM_TEXT
+from model_utils import ModelReloadError
+from online_learning import OnlineLearner, open_feedback_store, parse_label
+
+CAMPAIGN = [
+    ("Your parcel is waiting, pay the customs fee at parcel-fees.net", "Scam"),
+    ("Parcel held: customs fee due, pay at parcel-fees.net today", "Scam"),
+    ("See you at lunch tomorrow", "Legit"),
+]
+
+
+@pytest.fixture(params=["feedback.jsonl", "feedback.sqlite3"])
+def store(request, tmp_path):
+    return open_feedback_store(str(tmp_path / request.param))
+
+
+@pytest.fixture
+def learner(make_model, tmp_path):
+    def make(model=None, **kwargs):
+        feedback = open_feedback_store(str(tmp_path / "feedback.jsonl"))
+        return OnlineLearner(model or make_model(), feedback, checkpoint_dir=str(tmp_path / "online"),
+                             canary=[], **kwargs)
+    return make
+
+
+def test_parse_label_accepts_the_documented_forms():
+    assert [parse_label(value) for value in (1, 0, True, "Scam", " legit ", "1")] == [1, 0, 1, 1, 0, 1]
+    with pytest.raises(ValueError):
+        parse_label("maybe")
+
+
+def test_store_returns_rows_after_the_cursor_in_order(store):
+    assert store.fetch() == [] and store.count() == 0
+    assert store.add([("first", 1), ("second", 0), ("third", 1)], source="analyst") == 3
+    rows = store.fetch()
+    assert [(message, label) for _, message, label in rows] == [("first", 1), ("second", 0), ("third", 1)]
+    assert store.fetch(rows[0][0], limit=1) == [rows[1]]
+    assert store.count(rows[1][0]) == 1
+
+
+def test_update_moves_the_weights_and_restore_reloads_them(learner, make_model):
+    online = learner()
+    online.add_feedback(CAMPAIGN)
+    base_coef = np.array(online.model.linear_weights()[0])
+
+    result = online.update()
+    assert result["updated"] and result["samples"] == 3 and result["pending"] == 0
+    assert result["loss_after"] < result["loss_before"]
+    assert result["model_version"] == f"{online.model.source_version}+online1"
+    assert not np.allclose(online.model.linear_weights()[0], base_coef)
+    assert online.update() == {"updated": False, "samples": 0, "model_version": result["model_version"],
+                               "pending": 0}
+
+    restarted = learner(make_model())
+    assert restarted.restore()["version"] == 1
+    assert restarted.model.model_version == result["model_version"]
+    assert restarted.cursor == online.cursor and restarted.pending() == 0
+    np.testing.assert_allclose(restarted.model.linear_weights()[0], online.model.linear_weights()[0])
+
+
+def test_rejected_update_still_advances_the_cursor(learner):
+    # The canary expects the opposite of the model's decision, so every update fails it
+    online = learner()
+    online.canary = [(SCAM_TEXT, 0), (LEGIT_TEXT, 1)]
+    online.add_feedback(CAMPAIGN)
+    version = online.model.model_version
+
+    with pytest.raises(ModelReloadError):
+        online.update()
+    assert online.model.model_version == version
+    assert online.rejected == 3 and online.pending() == 0
+    assert not os.path.exists(online.checkpoint_dir)
+
+
+def test_checkpoint_from_another_base_is_not_restored(learner, make_model):
+    online = learner()
+    online.add_feedback(CAMPAIGN)
+    online.update()
+    meta_path = os.path.join(online.checkpoint_dir, "v000001", "meta.json")
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["base_version"] = "retrained-elsewhere"
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    restarted = learner(make_model())
+    assert restarted.restore()["version"] == 1
+    assert restarted.model.model_version == restarted.model.source_version
+    # The retrained model never saw the feedback, so all of it is pending again
+    assert restarted.cursor == 0 and restarted.pending() == 3
+    assert restarted.update()["model_version"] == f"{restarted.model.source_version}+online2"
+
+
+def test_only_the_newest_checkpoints_are_kept(learner):
+    online = learner(keep_checkpoints=2)
+    for message, label in CAMPAIGN:
+        online.add_feedback([(message, label)])
+        online.update()
+    assert sorted(name for name in os.listdir(online.checkpoint_dir) if "." not in name) == \
+        ["v000002", "v000003"]
+    assert not any(name.startswith("v000001") for name in os.listdir(online.checkpoint_dir))
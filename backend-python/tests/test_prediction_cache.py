@@ -0,0 +1,58 @@
+import time
+
+from conftest import LEGIT_TEXT, SCAM_TEXT
+from prediction_cache import PredictionCache
+
+
+def test_key_depends_on_text_and_model_version():
+    key = PredictionCache.make_key("win a prize", "v1")
+    assert key == PredictionCache.make_key("win a prize", "v1")
+    assert key != PredictionCache.make_key("win a prize", "v2")
+    assert key != PredictionCache.make_key("win a prize now", "v1")
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_size=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = PredictionCache(max_size=10, ttl=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1 and stats["size"] == 0
+
+
+def test_disabled_cache_stores_nothing():
+    cache = PredictionCache(max_size=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_model_serves_repeated_messages_from_cache(make_model):
+    model = make_model(cache_size=100)
+    first = model.predict(SCAM_TEXT)
+    assert model.predict(SCAM_TEXT) == first
+    assert model.cache.stats()["hits"] == 1
+    # predict_batch shares the cache with predict
+    model.predict_batch([SCAM_TEXT, LEGIT_TEXT])
+    assert model.cache.stats()["hits"] == 2
+
+
+def test_new_model_version_invalidates_cached_predictions(make_model):
+    model = make_model(cache_size=100)
+    model.predict(SCAM_TEXT)
+    coef, intercept = model.linear_weights()
+    model.update_weights(coef, intercept, "retrained", min_canary_accuracy=0.0)
+    model.predict(SCAM_TEXT)
+    stats = model.cache.stats()
+    assert stats["hits"] == 0 and stats["misses"] == 2
@@ -0,0 +1,86 @@
+import json
+import os
+
+import pytest
+
+from conftest import LEGIT_TEXT, SCAM_TEXT
+from prefilter import PrefilterCascade, decision_holds, load_prefilter_config
+
+SHORT_TEXT = "Are we still on for dinner at 7?"
+
+
+def _cascade(**tiers):
+    config = load_prefilter_config(None)
+    config["enabled"] = True
+    for tier, settings in tiers.items():
+        config[tier].update(settings)
+    return PrefilterCascade(config)
+
+
+def test_cascade_is_off_by_default():
+    cascade = PrefilterCascade(load_prefilter_config(None))
+    assert not cascade.enabled
+    assert cascade.check_many([SCAM_TEXT, LEGIT_TEXT]) == [None, None]
+
+
+@pytest.mark.skipif("PREFILTER_ENABLED" in os.environ or "PREFILTER_CONFIG" in os.environ,
+                    reason="the environment configures the cascade")
+def test_app_sends_every_message_to_the_model_by_default(app_module):
+    assert app_module.prefilter is None
+
+
+def test_blocklisted_domain_is_scam():
+    cascade = _cascade(domains={"blocklist": ["evil-pay.com", "bit.ly/3xYz"]})
+    assert cascade.check("hi, see https://login.evil-pay.com/a")[3] == "domains"
+    assert cascade.check("hi, see bit.ly/3xYz")[:2] == ("Scam", 99.0)
+    decision = cascade.check("hi, see bit.ly/other")
+    assert decision is None or decision[3] != "domains"
+
+
+def test_feature_tier_settles_short_plain_and_obvious_scam_messages():
+    cascade = _cascade()
+    assert cascade.check(SHORT_TEXT)[:2] == ("Legit", 1.0)
+    assert cascade.check(SCAM_TEXT)[:2] == ("Scam", 95.0)
+    # A lure keyword keeps a short message away from the Legit shortcut
+    assert cascade.check("Please check your bank details") is None
+
+
+def test_allowlisted_link_does_not_count_as_a_link():
+    message = "Your statement is ready: https://mybank.com/statements"
+    assert _cascade().check(message) is None
+    assert _cascade(domains={"allowlist": ["mybank.com"]}, features={"lure_keywords": []}).check(message)[0] == "Legit"
+
+
+def test_decision_holds_only_on_its_side_of_the_threshold():
+    decision = ("Scam", 95.0, (), "features")
+    assert decision_holds(decision, 50)
+    assert not decision_holds(decision, 97)
+    assert decision_holds(("Legit", 1.0, (), "features"), 50)
+
+
+def test_decisions_are_counted_per_tier():
+    cascade = _cascade()
+    cascade.check_many([SCAM_TEXT, SHORT_TEXT, "Please check your bank details"])
+    stats = cascade.stats()
+    assert stats["checked"] == 3 and stats["short_circuited"] == 2
+    assert stats["tiers"]["features"] == {"enabled": True, "legit": 1, "scam": 1}
+
+
+def test_config_file_can_enable_the_cascade_and_rejects_unknown_settings(tmp_path):
+    path = tmp_path / "prefilter.json"
+    path.write_text(json.dumps({"enabled": True, "features": {"max_words": 12}}))
+    config = load_prefilter_config(str(path))
+    assert config["enabled"] and config["features"]["max_words"] == 12
+    assert config["features"]["max_chars"] == 160
+
+    path.write_text(json.dumps({"features": {"max_wrods": 12}}))
+    with pytest.raises(ValueError):
+        load_prefilter_config(str(path))
+
+
+def test_model_keeps_model_scores_without_the_cascade(make_model):
+    plain = make_model().predict(SHORT_TEXT)
+    assert plain[1] != 1.0
+    assert make_model(prefilter=_cascade()).predict(SHORT_TEXT)[1:] == (
+        1.0, ["No urgency-indicating words detected", "Few or no monetary references",
+              "No suspicious phrases detected"], [])
@@ -0,0 +1,78 @@
+import math
+
+import pytest
+
+from conftest import LEGIT_TEXT
+from reputation_index import ReputationIndex, build_index
+from text_preprocessor import TextPreprocessor
+
+
+@pytest.fixture
+def index(tmp_path):
+    feed = tmp_path / "feed.csv"
+    feed.write_text("indicator,score,type\n"
+                    "evil-pay.com,1.0,\n"
+                    "https://Phish.Example.org/login,0.9,\n"
+                    "mybank.com,0.0,domain\n"
+                    "+1 (800) 555-0199,0.8,phone\n"
+                    "evil-pay.com,0.2,\n")
+    build_index([str(feed)], output_dir=str(tmp_path / "reputation"), logit_weight=2.0)
+    return ReputationIndex(str(tmp_path / "reputation"))
+
+
+def test_missing_index_is_empty(tmp_path):
+    index = ReputationIndex(str(tmp_path / "missing"))
+    assert not index.loaded
+    assert index.lookup_many(["visit evil-pay.com"]) == [[]]
+
+
+def test_lookups_find_normalized_domains_and_phones(index):
+    assert index.stats()["entries"] == 4
+    # Duplicates keep their highest score
+    assert index.lookup("pay now at HTTP://EVIL-PAY.COM/invoice") == [("evil-pay.com", 1.0)]
+    assert index.lookup("reset at phish.example.org") == [("phish.example.org", pytest.approx(0.9))]
+    assert index.lookup("call 1-800-555-0199 today") == [("8005550199", pytest.approx(0.8))]
+    assert index.lookup("write to billing@mybank.com") == [("mybank.com", 0.0)]
+    assert index.lookup(LEGIT_TEXT) == []
+
+
+def test_subdomain_takes_its_closest_listed_parent(index):
+    assert index.lookup("see https://secure.login.evil-pay.com") == [("secure.login.evil-pay.com", 1.0)]
+    assert index.lookup("see https://evil-pay.com.example.net") == []
+
+
+def test_lookup_many_keeps_each_text_separate(index):
+    texts = ["evil-pay.com", "nothing here", "mybank.com and evil-pay.com"]
+    assert index.lookup_many(texts) == [index.lookup(text) for text in texts]
+    assert [len(hits) for hits in index.lookup_many(texts)] == [1, 0, 2]
+
+
+def test_lookup_many_uses_indicators_the_caller_already_extracted(index, monkeypatch):
+    texts = ["evil-pay.com", "call 1-800-555-0199"]
+    indicators = [TextPreprocessor.extract_indicators(text) for text in texts]
+    expected = index.lookup_many(texts)
+    monkeypatch.setattr(TextPreprocessor, "extract_indicators", staticmethod(lambda text: pytest.fail(text)))
+    assert index.lookup_many(texts, indicators) == expected
+
+
+def test_logit_uses_the_worst_indicator(index):
+    assert index.logit([]) == 0.0
+    assert index.logit([("mybank.com", 0.0)]) == -2.0
+    assert index.logit([("mybank.com", 0.0), ("evil-pay.com", 1.0)]) == 2.0
+
+
+def test_reputation_shifts_model_score_and_explains_it(make_model, index):
+    plain = make_model()
+    model = make_model(reputation=index)
+    text = "Your invoice is ready, pay at http://evil-pay.com"
+
+    _, base, _, _ = plain.predict(text)
+    prediction, probability, explanations, top_terms = model.predict(text)
+    base_logit = math.log(base / (100 - base))
+    assert math.log(probability / (100 - probability)) == pytest.approx(base_logit + 2.0)
+    assert any("evil-pay.com has a bad reputation" in explanation for explanation in explanations)
+    assert "evil-pay.com" in [term["term"] for term in top_terms]
+
+    good = model.predict("Your invoice is ready, pay at http://mybank.com")[1]
+    assert good < base < probability
+    assert model.predict_batch([text], explain=False)[0][1] == pytest.approx(probability)
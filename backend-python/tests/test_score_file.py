@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+import score_file
+from train_model import generate_sample_data
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def messages_csv(tmp_path):
+    data = generate_sample_data()
+    data.insert(0, "id", range(len(data)))
+    path = tmp_path / "messages.csv"
+    data.to_csv(path, index=False)
+    return path
+
+
+def _run_cli(*args):
+    command = [sys.executable, score_file.__file__, *map(str, args)]
+    subprocess.run(command, check=True, capture_output=True, cwd=os.path.dirname(score_file.__file__))
+
+
+def test_read_chunks_skips_rows_at_the_reader(messages_csv):
+    chunks = list(score_file.read_chunks(str(messages_csv), "message", 4, ["id"], skip_rows=7))
+    assert chunks[0]["id"].iloc[0] == 7
+    assert sum(len(chunk) for chunk in chunks) == len(pd.read_csv(messages_csv)) - 7
+
+
+def test_resumed_run_matches_an_uninterrupted_one(messages_csv, model_dir, tmp_path, monkeypatch):
+    options = ["--keep-columns", "id", "--chunk-size", "4", "--processes", "1", "--model-dir", model_dir]
+    _run_cli(messages_csv, tmp_path / "full.csv", *options)
+
+    # Stop the first run right after its second chunk is checkpointed
+    write_checkpoint = score_file._write_checkpoint
+    checkpoints = []
+
+    def interrupting_write_checkpoint(path, checkpoint):
+        write_checkpoint(path, checkpoint)
+        checkpoints.append(checkpoint)
+        if len(checkpoints) == 2:
+            raise Interrupted()
+
+    monkeypatch.setattr(score_file, "_write_checkpoint", interrupting_write_checkpoint)
+    resumed = tmp_path / "resumed.csv"
+    with pytest.raises(Interrupted):
+        score_file.score_file(str(messages_csv), str(resumed), chunk_size=4, processes=1,
+                              keep_columns=["id"], model_dir=str(model_dir))
+    assert checkpoints[-1]["rows_done"] == 8
+
+    _run_cli(messages_csv, resumed, *options, "--resume")
+    assert resumed.read_bytes() == (tmp_path / "full.csv").read_bytes()
+    assert not os.path.exists(str(resumed) + ".checkpoint.json")
@@ -0,0 +1,56 @@
+import pytest
+
+from text_preprocessor import TextPreprocessor, fold_leetspeak, normalize_unicode
+
+clean_text = TextPreprocessor.clean_text
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Log in to p@ypal now", "log in to paypal now"),
+    ("V3r1fy your amaz0n acc0unt", "verify your amazon account"),
+    ("Reset your p@ssw0rd on g00gle", "reset your password on google"),
+    ("mp3s and win10pro", "mp3s and win10pro"),
+    ("win10 costs $100", "win10 costs 100"),
+])
+def test_leetspeak_is_folded_only_inside_mostly_letter_words(text, expected):
+    assert clean_text(text) == expected
+
+
+def test_fold_leetspeak_leaves_numbers_alone():
+    assert fold_leetspeak("r3fund of 1000 for acc0unt 4a7b") == "refund of 1000 for account 4a7b"
+    assert fold_leetspeak("no candidates here") == "no candidates here"
+
+
+def test_email_needs_a_dotted_domain():
+    assert clean_text("Write to support@example.com today") == "write to today"
+    assert clean_text("Write to a.b+c@mail.example.co.uk!") == "write to"
+    assert clean_text("meet me @ noon") == "meet me noon"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("user@localhost hi", "hi"),
+    ("ssh root@host now", "ssh now"),
+    ("ping @team or me@ now", "ping team or me now"),
+    ("log in at upd@te p@ypal", "log in at update paypal"),
+    ("p@ypal@localhost", ""),
+])
+def test_undotted_at_is_removed_unless_it_stands_for_a(text, expected):
+    assert clean_text(text) == expected
+
+
+def test_urls_and_phone_numbers_are_removed():
+    assert clean_text("Visit https://verify-now.com/a?b=1 or www.example.com") == "visit or"
+    assert clean_text("Call +1 (800) 555-0199 now") == "call now"
+
+
+def test_unicode_lookalikes_and_invisible_characters_are_folded():
+    assert normalize_unicode("pаy​pal") == "paypal"
+    assert clean_text("ＦＲＥＥ gift") == "free gift"
+    # Russian text stays Russian
+    assert normalize_unicode("привет мир") == "привет мир"
+
+
+def test_indicators_are_extracted_from_the_raw_text():
+    indicators = TextPreprocessor.extract_indicators(
+        "Pay at http://Secure.Evil-Pay.com/x or mail billing@evil-pay.com, call 1-800-555-0199")
+    assert indicators == {"domains": ["secure.evil-pay.com", "evil-pay.com"], "phones": ["8005550199"]}
@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import train_model
+from model_utils import ScamDetectionModel
+
+
+def test_streaming_training_cleans_the_csv_once(tmp_path, monkeypatch):
+    data = pd.concat([train_model.generate_sample_data()] * 20, ignore_index=True)
+    data_path = tmp_path / "messages.csv"
+    data.to_csv(data_path, index=False)
+    monkeypatch.chdir(tmp_path)
+
+    cleaning_passes = []
+    cleaned_chunks = train_model._cleaned_chunks
+
+    def counting_cleaned_chunks(*args, **kwargs):
+        cleaning_passes.append(args)
+        return cleaned_chunks(*args, **kwargs)
+
+    monkeypatch.setattr(train_model, "_cleaned_chunks", counting_cleaned_chunks)
+    result = train_model.train_streaming(str(data_path), chunk_size=100, processes=1,
+                                         hash_features=2 ** 12, epochs=2, calibration='none')
+
+    assert len(cleaning_passes) == 1
+    assert result["train_rows"] + result["test_rows"] == len(data)
+    assert result["accuracy"] > 0.8
+
+    model = ScamDetectionModel(model_path="model/scam_model.pkl",
+                               vectorizer_path="model/tfidf_vectorizer.pkl",
+                               artifact_dir="model/artifact", calibration_path=None)
+    assert model.predict(data["message"][0], explain=False)[0] == "Scam"
+    assert os.path.isdir("model/artifact")
+
+
+def test_streaming_calibration_is_bounded_and_reported_out_of_sample(tmp_path, monkeypatch):
+    data = pd.concat([train_model.generate_sample_data()] * 20, ignore_index=True)
+    data_path = tmp_path / "messages.csv"
+    data.to_csv(data_path, index=False)
+    monkeypatch.chdir(tmp_path)
+
+    fitted, reported = [], []
+    fit_calibrator = train_model.fit_calibrator
+
+    def recording_fit_calibrator(probabilities, labels, *args, **kwargs):
+        fitted.append(len(labels))
+        return fit_calibrator(probabilities, labels, *args, **kwargs)
+
+    monkeypatch.setattr(train_model, "fit_calibrator", recording_fit_calibrator)
+    monkeypatch.setattr(train_model, "print_calibration", lambda probabilities, labels, calibrator:
+                        reported.append(len(labels)))
+    result = train_model.train_streaming(str(data_path), chunk_size=100, processes=1,
+                                         hash_features=2 ** 12, calibration='platt', calibration_rows=20)
+
+    assert result["test_rows"] > 40
+    assert fitted == [20] and reported == [20]
+    model = ScamDetectionModel(model_path="model/scam_model.pkl",
+                               vectorizer_path="model/tfidf_vectorizer.pkl",
+                               artifact_dir="model/artifact", calibration_path=None)
+    assert model.calibrator is not None and model.calibrator.stats()["rows"] == 20
+
+
+def test_reservoir_keeps_a_bounded_uniform_sample():
+    reservoir = train_model._Reservoir(100, seed=0)
+    for start in range(0, 10000, 300):
+        values = np.arange(start, min(start + 300, 10000))
+        reservoir.add(values / 10000, values % 2)
+    probabilities, labels = reservoir.values()
+    assert len(labels) == 100 and reservoir.seen == 10000
+    assert len(np.unique(probabilities)) == 100
+    assert 0.3 < probabilities.mean() < 0.7
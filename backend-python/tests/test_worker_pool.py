@@ -0,0 +1,72 @@
+import os
+import signal
+import time
+
+import pytest
+
+from conftest import LEGIT_TEXT, SCAM_TEXT
+from metrics import STAGE_SECONDS
+from text_preprocessor import TextPreprocessor
+from worker_pool import InferencePool
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="the worker pool needs fork")
+
+
+@pytest.fixture
+def pool(make_model):
+    pool = InferencePool(make_model(), processes=2, result_timeout=10.0).start()
+    yield pool
+    pool.close()
+
+
+def _stage_count() -> int:
+    return sum(sum(child.snapshot()[0]) for child in STAGE_SECONDS._children.values())
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_pool_matches_in_process_model(pool, make_model):
+    model = make_model()
+    texts = [SCAM_TEXT, LEGIT_TEXT, "Congratulations, you won a free iPhone! Claim now"]
+    expected = model.predict_batch(texts)
+    assert pool.predict_batch(texts) == expected
+    cleaned = list(TextPreprocessor.clean_many(texts))
+    indicators = [TextPreprocessor.extract_indicators(text) for text in texts]
+    assert pool.predict_batch(texts, cleaned_texts=cleaned, indicators=indicators) == expected
+    assert pool.predict(texts[0]) == expected[0]
+
+
+def test_killed_worker_is_replaced(pool):
+    before = pool.stats()["workers"][0]["pid"]
+    os.kill(before, signal.SIGKILL)
+    assert _wait_for(lambda: pool.stats()["workers"][0]["restarts"] == 1)
+    assert pool.stats()["workers"][0]["pid"] != before
+
+    # The collector survived: results still arrive well before result_timeout
+    started = time.monotonic()
+    for text in (SCAM_TEXT, LEGIT_TEXT, "a fresh message for the new worker"):
+        assert pool.predict(text)[0] in ("Scam", "Legit")
+    assert time.monotonic() - started < 5.0
+    assert _wait_for(lambda: pool.stats()["retiring"] == 0)
+
+
+def test_recycle_replaces_every_worker(pool):
+    before = [worker["pid"] for worker in pool.stats()["workers"]]
+    pool.recycle()
+    assert pool.predict(SCAM_TEXT)[0] == "Scam"
+    after = [worker["pid"] for worker in pool.stats()["workers"]]
+    assert not set(before) & set(after)
+    assert _wait_for(lambda: pool.stats()["retiring"] == 0)
+
+
+def test_worker_stage_timings_reach_parent_metrics(pool):
+    before = _stage_count()
+    pool.predict("worker metrics should be merged into the parent")
+    assert _stage_count() > before
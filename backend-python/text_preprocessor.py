@@ -1,6 +1,234 @@
+import json
+import os
 import re
 import string
-from typing import List
+import unicodedata
+from typing import Dict, Iterable, Iterator, List
+from keyword_matcher import KeywordMatcher
+
+# Precompiled cleaning patterns. Together they produce the output of the
+# original six sequential re.sub passes (URL, www, email, phone, punctuation,
+# whitespace) in at most four passes, and each one runs in linear time. The
+# one difference: an "@" that stands in for an "a" ("p@ypal") does not make
+# an email address, so the leetspeak survives until fold_leetspeak.
+
+# Characters allowed in a URL body. Same set as the original
+# (?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|%xx)+ alternation, since $-_ already
+# covers digits, upper case letters and the %xx escapes.
+_URL_CHARS = r'[!$-_a-z]'
+
+# http(s) URLs and www. hosts. A "www." directly followed by an http(s) URL is
+# left alone, because the original removed the http URL first and then found
+# nothing after the "www.".
+_URL_RE = re.compile(
+    rf'https?://{_URL_CHARS}+|www\.(?!https?://{_URL_CHARS}){_URL_CHARS}+'
+)
+
+# Whole whitespace-delimited runs containing an "@". Like the original
+# \S+@\S+, a run is removed when an "@" has a character on each side; only a
+# run whose every such "@" is leetspeak (see _is_leet_at) and that has no
+# dotted domain after an "@" ("x@y.com") is kept.
+_AT_RUN_RE = re.compile(r'(?<!\S)\S*@\S*')
+_DOTTED_EMAIL_RE = re.compile(r'[^\s@]@[^\s@]*\.[^\s@]')
+
+_DIGIT_RE = re.compile(r'[0-9]')
+_PHONE_RE = re.compile(r'[\+]?[0-9]{1,3}?[-.\s]?[(]?[0-9]{1,4}[)]?[-.\s]?[0-9]{1,4}[-.\s]?[0-9]{1,9}')
+
+# Anything that is not a word character is either punctuation (replaced with a
+# space) or whitespace (collapsed to a single space), so one pass does both.
+_NON_WORD_RE = re.compile(r'\W+')
+
+# Links with or without a scheme ("http://x.com/a", "www.x.com", "x.com/a"):
+# the host, then the path/query up to the next whitespace. Run on lower-cased
+# text. Email domains (preceded by "@") are not links.
+LINK_RE = re.compile(r'(?:https?://)?(?<![\w@.-])((?:[\w-]+\.)+[a-z]{2,24})(?![\w-])(?::\d+)?([/?#]\S*)?')
+EMAIL_DOMAIN_RE = re.compile(r'(?<=[\w.+-])@((?:[\w-]+\.)+[a-z]{2,24})(?![\w-])')
+# Cheap test for anything LINK_RE or EMAIL_DOMAIN_RE could match (a dot followed by a TLD-like name)
+DOTTED_RE = re.compile(r'\.[a-z]{2}')
+
+# Phone numbers as indicators: 7 to 15 digits with the usual separators, or
+# toll-free vanity numbers ("1-800-WINNER"). Run on lower-cased text.
+PHONE_RE = re.compile(
+    r'(?<![\w+])\+?(?:\d[ .()-]{0,2}){6,14}\d(?!\w)'
+    r'|(?<![\w+])(?:1[ .-]?)?\(?8(?:00|33|44|55|66|77|88)\)?[ .-]?[a-z0-9]{2,4}[ .-]?[a-z0-9]{3,4}(?![\w-])'
+)
+_KEYPAD = str.maketrans('abcdefghijklmnopqrstuvwxyz', '22233344455566677778889999')
+_NON_DIGIT_RE = re.compile(r'[^0-9]')
+
+# Unicode obfuscation ("pаypal" with a Cyrillic "а", "ｆｒｅｅ", zero-width
+# characters inside words) is undone by normalize_unicode before cleaning, with
+# precomputed str.translate tables. Messages that are pure ASCII skip it.
+
+# Format characters that render as nothing: zero-width space/joiners, word
+# joiner, BOM, soft hyphen, bidi marks and invisible operators
+_INVISIBLE_CHARS = ('\u00ad\u034f\u061c\u115f\u1160\u17b4\u17b5\u180e\u200b\u200c\u200d\u200e\u200f'
+                    '\u202a\u202b\u202c\u202d\u202e\u2060\u2061\u2062\u2063\u2064\u2066\u2067'
+                    '\u2068\u2069\u3164\ufeff\uffa0')
+_INVISIBLE_TABLE = dict.fromkeys(map(ord, _INVISIBLE_CHARS))
+
+# Letters from other scripts that look like Latin letters (after NFKC), and
+# the Latin letter they imitate: Cyrillic, Greek, Armenian and IPA lookalikes
+_CONFUSABLES = {
+    'a': 'аαɑ', 'b': 'Ьƅ', 'c': 'сϲ', 'd': 'ԁ', 'e': 'еε', 'g': 'ɡ', 'h': 'һհ',
+    'i': 'іιı', 'j': 'јϳ', 'k': 'κ', 'l': 'ӏ', 'n': 'ո', 'o': 'оοօ', 'p': 'рρ',
+    'q': 'ԛ', 's': 'ѕ', 'u': 'υս', 'v': 'νѵ', 'w': 'ԝ', 'x': 'хχ', 'y': 'уγ',
+    'A': 'АΑ', 'B': 'ВΒ', 'C': 'СϹ', 'E': 'ЕΕ', 'H': 'НΗ', 'I': 'ІΙ', 'J': 'Ј',
+    'K': 'КΚ', 'M': 'МΜ', 'N': 'Ν', 'O': 'ОΟ', 'P': 'РΡ', 'S': 'Ѕ', 'T': 'ТΤ',
+    'X': 'ХΧ', 'Y': 'ΥҮ', 'Z': 'Ζ',
+}
+_CONFUSABLE_TABLE = {ord(lookalike): latin for latin, lookalikes in _CONFUSABLES.items()
+                     for lookalike in lookalikes}
+# Words with at least one non-ASCII character, the only ones folding can change
+_NON_ASCII_WORD_RE = re.compile(r'\w*[^\x00-\x7f]\w*')
+_ASCII_LETTER_RE = re.compile(r'[A-Za-z]')
+
+# Leetspeak ("amaz0n", "v3rify", "p@ypal", "g00gle"): in words of at least
+# four letters, one or two lookalike digits or symbols between letters are
+# folded back to the letters they stand for. A pair must repeat one character,
+# so numbers inside words ("win10pro") and short words ("mp3s") are kept, as
+# are runs at the edges of a word ("win10", "24h", "$100").
+_LEET_TABLE = str.maketrans('0134578@$', 'oieastbas')
+_LEET_RE = re.compile(r'(?<=[a-z])[0134578@$]{1,2}(?=[a-z])')
+# Words (runs of letters, digits, "@" and "$") with a candidate between letters
+_LEET_WORD_RE = re.compile(r'(?<![a-z0-9@$])[a-z0-9@$]*[a-z][0134578@$]{1,2}[a-z][a-z0-9@$]*')
+_LEET_MIN_LETTERS = 4
+# Cheap test first: most messages have no candidate character at all
+_LEET_CHAR_RE = re.compile(r'[0134578@$]')
+
+# Keyword groups used by extract_features. They can be replaced per group with a
+# JSON file, see TextPreprocessor.load_keywords and SCAM_KEYWORDS_FILE.
+DEFAULT_KEYWORDS = {
+    'urgency': ['urgent', 'immediately', 'asap', 'hurry', 'limited time', 'act now',
+                'expires', 'deadline', 'today only', 'instant', 'quick'],
+    'money': ['money', 'prize', 'reward', 'won', 'winner', 'free'],
+    'action': ['click', 'call', 'send', 'verify', 'confirm', 'update', 'claim',
+               'activate', 'register', 'subscribe'],
+    'suspicious': ['your account', 'verify your', 'suspended', 'locked',
+                   'tax refund', 'nigerian prince', 'congratulations', 'you have won',
+                   'limited offer', 'click here', 'verify now'],
+}
+
+# Monetary amounts: "$1,000", "500 dollars", "500 usd". Each alternative counts
+# exactly the matches of the original \$[\d,]+, [\d,]+ dollars and [\d,]+ usd
+# patterns, so one findall replaces three.
+_MONEY_AMOUNT_RE = re.compile(r'\$(?=[\d,])|(?<=[\d,]) (?:dollars|usd)')
+
+
+def normalize_host(host: str) -> str:
+    """Lower-case a host name and drop a leading "www." and stray dots/dashes."""
+    host = host.lower().strip('.-')
+    return host[4:] if host.startswith('www.') else host
+
+
+def normalize_phone(number: str) -> str:
+    """
+    Digits of a phone number: vanity letters mapped through the keypad
+    ("1-800-WINNER" -> "1800946637"), separators dropped, and the country code
+    of 11-digit North American numbers removed ("+1-555-123-4567" -> "5551234567").
+    """
+    digits = _NON_DIGIT_RE.sub('', number.lower().translate(_KEYPAD))
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    return digits
+
+
+def _fold_mixed_word(match: re.Match) -> str:
+    # Words that mix lookalikes into Latin letters ("pаypal")
+    word = match.group()
+    return word.translate(_CONFUSABLE_TABLE) if _ASCII_LETTER_RE.search(word) else word
+
+
+def _fold_latin_word(match: re.Match) -> str:
+    # In Latin text, also words spelled entirely with lookalikes ("рауРаl" -> "payPal")
+    word = match.group()
+    folded = word.translate(_CONFUSABLE_TABLE)
+    return folded if folded.isascii() or _ASCII_LETTER_RE.search(word) else word
+
+
+def normalize_unicode(text: str) -> str:
+    """
+    Undo Unicode obfuscation: NFKC (fullwidth and styled letters, ligatures),
+    invisible characters removed, and lookalike letters from other scripts
+    folded to Latin in words that are Latin ("pаypal" with a Cyrillic "а").
+    Words made only of lookalikes are folded when most of the message's
+    letters are Latin, so Greek or Russian text is kept. Pure ASCII text is
+    returned unchanged without any work.
+    """
+    if text.isascii():
+        return text
+    text = unicodedata.normalize('NFKC', text).translate(_INVISIBLE_TABLE)
+    if text.isascii():
+        return text
+    latin = 2 * len(_ASCII_LETTER_RE.findall(text)) > sum(map(str.isalpha, text))
+    return _NON_ASCII_WORD_RE.sub(_fold_latin_word if latin else _fold_mixed_word, text)
+
+
+def _is_leet_at(run: str, index: int) -> bool:
+    """
+    Whether the "@" at run[index] stands in for an "a": it has a letter on
+    each side and is within two letters of the start or end of its word
+    ("p@ypal", "upd@te"), unlike the "@" of "user@localhost".
+    """
+    # Three characters on each side tell "one or two letters" from "more"
+    head = run[max(0, index - 3):index]
+    tail = run[index + 1:index + 4]
+    before = len(head) - len(head.rstrip(string.ascii_lowercase))
+    after = len(tail) - len(tail.lstrip(string.ascii_lowercase))
+    return before > 0 and after > 0 and min(before, after) <= 2
+
+
+def _remove_email(match: re.Match) -> str:
+    run = match.group()
+    if _DOTTED_EMAIL_RE.search(run):
+        return ' '
+    index = run.find('@', 1)
+    while 0 < index < len(run) - 1:
+        if not _is_leet_at(run, index):
+            return ' '
+        index = run.find('@', index + 1)
+    return run
+
+
+def _fold_leet(match: re.Match) -> str:
+    return match.group().translate(_LEET_TABLE)
+
+
+def _fold_leet_word(match: re.Match) -> str:
+    word = match.group()
+    runs = _LEET_RE.findall(word)
+    if sum(map(len, runs)) > 2 or any(len(run) == 2 and run[0] != run[1] for run in runs):
+        return word
+    if sum(map(str.isalpha, word)) < _LEET_MIN_LETTERS:
+        return word
+    return _LEET_RE.sub(_fold_leet, word)
+
+
+def fold_leetspeak(text: str) -> str:
+    """
+    Fold lookalike digits and symbols inside lower-case words: "v3r1fy" ->
+    "verify", "p@ssw0rd" -> "password". Words with more than two of them, a
+    pair of different ones ("win10pro") or fewer than four letters ("mp3s")
+    are left alone.
+    """
+    if not _LEET_CHAR_RE.search(text):
+        return text
+    return _LEET_WORD_RE.sub(_fold_leet_word, text)
+
+
+def _read_keyword_groups(path: str) -> Dict[str, List[str]]:
+    """Read keyword groups from a JSON file, falling back to the defaults per group."""
+    with open(path, encoding='utf-8') as f:
+        loaded = json.load(f)
+    
+    if not isinstance(loaded, dict):
+        raise ValueError(f"Keyword file {path} must contain a JSON object")
+    
+    groups = dict(DEFAULT_KEYWORDS)
+    for name, keywords in loaded.items():
+        if not isinstance(keywords, list) or not all(isinstance(k, str) for k in keywords):
+            raise ValueError(f"Keyword group '{name}' in {path} must be a list of strings")
+        groups[name] = [keyword.lower() for keyword in keywords]
+    return groups
 
 class TextPreprocessor:
     """Handles text preprocessing for scam detection."""
@@ -11,55 +239,91 @@ class TextPreprocessor:
         if not text:
             return ""
         
-        # Convert to lowercase
-        text = text.lower()
+        # Undo homoglyph and invisible-character tricks, then convert to lowercase
+        text = normalize_unicode(text).lower()
         
-        # Remove URLs
-        text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', ' ', text)
-        text = re.sub(r'www\.(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', ' ', text)
+        # Remove URLs (http(s):// and www.) in one pass
+        if '://' in text or 'www.' in text:
+            text = _URL_RE.sub(' ', text)
         
-        # Remove email addresses
-        text = re.sub(r'\S+@\S+', ' ', text)
+        # Remove email addresses ("@" leetspeak without a dotted domain stays)
+        if '@' in text:
+            text = _AT_RUN_RE.sub(_remove_email, text)
         
         # Remove phone numbers (various formats)
-        text = re.sub(r'[\+]?[0-9]{1,3}?[-.\s]?[(]?[0-9]{1,4}[)]?[-.\s]?[0-9]{1,4}[-.\s]?[0-9]{1,9}', ' ', text)
+        if _DIGIT_RE.search(text):
+            text = _PHONE_RE.sub(' ', text)
         
-        # Remove special characters but keep spaces
-        text = re.sub(r'[^\w\s]', ' ', text)
+        # Fold leetspeak once the links, emails and phone numbers, whose digits
+        # and "@" it would fold, are gone
+        text = fold_leetspeak(text)
         
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
+        # Replace special characters and whitespace runs with a single space,
+        # then strip leading/trailing whitespace
+        return _NON_WORD_RE.sub(' ', text).strip()
+    
+    @staticmethod
+    def clean_many(texts: Iterable[str]) -> Iterator[str]:
+        """Lazily clean an iterable of texts, yielding one cleaned text per input."""
+        clean_text = TextPreprocessor.clean_text
+        for text in texts:
+            yield clean_text(text)
+    
+    @staticmethod
+    def extract_indicators(text: str) -> Dict[str, List[str]]:
+        """
+        Pull the indicators clean_text throws away out of the raw text.
         
-        # Strip leading/trailing whitespace
-        text = text.strip()
+        Returns:
+            dict: "domains" (normalized link and email hosts) and "phones"
+            (normalize_phone digits), each without duplicates, in order
+        """
+        lowered = normalize_unicode(text).lower()
+        domains: Dict[str, None] = {}
+        if DOTTED_RE.search(lowered):
+            for match in LINK_RE.finditer(lowered):
+                domains[normalize_host(match.group(1))] = None
+            if '@' in lowered:
+                for match in EMAIL_DOMAIN_RE.finditer(lowered):
+                    domains[normalize_host(match.group(1))] = None
+        phones: Dict[str, None] = {}
+        if _DIGIT_RE.search(lowered):
+            for match in PHONE_RE.finditer(lowered):
+                phones[normalize_phone(match.group())] = None
+        return {"domains": list(domains), "phones": list(phones)}
+    
+    @classmethod
+    def load_keywords(cls, path: str) -> None:
+        """
+        Load keyword lists from a JSON file and rebuild the keyword matcher.
         
-        return text
+        The file maps group names (urgency, money, action, suspicious) to
+        lists of keywords/phrases. Groups present in the file replace the
+        built-in lists; missing groups keep their defaults.
+        """
+        cls.keyword_matcher = KeywordMatcher(_read_keyword_groups(path))
     
     @staticmethod
     def extract_features(text: str) -> dict:
         """Extract linguistic features that help identify scams."""
         features = {}
+        lowered = fold_leetspeak(normalize_unicode(text).lower())
+        
+        # Count urgency words, action verbs, suspicious phrases and monetary
+        # keywords with a single pass of the keyword automaton
+        groups = TextPreprocessor.keyword_matcher.count_groups(lowered)
         
         # Count urgency words
-        urgency_words = ['urgent', 'immediately', 'asap', 'hurry', 'limited time', 'act now', 
-                        'expires', 'deadline', 'today only', 'instant', 'quick']
-        features['urgency_count'] = sum(1 for word in urgency_words if word in text.lower())
+        features['urgency_count'] = groups['urgency'][0]
         
-        # Count monetary references
-        money_patterns = [r'\$[\d,]+', r'[\d,]+ dollars', r'[\d,]+ usd', r'money', 
-                         r'prize', r'reward', r'won', r'winner', r'free']
-        features['money_count'] = sum(len(re.findall(pattern, text.lower())) for pattern in money_patterns)
+        # Count monetary references (amounts plus every monetary keyword occurrence)
+        features['money_count'] = len(_MONEY_AMOUNT_RE.findall(lowered)) + groups['money'][1]
         
         # Count action verbs (common in scams)
-        action_words = ['click', 'call', 'send', 'verify', 'confirm', 'update', 'claim', 
-                       'activate', 'register', 'subscribe']
-        features['action_count'] = sum(1 for word in action_words if word in text.lower())
+        features['action_count'] = groups['action'][0]
         
         # Count suspicious phrases
-        suspicious_phrases = ['your account', 'verify your', 'suspended', 'locked', 
-                             'tax refund', 'nigerian prince', 'congratulations', 'you have won',
-                             'limited offer', 'click here', 'verify now']
-        features['suspicious_count'] = sum(1 for phrase in suspicious_phrases if phrase in text.lower())
+        features['suspicious_count'] = groups['suspicious'][0]
         
         # Text length
         features['text_length'] = len(text)
@@ -68,6 +332,12 @@ class TextPreprocessor:
         # Check for excessive punctuation
         features['exclamation_count'] = text.count('!')
         features['question_count'] = text.count('?')
-        features['caps_ratio'] = sum(1 for c in text if c.isupper()) / max(len(text), 1)
+        features['caps_ratio'] = sum(map(str.isupper, text)) / max(len(text), 1)
         
         return features
+
+
+TextPreprocessor.keyword_matcher = KeywordMatcher(
+    _read_keyword_groups(os.environ['SCAM_KEYWORDS_FILE'])
+    if os.environ.get('SCAM_KEYWORDS_FILE') else DEFAULT_KEYWORDS
+)
@@ -3,14 +3,24 @@ Training script for the scam detection model.
 Uses TF-IDF vectorization + Logistic Regression.
 """
 
+import argparse
+import io
+import multiprocessing as mp
 import os
+import pickle
+import tempfile
+import time
+from collections import defaultdict, deque
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.pipeline import make_pipeline
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.model_selection import StratifiedKFold, cross_val_predict, train_test_split
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, f1_score
 import joblib
+from calibration import CALIBRATION_METHODS, calibration_report, fit_calibrator, save_calibrator
+from model_artifact import DEFAULT_BLOCK_SIZE, WEIGHT_TYPES, build_artifact, export_artifact
 from text_preprocessor import TextPreprocessor
 
 # Sample training data (you can replace this with your actual dataset)
@@ -67,12 +77,51 @@ def load_training_data(file_path: str = None):
         print("To use your own data, place a CSV file in the dataset/ folder with columns: message, label")
         return generate_sample_data()
 
-def train_model(data_path: str = None):
-    """Train the scam detection model."""
-    print("=" * 60)
-    print("Training Scam Detection Model")
-    print("=" * 60)
+FEATURE_MODES = ('tfidf', 'hashing')
+
+CALIBRATION_PATH = 'model/calibration.json'
+
+def build_vectorizer(feature_mode: str = 'tfidf', hash_features: int = 2 ** 20):
+    """
+    Build the (unfitted) text vectorizer for a feature mode.
     
+    - tfidf: TF-IDF over a fitted vocabulary of at most 5000 terms
+    - hashing: terms hashed into a fixed space of hash_features columns,
+      followed by idf weighting. There is no vocabulary dict, so memory stays
+      constant no matter how many distinct terms the corpus has.
+    """
+    if feature_mode == 'tfidf':
+        return TfidfVectorizer(
+            max_features=5000,
+            ngram_range=(1, 2),  # Unigrams and bigrams
+            min_df=2,
+            max_df=0.95,
+            stop_words='english'
+        )
+    if feature_mode == 'hashing':
+        return make_pipeline(
+            HashingVectorizer(
+                n_features=hash_features,
+                ngram_range=(1, 2),  # Unigrams and bigrams
+                stop_words='english',
+                alternate_sign=False,
+                norm=None
+            ),
+            TfidfTransformer()
+        )
+    raise ValueError(f"Unknown feature mode '{feature_mode}'. Choose one of {FEATURE_MODES}")
+
+def build_classifier():
+    """Build the (unfitted) Logistic Regression model."""
+    return LogisticRegression(
+        random_state=42,
+        max_iter=1000,
+        C=1.0,
+        class_weight='balanced'  # Handle class imbalance
+    )
+
+def prepare_data(data_path: str = None):
+    """Load, clean and split the training data into (X_train, X_test, y_train, y_test)."""
     # Load data
     df = load_training_data(data_path)
     
@@ -85,7 +134,7 @@ def train_model(data_path: str = None):
     
     # Preprocess text
     preprocessor = TextPreprocessor()
-    df['cleaned_message'] = df['message'].apply(preprocessor.clean_text)
+    df['cleaned_message'] = list(preprocessor.clean_many(df['message']))
     
     # Remove empty messages
     df = df[df['cleaned_message'].str.len() > 0]
@@ -104,15 +153,98 @@ def train_model(data_path: str = None):
     print(f"\nTraining set: {len(X_train)} samples")
     print(f"Test set: {len(X_test)} samples")
     
-    # TF-IDF Vectorization
-    print("\nCreating TF-IDF features...")
-    vectorizer = TfidfVectorizer(
-        max_features=5000,
-        ngram_range=(1, 2),  # Unigrams and bigrams
-        min_df=2,
-        max_df=0.95,
-        stop_words='english'
-    )
+    return X_train, X_test, y_train, y_test
+
+def print_calibration(raw_probabilities, labels, calibrator):
+    """Report test-set calibration before and after the calibrator."""
+    rows = [("raw", calibration_report(raw_probabilities, labels))]
+    if calibrator is not None:
+        rows.append((calibrator.method, calibration_report(calibrator.calibrate(raw_probabilities), labels)))
+    print(f"\n{'Probabilities':<15}{'Brier':>10}{'Log loss':>10}{'ECE':>10}")
+    for name, report in rows:
+        print(f"{name:<15}{report['brier']:>10.4f}{report['log_loss']:>10.4f}{report['ece']:>10.4f}")
+
+def print_weight_report(model, vectorizer, X_test, y_test, block_size: int = DEFAULT_BLOCK_SIZE) -> dict:
+    """
+    Report the test-set accuracy of the artifact with each weight type
+    (float64, float32, int8) against the float64 model.
+    
+    Returns:
+        dict: weight type -> {bytes, accuracy, accuracy_delta, max_probability_delta, flipped}
+    """
+    reference = model.predict_proba(vectorizer.transform(X_test))[:, 1]
+    reference_accuracy = accuracy_score(y_test, (reference >= 0.5).astype(int))
+    report = {}
+    print("\nArtifact weight types against the float64 model (test split):")
+    print(f"{'Weights':<10}{'idf+coef KB':>13}{'Accuracy':>10}{'Delta':>10}{'Max |dp|':>10}{'Flipped':>9}")
+    for weights in WEIGHT_TYPES:
+        classifier, artifact_vectorizer = build_artifact(model, vectorizer, weights, block_size)
+        probabilities = classifier.predict_proba(artifact_vectorizer.transform(X_test))[:, 1]
+        accuracy = accuracy_score(y_test, (probabilities >= 0.5).astype(int))
+        report[weights] = {
+            "bytes": int(classifier.coef.nbytes + artifact_vectorizer.idf_.nbytes),
+            "accuracy": float(accuracy),
+            "accuracy_delta": float(accuracy - reference_accuracy),
+            "max_probability_delta": float(np.max(np.abs(probabilities - reference), initial=0.0)),
+            "flipped": int(np.sum((probabilities >= 0.5) != (reference >= 0.5))),
+        }
+        row = report[weights]
+        print(f"{weights:<10}{row['bytes'] / 1024:>13.1f}{row['accuracy']:>10.4f}{row['accuracy_delta']:>+10.4f}"
+              f"{row['max_probability_delta']:>10.2e}{row['flipped']:>9}")
+    return report
+
+def fit_training_calibration(X_train, y_train, method: str = 'platt', folds: int = 5):
+    """
+    Fit a calibrator on out-of-fold predictions of the training rows.
+    
+    Each row is scored by a classifier trained on the other folds, so the
+    calibrator sees the model's behaviour on unseen messages without using
+    the test split.
+    
+    Returns:
+        Calibrator, or None for method 'none' or too few rows per class
+    """
+    if method == 'none':
+        return None
+    folds = min(folds, int(np.bincount(y_train, minlength=2).min()))
+    if folds < 2:
+        print("⚠️  Too few rows per class to calibrate, serving raw probabilities")
+        return None
+    print(f"\nFitting {method} calibration on {folds}-fold out-of-fold predictions...")
+    out_of_fold = cross_val_predict(build_classifier(), X_train, y_train, method='predict_proba',
+                                    cv=StratifiedKFold(folds, shuffle=True, random_state=42))[:, 1]
+    return fit_calibrator(out_of_fold, y_train, method, meta={"fitted_on": f"{folds}-fold out-of-fold predictions"})
+
+def train_model(data_path: str = None, export_mmap_artifact: bool = True,
+                feature_mode: str = 'tfidf', hash_features: int = 2 ** 20,
+                calibration: str = 'platt', weights: str = 'float64',
+                block_size: int = DEFAULT_BLOCK_SIZE):
+    """
+    Train the scam detection model.
+    
+    Args:
+        data_path: CSV file with message and label columns (sample data if missing)
+        export_mmap_artifact: also export the pickle-free, memory-mapped
+            artifact (model/artifact/) that the API loads first
+        feature_mode: 'tfidf' (fitted vocabulary) or 'hashing' (fixed hash space)
+        hash_features: number of hash columns in hashing mode
+        calibration: 'platt', 'isotonic' or 'none'; stored in the artifact's
+            meta.json, and as model/calibration.json for the joblib files
+        weights: 'float64', 'float32' or 'int8' idf and coefficients in the artifact
+        block_size: features per int8 quantization scale
+    """
+    print("=" * 60)
+    print("Training Scam Detection Model")
+    print("=" * 60)
+    
+    X_train, X_test, y_train, y_test = prepare_data(data_path)
+    
+    # Vectorization
+    if feature_mode == 'hashing':
+        print(f"\nCreating hashed TF-IDF features ({hash_features} columns)...")
+    else:
+        print("\nCreating TF-IDF features...")
+    vectorizer = build_vectorizer(feature_mode, hash_features)
     
     X_train_tfidf = vectorizer.fit_transform(X_train)
     X_test_tfidf = vectorizer.transform(X_test)
@@ -121,12 +253,7 @@ def train_model(data_path: str = None):
     
     # Train Logistic Regression model
     print("\nTraining Logistic Regression model...")
-    model = LogisticRegression(
-        random_state=42,
-        max_iter=1000,
-        C=1.0,
-        class_weight='balanced'  # Handle class imbalance
-    )
+    model = build_classifier()
     
     model.fit(X_train_tfidf, y_train)
     
@@ -141,6 +268,11 @@ def train_model(data_path: str = None):
     print("\nConfusion Matrix:")
     print(confusion_matrix(y_test, y_pred))
     
+    calibrator = fit_training_calibration(X_train_tfidf, y_train, calibration)
+    print_calibration(model.predict_proba(X_test_tfidf)[:, 1], y_test, calibrator)
+    
+    print_weight_report(model, vectorizer, X_test, y_test, block_size)
+    
     # Save model and vectorizer
     os.makedirs('model', exist_ok=True)
     
@@ -150,13 +282,348 @@ def train_model(data_path: str = None):
     joblib.dump(model, model_path)
     joblib.dump(vectorizer, vectorizer_path)
     
+    # The joblib files' calibration; a model trained without calibration
+    # removes the previous model's
+    save_calibrator(calibrator, CALIBRATION_PATH)
+    
     print(f"\n✅ Model saved to {model_path}")
     print(f"✅ Vectorizer saved to {vectorizer_path}")
+    if calibrator is not None:
+        print(f"✅ Calibration saved to {CALIBRATION_PATH}")
+    
+    if export_mmap_artifact:
+        # The artifact carries its own copy of the calibration, swapped in with the weights
+        artifact_dir = export_artifact(model, vectorizer, 'model/artifact', weights, block_size, calibrator)
+        print(f"✅ Memory-mapped artifact exported to {artifact_dir} ({weights} weights)")
+    
+    print("\n" + "=" * 60)
+    print("Training completed successfully!")
+    print("=" * 60)
+
+def compare_feature_modes(data_path: str = None, hash_features: int = 2 ** 20):
+    """
+    Train both feature modes on the same split and compare them.
+    
+    Returns:
+        dict: feature mode -> {accuracy, f1, vectorizer_bytes}
+    """
+    print("=" * 60)
+    print("Comparing TF-IDF and hashing feature modes")
+    print("=" * 60)
+    
+    X_train, X_test, y_train, y_test = prepare_data(data_path)
+    results = {}
+    
+    for feature_mode in FEATURE_MODES:
+        vectorizer = build_vectorizer(feature_mode, hash_features)
+        model = build_classifier()
+        model.fit(vectorizer.fit_transform(X_train), y_train)
+        y_pred = model.predict(vectorizer.transform(X_test))
+        
+        # Serialized size of the fitted vectorizer (vocabulary dict, idf, stop words)
+        buffer = io.BytesIO()
+        joblib.dump(vectorizer, buffer)
+        
+        results[feature_mode] = {
+            "accuracy": accuracy_score(y_test, y_pred),
+            "f1": f1_score(y_test, y_pred),
+            "vectorizer_bytes": buffer.tell()
+        }
+    
+    print(f"\n{'Mode':<10}{'Accuracy':>10}{'F1':>10}{'Vectorizer size':>18}")
+    for feature_mode, result in results.items():
+        print(f"{feature_mode:<10}{result['accuracy']:>10.4f}{result['f1']:>10.4f}"
+              f"{result['vectorizer_bytes'] / 1024:>15.1f} KB")
+    
+    delta = results['hashing']['accuracy'] - results['tfidf']['accuracy']
+    print(f"\nAccuracy delta (hashing - tfidf): {delta:+.4f}")
+    return results
+
+def _clean_messages(messages):
+    """Clean a list of messages (runs in a worker process)."""
+    return list(TextPreprocessor.clean_many(messages))
+
+def _cleaned_chunks(data_path: str, chunk_size: int, pool, processes: int, timings: dict,
+                    test_fraction: float):
+    """
+    Stream (cleaned messages, labels, is_test mask) per CSV chunk.
+    
+    Chunks are cleaned in parallel on the process pool (of the given number
+    of processes), with at most two chunks per process in flight so memory
+    stays bounded. The train/test assignment is seeded per chunk.
+    """
+    in_flight = deque()
+    max_in_flight = 2 * processes
+    reader = pd.read_csv(data_path, chunksize=chunk_size, usecols=['message', 'label'])
+    chunk_index = 0
+    
+    def finish_oldest():
+        labels, is_test, pending = in_flight.popleft()
+        start = time.perf_counter()
+        cleaned = np.asarray(pending.get(), dtype=object)
+        timings['clean'] += time.perf_counter() - start
+        keep = np.fromiter((len(text) > 0 for text in cleaned), dtype=bool, count=len(cleaned))
+        return cleaned[keep], labels[keep], is_test[keep]
+    
+    while True:
+        start = time.perf_counter()
+        chunk = next(reader, None)
+        timings['read'] += time.perf_counter() - start
+        if chunk is None:
+            break
+        
+        chunk = chunk.dropna(subset=['message'])
+        labels = chunk['label'].to_numpy(dtype=np.int64)
+        rng = np.random.default_rng(42 + chunk_index)
+        is_test = rng.random(len(chunk)) < test_fraction
+        pending = pool.apply_async(_clean_messages, (chunk['message'].astype(str).tolist(),))
+        in_flight.append((labels, is_test, pending))
+        chunk_index += 1
+        
+        if len(in_flight) >= max_in_flight:
+            yield finish_oldest()
+    
+    while in_flight:
+        yield finish_oldest()
+
+def _spill_chunks(chunks, spill_file):
+    """Pass chunks through while pickling each one to spill_file, for _spilled_chunks."""
+    for chunk in chunks:
+        pickle.dump(chunk, spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+        yield chunk
+
+def _spilled_chunks(spill_path: str, timings: dict):
+    """Stream the chunks written by _spill_chunks, one at a time."""
+    with open(spill_path, 'rb') as spill_file:
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = pickle.load(spill_file)
+            except EOFError:
+                return
+            finally:
+                timings['read'] += time.perf_counter() - start
+            yield chunk
+
+class _Reservoir:
+    """A uniform sample of at most capacity (probability, label) pairs from a stream (algorithm R)."""
+    
+    def __init__(self, capacity: int, seed: int = 0):
+        self.probabilities = np.empty(capacity, dtype=np.float64)
+        self.labels = np.empty(capacity, dtype=np.int64)
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+    
+    def add(self, probabilities: np.ndarray, labels: np.ndarray):
+        capacity = len(self.labels)
+        # Fill the free slots first, then replace a random slot with falling probability
+        free = max(0, min(capacity - self.seen, len(labels)))
+        self.probabilities[self.seen:self.seen + free] = probabilities[:free]
+        self.labels[self.seen:self.seen + free] = labels[:free]
+        if free < len(labels):
+            positions = self._rng.integers(0, np.arange(self.seen + free, self.seen + len(labels)) + 1)
+            kept = positions < capacity
+            self.probabilities[positions[kept]] = probabilities[free:][kept]
+            self.labels[positions[kept]] = labels[free:][kept]
+        self.seen += len(labels)
+    
+    def values(self):
+        size = min(self.seen, len(self.labels))
+        return self.probabilities[:size], self.labels[:size]
+
+def train_streaming(data_path: str, chunk_size: int = 100000, processes: int = None,
+                    hash_features: int = 2 ** 20, epochs: int = 1, test_fraction: float = 0.2,
+                    export_mmap_artifact: bool = True, calibration: str = 'platt',
+                    weights: str = 'float64', block_size: int = DEFAULT_BLOCK_SIZE,
+                    calibration_rows: int = 100000):
+    """
+    Train out-of-core on a CSV that does not fit in memory.
+    
+    The CSV is streamed in chunks and cleaned in parallel across a process
+    pool. Features are hashed into a fixed space (no vocabulary to hold), and
+    an SGD logistic-regression model is fitted with partial_fit, so memory is
+    bounded by the chunk size and hash_features, not the corpus size:
+    
+    1. df pass: document frequencies and class counts -> idf and class weights
+    2. fit pass(es): tf-idf weighted chunks -> SGDClassifier.partial_fit
+    3. evaluation pass: accuracy on the held-out rows. Alternate held-out
+       rows go to a calibration sample and a report sample (reservoirs of at
+       most calibration_rows each): the calibrator is fitted on the first
+       and its calibration reported on the second.
+    
+    Cleaning is the slowest stage, so only pass 1 reads the CSV: it also
+    writes the cleaned chunks to a temporary file (about the size of the
+    cleaned text) that the later passes read back.
+    
+    The saved model is served like a --feature-mode hashing model.
+    
+    Returns:
+        dict: accuracy, confusion matrix, row counts and per-stage timings (seconds)
+    """
+    print("=" * 60)
+    print("Training Scam Detection Model (streaming)")
+    print("=" * 60)
+    
+    if not data_path or not os.path.exists(data_path):
+        raise ValueError("Streaming training needs an existing CSV dataset")
+    
+    processes = processes or os.cpu_count() or 1
+    timings = defaultdict(float)
+    total_start = time.perf_counter()
+    
+    hasher = build_vectorizer('hashing', hash_features).steps[0][1]
+    document_frequency = np.zeros(hash_features, dtype=np.int64)
+    class_counts = np.zeros(2, dtype=np.int64)
+    n_train = n_test = 0
+    
+    with tempfile.TemporaryDirectory(prefix='scam-train-') as spill_dir:
+        spill_path = os.path.join(spill_dir, 'cleaned_chunks.pickle')
+        
+        # Pass 1: document frequencies and class balance over the training rows
+        print(f"\nPass 1: document frequencies ({processes} cleaning processes)...")
+        with mp.Pool(processes) as pool, open(spill_path, 'wb') as spill_file:
+            chunks = _cleaned_chunks(data_path, chunk_size, pool, processes, timings, test_fraction)
+            for cleaned, labels, is_test in _spill_chunks(chunks, spill_file):
+                start = time.perf_counter()
+                counts = hasher.transform(cleaned[~is_test])
+                document_frequency += np.bincount(counts.indices, minlength=hash_features)
+                timings['hash'] += time.perf_counter() - start
+                
+                class_counts += np.bincount(labels[~is_test], minlength=2)[:2]
+                n_train += int((~is_test).sum())
+                n_test += int(is_test.sum())
+        
+        if n_train == 0 or class_counts.min() == 0:
+            raise ValueError("Streaming training needs both scam and legit training rows")
+        
+        print(f"Training rows: {n_train}, held-out rows: {n_test}")
+        
+        # Same smoothed idf as TfidfTransformer(smooth_idf=True)
+        transformer = TfidfTransformer()
+        transformer.idf_ = np.log((1 + n_train) / (1 + document_frequency)) + 1.0
+        transformer.n_features_in_ = hash_features
+        class_weight = {label: n_train / (2.0 * class_counts[label]) for label in (0, 1)}
+        
+        model = SGDClassifier(
+            loss='log_loss',
+            alpha=1e-6,
+            random_state=42,
+            class_weight=class_weight  # Handle class imbalance
+        )
+        
+        # Pass 2: out-of-core fit
+        for epoch in range(epochs):
+            print(f"Pass 2: partial_fit epoch {epoch + 1}/{epochs}...")
+            for cleaned, labels, is_test in _spilled_chunks(spill_path, timings):
+                if not (~is_test).any():
+                    continue
+                start = time.perf_counter()
+                X = transformer.transform(hasher.transform(cleaned[~is_test]))
+                timings['hash'] += time.perf_counter() - start
+                
+                start = time.perf_counter()
+                model.partial_fit(X, labels[~is_test], classes=np.array([0, 1]))
+                timings['fit'] += time.perf_counter() - start
+        
+        # Pass 3: held-out evaluation
+        print("Pass 3: evaluating on held-out rows...")
+        matrix = np.zeros((2, 2), dtype=np.int64)
+        fit_sample = _Reservoir(calibration_rows, seed=0)
+        report_sample = _Reservoir(calibration_rows, seed=1)
+        held_out_seen = 0
+        for cleaned, labels, is_test in _spilled_chunks(spill_path, timings):
+            if not is_test.any():
+                continue
+            start = time.perf_counter()
+            probabilities = model.predict_proba(transformer.transform(hasher.transform(cleaned[is_test])))[:, 1]
+            y_pred = (probabilities >= 0.5).astype(np.int64)
+            np.add.at(matrix, (labels[is_test], y_pred), 1)
+            for_fit = (np.arange(held_out_seen, held_out_seen + len(probabilities)) % 2) == 0
+            held_out_seen += len(probabilities)
+            fit_sample.add(probabilities[for_fit], labels[is_test][for_fit])
+            report_sample.add(probabilities[~for_fit], labels[is_test][~for_fit])
+            timings['evaluate'] += time.perf_counter() - start
+    
+    calibrator = None
+    if calibration != 'none':
+        fit_probabilities, fit_labels = fit_sample.values()
+        if len(np.unique(fit_labels)) == 2:
+            calibrator = fit_calibrator(fit_probabilities, fit_labels, calibration,
+                                        meta={"fitted_on": "held-out rows"})
+            report_probabilities, report_labels = report_sample.values()
+            if len(report_labels):
+                print_calibration(report_probabilities, report_labels, calibrator)
+    
+    vectorizer = make_pipeline(hasher, transformer)
+    
+    start = time.perf_counter()
+    os.makedirs('model', exist_ok=True)
+    joblib.dump(model, 'model/scam_model.pkl')
+    joblib.dump(vectorizer, 'model/tfidf_vectorizer.pkl')
+    save_calibrator(calibrator, CALIBRATION_PATH)
+    if export_mmap_artifact:
+        export_artifact(model, vectorizer, 'model/artifact', weights, block_size, calibrator)
+    timings['save'] += time.perf_counter() - start
+    timings['total'] = time.perf_counter() - total_start
+    
+    accuracy = np.trace(matrix) / max(matrix.sum(), 1)
+    print(f"\nHeld-out Accuracy: {accuracy:.4f}")
+    print("\nConfusion Matrix:")
+    print(matrix)
+    print("\nStage timings (seconds):")
+    for stage in ('read', 'clean', 'hash', 'fit', 'evaluate', 'save', 'total'):
+        print(f"  {stage:<10}{timings[stage]:>10.2f}")
+    print("\n✅ Model saved to model/scam_model.pkl")
     print("\n" + "=" * 60)
     print("Training completed successfully!")
     print("=" * 60)
+    
+    return {
+        "accuracy": float(accuracy),
+        "confusion_matrix": matrix.tolist(),
+        "train_rows": n_train,
+        "test_rows": n_test,
+        "timings": dict(timings)
+    }
 
 if __name__ == "__main__":
     # You can specify a path to your dataset CSV file
-    # Example: train_model("../dataset/scam_data.csv")
-    train_model()
+    # Example: python train_model.py ../dataset/scam_dataset.csv
+    parser = argparse.ArgumentParser(description="Train the scam detection model.")
+    parser.add_argument("data_path", nargs="?", default=None,
+                        help="CSV file with message and label columns")
+    parser.add_argument("--no-artifact", action="store_true",
+                        help="only save the joblib pickles, skip the memory-mapped artifact")
+    parser.add_argument("--feature-mode", choices=FEATURE_MODES, default="tfidf",
+                        help="fitted TF-IDF vocabulary or fixed-size hashing space")
+    parser.add_argument("--hash-features", type=int, default=2 ** 20,
+                        help="number of hash columns for --feature-mode hashing")
+    parser.add_argument("--compare-feature-modes", action="store_true",
+                        help="train both feature modes on the same split and report accuracy")
+    parser.add_argument("--streaming", action="store_true",
+                        help="stream the CSV in chunks and train out-of-core (hashing + SGD)")
+    parser.add_argument("--chunk-size", type=int, default=100000,
+                        help="rows per chunk for --streaming")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="cleaning processes for --streaming (default: all cores)")
+    parser.add_argument("--epochs", type=int, default=1,
+                        help="passes over the training rows for --streaming")
+    parser.add_argument("--calibration", choices=CALIBRATION_METHODS, default="platt",
+                        help="probability calibration stored with the model (artifact meta.json, model/calibration.json)")
+    parser.add_argument("--weights", choices=WEIGHT_TYPES, default="float64",
+                        help="idf and coefficient storage in the memory-mapped artifact")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE,
+                        help="features per quantization scale for --weights int8 (a power of two)")
+    args = parser.parse_args()
+    
+    if args.compare_feature_modes:
+        compare_feature_modes(args.data_path, args.hash_features)
+    elif args.streaming:
+        train_streaming(args.data_path, chunk_size=args.chunk_size, processes=args.processes,
+                        hash_features=args.hash_features, epochs=args.epochs,
+                        export_mmap_artifact=not args.no_artifact, calibration=args.calibration,
+                        weights=args.weights, block_size=args.block_size)
+    else:
+        train_model(args.data_path, export_mmap_artifact=not args.no_artifact,
+                    feature_mode=args.feature_mode, hash_features=args.hash_features,
+                    calibration=args.calibration, weights=args.weights, block_size=args.block_size)
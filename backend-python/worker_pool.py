@@ -0,0 +1,459 @@
+"""
+Multi-process inference worker pool with shared model memory.
+
+The model is loaded once in the parent process. Workers are forked from it,
+so the vectorizer, coefficients and (for memory-mapped artifacts) the arrays
+themselves are shared copy-on-write instead of being loaded N times. Request
+threads in the parent send jobs to the least busy worker over that worker's
+own pipe and wait on a future for the result.
+
+Every worker has private task and result pipes, so no lock is shared across
+processes: a worker that crashes or is killed can't wedge the others. Only
+the result collector thread closes result pipes.
+
+Workers are forked while the parent runs other threads, so a worker starts
+by replacing every lock its predictions use (prediction cache, metrics,
+reload locks). Stage timings recorded in a worker are sent back with each
+result and merged into the parent's /metrics.
+"""
+
+import gc
+import itertools
+import math
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional, Set, Tuple
+
+from calibration import DEFAULT_THRESHOLD, per_text_thresholds
+from metrics import merge_observations, reset_after_fork, take_observations
+from prediction_cache import PredictionCache
+from prefilter import decision_holds, decision_result
+
+
+class PoolOverloaded(RuntimeError):
+    """Raised when too many requests are already waiting for a worker."""
+
+
+class _Worker:
+    """Parent-side handle of one worker process."""
+
+    def __init__(self, index: int, process, tasks, results):
+        self.index = index
+        self.process = process
+        self.tasks = tasks
+        self.results = results
+        self.send_lock = threading.Lock()
+        self.outstanding: Set[int] = set()
+        # Set once the worker has been told to exit or found dead; no new jobs are sent
+        self.retired = False
+        # Set by the result collector once it has closed the result pipe
+        self.closed = False
+
+
+class InferencePool:
+    """
+    Pool of forked worker processes that run ScamDetectionModel predictions.
+
+    Exposes predict() and predict_batch() with the same signatures as
+    ScamDetectionModel, so request handlers can use either one.
+
+    Backpressure: at most max_pending jobs may be queued or running. When the
+    limit is reached, callers wait up to submit_timeout seconds for a slot and
+    then get PoolOverloaded.
+    """
+
+    def __init__(self, model, processes: Optional[int] = None, max_pending: int = 1024,
+                 submit_timeout: float = 0.5, result_timeout: float = 30.0,
+                 min_batch_chunk: int = 64):
+        if 'fork' not in mp.get_all_start_methods():
+            raise RuntimeError("The inference worker pool needs the 'fork' start method")
+
+        self.model = model
+        self.processes = processes or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.submit_timeout = submit_timeout
+        self.result_timeout = result_timeout
+        self.min_batch_chunk = min_batch_chunk
+
+        self._ctx = mp.get_context('fork')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._futures: Dict[int, Tuple[Future, _Worker]] = {}
+        self._job_ids = itertools.count(1)
+        self._closing = False
+
+        # Per-worker counters written by the children (one writer per slot)
+        self._processed = self._ctx.Array('q', self.processes, lock=False)
+        self._errors = self._ctx.Array('q', self.processes, lock=False)
+        self._last_active = self._ctx.Array('d', self.processes, lock=False)
+        self._restarts = [0] * self.processes
+        self._workers: List[Optional[_Worker]] = [None] * self.processes
+        # Replaced workers that are still finishing the jobs already sent to them
+        self._retiring: List[_Worker] = []
+        self.recycles = 0
+
+    def start(self) -> "InferencePool":
+        """Fork the workers and start the result collector and health monitor."""
+        # Move everything allocated so far out of the GC's reach, so collections
+        # in the children don't touch (and un-share) the parent's pages
+        gc.collect()
+        gc.freeze()
+
+        for index in range(self.processes):
+            self._spawn(index)
+
+        threading.Thread(target=self._collect_results, name="pool-results", daemon=True).start()
+        threading.Thread(target=self._monitor_workers, name="pool-monitor", daemon=True).start()
+        return self
+
+    def _spawn(self, index: int):
+        task_reader, task_writer = self._ctx.Pipe(duplex=False)
+        result_reader, result_writer = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self.model, task_reader, result_writer,
+                  self._processed, self._errors, self._last_active),
+            name=f"inference-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        # The child owns these ends now
+        task_reader.close()
+        result_writer.close()
+        with self._lock:
+            self._workers[index] = _Worker(index, process, task_writer, result_reader)
+
+    def predict(self, text: str, explain: bool = True,
+                threshold: Optional[float] = None) -> Tuple[str, float, List[str], List[dict]]:
+        """Score one message on a worker, unless the pre-filter cascade settles it here."""
+        prefilter = self.model.prefilter
+        if prefilter is not None:
+            decision = prefilter.check(text)
+            if decision is not None and decision_holds(decision, DEFAULT_THRESHOLD if threshold is None
+                                                       else threshold):
+                return decision_result(decision, explain)
+        return self._wait(*self._submit('one', (text, explain, threshold)))
+
+    def predict_batch(self, texts: List[str], explain=True, threshold=None,
+                      cleaned_texts: Optional[List[str]] = None,
+                      indicators: Optional[List[dict]] = None) -> List[Tuple[str, float, List[str], List[dict]]]:
+        """
+        Score a batch, split into chunks so every worker takes a share.
+
+        The pre-filter cascade runs here in the parent, so settled messages
+        never cross a pipe and its counters cover every worker.
+        """
+        if not texts:
+            return []
+
+        explain_flags = [explain] * len(texts) if isinstance(explain, bool) else list(explain)
+        thresholds = per_text_thresholds(threshold, len(texts))
+        prefilter = self.model.prefilter
+        decisions = prefilter.check_many(texts) if prefilter is not None else [None] * len(texts)
+        results = [decision_result(decision, wanted)
+                   if decision is not None and decision_holds(decision, limit) else None
+                   for decision, wanted, limit in zip(decisions, explain_flags, thresholds)]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        pending_texts = [texts[i] for i in pending]
+        pending_flags = [explain_flags[i] for i in pending]
+        pending_thresholds = [thresholds[i] for i in pending]
+        pending_cleaned = [cleaned_texts[i] for i in pending] if cleaned_texts is not None else None
+        pending_indicators = [indicators[i] for i in pending] if indicators is not None else None
+        chunk_size = max(self.min_batch_chunk, math.ceil(len(pending) / self.processes))
+        jobs = [self._submit('batch', (pending_texts[start:start + chunk_size],
+                                       pending_flags[start:start + chunk_size],
+                                       pending_thresholds[start:start + chunk_size],
+                                       pending_cleaned[start:start + chunk_size]
+                                       if pending_cleaned is not None else None,
+                                       pending_indicators[start:start + chunk_size]
+                                       if pending_indicators is not None else None))
+                for start in range(0, len(pending), chunk_size)]
+
+        scored = []
+        for job_id, future in jobs:
+            scored.extend(self._wait(job_id, future))
+        for i, result in zip(pending, scored):
+            results[i] = result
+        return results
+
+    def _submit(self, kind: str, payload) -> Tuple[int, Future]:
+        if self._closing:
+            raise RuntimeError("Inference pool is shutting down")
+        if not self._slots.acquire(timeout=self.submit_timeout):
+            raise PoolOverloaded(f"Inference pool overloaded ({self.max_pending} requests pending)")
+
+        job_id = next(self._job_ids)
+        future: Future = Future()
+        while True:
+            with self._lock:
+                live = [w for w in self._workers if w is not None and w.process.is_alive()]
+                if not live:
+                    self._futures.pop(job_id, None)
+                    self._slots.release()
+                    raise RuntimeError("No live inference workers")
+                worker = min(live, key=lambda w: len(w.outstanding))
+                worker.outstanding.add(job_id)
+                self._futures[job_id] = (future, worker)
+
+            with worker.send_lock:
+                if not worker.retired:
+                    try:
+                        worker.tasks.send((job_id, kind, payload))
+                    except (OSError, EOFError) as e:
+                        self._resolve(job_id, False, RuntimeError(
+                            f"Inference worker {worker.index} unavailable: {e}"))
+                    return job_id, future
+
+            # The worker was recycled between choosing it and sending; choose again
+            with self._lock:
+                worker.outstanding.discard(job_id)
+
+    def _wait(self, job_id: int, future: Future):
+        try:
+            return future.result(timeout=self.result_timeout)
+        except FutureTimeoutError:
+            # Give the slot back; a late result for this job is ignored
+            self._resolve(job_id, False, TimeoutError(
+                f"No inference result within {self.result_timeout} seconds"))
+            return future.result()
+
+    def _resolve(self, job_id: int, ok: bool, value):
+        with self._lock:
+            entry = self._futures.pop(job_id, None)
+            if entry is None:
+                return
+            future, worker = entry
+            worker.outstanding.discard(job_id)
+        self._slots.release()
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value if isinstance(value, BaseException) else RuntimeError(str(value)))
+
+    def _collect_results(self):
+        while not self._closing:
+            with self._lock:
+                connections = {w.results: w for w in self._workers + self._retiring
+                               if w is not None and not w.closed}
+            try:
+                ready = wait(list(connections), timeout=0.5)
+            except OSError:
+                # Never expected (only this thread closes result pipes), but
+                # this thread must not die: every request would then time out
+                time.sleep(0.1)
+                continue
+            for connection in ready:
+                worker = connections[connection]
+                try:
+                    job_id, ok, value, observations = connection.recv()
+                except (EOFError, OSError):
+                    # The worker exited: stop watching its pipe (an EOF pipe is always ready)
+                    with self._lock:
+                        worker.closed = True
+                        retired = worker.retired
+                    connection.close()
+                    if retired:
+                        # Recycled, or already handled by the monitor
+                        self._finish_retired(worker)
+                    # Otherwise the monitor fails its jobs and replaces it
+                    continue
+                if observations:
+                    merge_observations(observations)
+                self._resolve(job_id, ok, value)
+
+    def recycle(self):
+        """
+        Replace every worker with a fresh fork of the parent, one at a time.
+
+        Used after the parent's model has been reloaded. Each replaced worker
+        finishes the jobs already sent to it and then exits, so no request is
+        dropped; new jobs go to the replacements.
+        """
+        with self._lock:
+            if self._closing:
+                return
+        # Let the new model's objects be shared too (see start)
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+
+        for index in range(self.processes):
+            with self._lock:
+                old = self._workers[index]
+            self._spawn(index)
+            if old is None:
+                continue
+            with old.send_lock:
+                self._retire(old)
+                try:
+                    old.tasks.send(None)
+                except (OSError, EOFError):
+                    pass
+        self.recycles += 1
+
+    def _retire(self, worker: _Worker):
+        """
+        Stop sending jobs to worker and hand it to the result collector, which
+        finishes it once its result pipe is drained. Call with worker.send_lock held.
+        """
+        with self._lock:
+            if worker.retired:
+                return
+            worker.retired = True
+            if worker.closed:
+                # The collector already saw its pipe close; finish it here
+                finished = True
+            else:
+                self._retiring.append(worker)
+                finished = False
+        if finished:
+            self._fail_outstanding(worker)
+            worker.process.join()
+            worker.tasks.close()
+
+    def _monitor_workers(self):
+        """
+        Retire any dead worker and fork a replacement.
+
+        The result collector still reads whatever the worker sent before it
+        died, then fails the jobs it never answered.
+        """
+        while not self._closing:
+            time.sleep(1.0)
+            for index, worker in enumerate(list(self._workers)):
+                if self._closing or worker is None or worker.retired or worker.process.is_alive():
+                    continue
+                with worker.send_lock:
+                    self._retire(worker)
+                self._restarts[index] += 1
+                self._spawn(index)
+
+    def _fail_outstanding(self, worker: _Worker):
+        with self._lock:
+            job_ids = list(worker.outstanding)
+        for job_id in job_ids:
+            self._resolve(job_id, False, RuntimeError(
+                f"Inference worker {worker.index} exited with code {worker.process.exitcode}"))
+
+    def _finish_retired(self, worker: _Worker):
+        """Finish a retired worker whose result pipe is drained, failing anything it never answered."""
+        with self._lock:
+            if worker not in self._retiring:
+                return
+            self._retiring.remove(worker)
+        self._fail_outstanding(worker)
+        worker.process.join()
+        worker.tasks.close()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._futures)
+
+    def stats(self) -> dict:
+        """Pool size, queue depth and per-worker health."""
+        now = time.time()
+        workers = []
+        with self._lock:
+            for index, worker in enumerate(self._workers):
+                last_active = self._last_active[index]
+                workers.append({
+                    "index": index,
+                    "pid": worker.process.pid if worker else None,
+                    "alive": bool(worker and worker.process.is_alive()),
+                    "outstanding": len(worker.outstanding) if worker else 0,
+                    "processed": self._processed[index],
+                    "errors": self._errors[index],
+                    "restarts": self._restarts[index],
+                    "idle_seconds": round(now - last_active, 3) if last_active else None,
+                })
+            pending = len(self._futures)
+            retiring = len(self._retiring)
+        return {
+            "processes": self.processes,
+            "pending": pending,
+            "max_pending": self.max_pending,
+            "recycles": self.recycles,
+            "retiring": retiring,
+            "workers": workers,
+        }
+
+    def close(self, timeout: float = 5.0):
+        """Stop the workers, failing whatever is still pending."""
+        with self._lock:
+            self._closing = True
+            workers = self._workers + self._retiring
+        for worker in workers:
+            if worker is not None:
+                try:
+                    with worker.send_lock:
+                        worker.tasks.send(None)
+                except (OSError, EOFError):
+                    pass
+
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            if worker is not None:
+                worker.process.join(max(0.0, deadline - time.monotonic()))
+                if worker.process.is_alive():
+                    worker.process.terminate()
+
+        with self._lock:
+            job_ids = list(self._futures)
+        for job_id in job_ids:
+            self._resolve(job_id, False, RuntimeError("Inference pool closed"))
+
+
+def _worker_main(index, model, tasks, results, processed, errors, last_active):
+    """Worker loop: take (job_id, kind, payload) off the task pipe until None arrives."""
+    # The parent process handles Ctrl+C and shuts the pool down, and handles
+    # SIGHUP model reloads (then recycles the workers)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    # Fresh locks: another parent thread may have held one at fork time.
+    # Each worker gets its own cache, and its stage timings go back to the
+    # parent with every result.
+    reset_after_fork()
+    model.cache = PredictionCache(max_size=model.cache.max_size, ttl=model.cache.ttl)
+    model._reload_lock = threading.Lock()
+    if model.reputation is not None:
+        model.reputation._reload_lock = threading.Lock()
+    # The parent already ran the pre-filter cascade on everything it sends
+    model.prefilter = None
+
+    while True:
+        try:
+            job = tasks.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+
+        job_id, kind, payload = job
+        try:
+            if kind == 'one':
+                result = model.predict(*payload)
+            else:
+                result = model.predict_batch(*payload)
+            message = (job_id, True, result, take_observations())
+        except Exception as e:
+            errors[index] += 1
+            message = (job_id, False, e, take_observations())
+
+        try:
+            results.send(message)
+        except Exception as e:
+            # The result or exception could not be pickled
+            results.send((job_id, False, RuntimeError(str(e)), None))
+
+        processed[index] += 1
+        last_active[index] = time.time()
@@ -1,105 +1,186 @@
 """
 Generate a sample SMS/Email scam dataset for training.
 Creates a CSV file with message and label columns.
+
+For load-testing corpora (millions to hundreds of millions of rows) use
+--streaming, which writes seeded shards in parallel with constant memory:
+
+    python generate_dataset.py --streaming --rows 100000000 --shards 32 --output big.csv
 """
 
+import argparse
+import itertools
+import multiprocessing as mp
+import string
+import time
+import numpy as np
 import pandas as pd
 import random
 import os
 
+# Scam templates, grouped by category
+SCAM_TEMPLATES = [
+    # Urgency scams
+    ["URGENT! Your {account_type} account has been {action}. Click here immediately: {url}",
+     "Your {account_type} will be {action} in {time}. Verify now: {url}",
+     "URGENT MESSAGE: {issue} requires immediate attention. Click: {url}",
+     "Action required immediately! Your {account_type} needs verification: {url}"],
+
+    # Prize/Winner scams
+    ["Congratulations! You have won ${amount}! Call {phone} to claim your prize!",
+     "You've been selected! You won ${amount}! Text CLAIM to {phone}",
+     "You are the {number} visitor! Claim your free {item} now! {url}",
+     "Congratulations! ${amount} prize waiting! Act now: {url}"],
+
+    # Tax refund scams
+    ["Your tax refund of ${amount} is ready. Click here to claim: {url}",
+     "IRS Alert: ${amount} refund pending. Verify: {url}",
+     "Tax refund approved! Claim ${amount} now: {url}"],
+
+    # Account verification scams
+    ["Your {account_type} needs verification. Update info: {url}",
+     "Account suspended due to suspicious activity. Verify: {url}",
+     "Your {account_type} will be locked. Confirm details: {url}",
+     "Security alert: Verify your {account_type} now: {url}"],
+
+    # Package/Delivery scams
+    ["Your package delivery failed. Pay ${fee} to reschedule: {url}",
+     "UPS: Package delivery issue. Update address: {url}",
+     "FedEx: Your package needs verification. Click: {url}"],
+
+    # Banking scams
+    ["Your bank account needs verification. Click: {url}",
+     "Suspicious activity on your account. Verify: {url}",
+     "Your card will be blocked. Update now: {url}",
+     "Bank alert: Verify transaction of ${amount}: {url}"],
+
+    # Tech support scams
+    ["Microsoft: Your computer has a virus. Call {phone}",
+     "Apple: Your iCloud account is locked. Unlock: {url}",
+     "Windows Security Alert: Click to scan: {url}"],
+
+    # Romance scams
+    ["Hi beautiful, I'm {name}. Let's chat and get to know each other.",
+     "I saw your profile and I'm interested. Message me at {url}",
+     "You seem amazing. Want to connect? {url}"],
+
+    # Loan/Investment scams
+    ["Get approved for a ${amount} loan with 0% interest! Apply: {url}",
+     "Investment opportunity! Double your money in 30 days. Join: {url}",
+     "Guaranteed returns! Invest ${amount} and get 10x back: {url}"],
+
+    # Free offer scams
+    ["Free {item}! Limited time offer. Claim now: {url}",
+     "Get free ${amount} gift card! Just pay shipping: {url}",
+     "Congratulations! You qualify for a free {item}: {url}"]
+]
+
+# Variations for placeholders
+SCAM_PLACEHOLDERS = {
+    "account_type": ["bank", "PayPal", "Amazon", "Netflix", "credit card", "email", "iCloud", "Facebook"],
+    "action": ["suspended", "locked", "closed", "compromised", "frozen"],
+    "time": ["24 hours", "48 hours", "today", "2 days", "3 hours"],
+    "issue": ["Unauthorized login", "Suspicious activity", "Failed verification", "Payment issue"],
+    "amount": ["500", "1,000", "2,500", "5,000", "10,000", "50,000", "100,000"],
+    "fee": ["5.99", "9.99", "12.99", "19.99", "24.99"],
+    "phone": ["1-800-WINNER", "1-888-456-7890", "+1-555-123-4567", "18005551234"],
+    "item": ["iPhone", "iPad", "laptop", "tablet", "watch", "TV", "gift card"],
+    "number": ["1,000th", "10,000th", "100,000th", "millionth"],
+    "url": ["verify-now.com", "secure-bank.com", "claim-prize.net", "update-info.org",
+            "taxrefund.gov", "delivery-update.com", "account-verify.net"],
+    "name": ["John", "Sarah", "Michael", "Emily", "David", "Jessica"]
+}
+
+URGENCY_PREFIXES = ["URGENT: ", "⚠️ ", "ALERT: ", "WARNING: "]
+
+# Legitimate (ham) templates, grouped by category
+HAM_TEMPLATES = [
+    # Casual conversations
+    ["Hey, are you free for {activity} {time}?",
+     "Want to grab {food} later?",
+     "Can we reschedule our {meeting_type}?",
+     "Thanks for {action}! Really appreciate it."],
+
+    # Work/Professional
+    ["The meeting is scheduled for {time} in {location}.",
+     "Can you send me the {document_type} when you get a chance?",
+     "I'll review the {project_type} and get back to you.",
+     "Please find attached the {file_type}."],
+
+    # Personal messages
+    ["Happy birthday! Hope you have a great day!",
+     "Just wanted to check in and see how you're doing.",
+     "Thanks for the {item}. It's exactly what I needed!",
+     "Hope you're having a good week!"],
+
+    # Reminders
+    ["Don't forget about {event} {time}.",
+     "Reminder: {task} due by {time}.",
+     "Just a reminder to {action}."],
+
+    # Informational
+    ["The weather looks great today. Perfect for {activity}.",
+     "I'll be running about {time} late for our appointment.",
+     "Let me know your availability for a {call_type} call."],
+
+    # Confirmations
+    ["Got it! See you {time}.",
+     "Sounds good. Looking forward to it!",
+     "Perfect, I'll see you then.",
+     "Confirmed! Thanks for letting me know."],
+
+    # Questions
+    ["Do you know where {place} is?",
+     "What time works best for you?",
+     "Can you help me with {task}?"],
+
+    # Apologies
+    ["Sorry I'm running late. Be there in {time}.",
+     "Apologies for the delay. Thanks for your patience.",
+     "Sorry about the confusion. Let me clarify."],
+
+    # Appointments
+    ["Your appointment with {name} is on {date} at {time}.",
+     "Appointment confirmed for {date} at {time}.",
+     "We'll see you on {date} at {time}."],
+
+    # Social
+    ["Are you coming to {event} this weekend?",
+     "Would you like to join us for {activity}?",
+     "We're meeting at {place} if you want to come."]
+]
+
+# Variations
+HAM_PLACEHOLDERS = {
+    "activity": ["lunch", "dinner", "coffee", "a walk", "the movies", "a game"],
+    "time": ["tomorrow", "next week", "Friday", "this afternoon", "3 PM", "next month"],
+    "food": ["lunch", "dinner", "coffee", "a drink", "pizza"],
+    "meeting_type": ["meeting", "call", "appointment", "session"],
+    "action": ["your help", "the update", "doing that", "your time"],
+    "location": ["the conference room", "my office", "the main hall", "room 101"],
+    "document_type": ["report", "presentation", "document", "file", "data"],
+    "project_type": ["proposal", "document", "report", "presentation"],
+    "file_type": ["document", "report", "file", "data"],
+    "item": ["book", "email", "message", "call"],
+    "event": ["the meeting", "the party", "dinner", "the event"],
+    "task": ["submit the form", "send the email", "call back", "reply"],
+    "call_type": ["quick", "brief", "scheduled"],
+    "place": ["the restaurant", "the office", "the store", "the cafe"],
+    "name": ["Dr. Smith", "John", "Sarah", "the team"],
+    "date": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+}
+
 def generate_scam_messages(count=5000):
     """Generate diverse scam message templates."""
-    scam_templates = [
-        # Urgency scams
-        ["URGENT! Your {account_type} account has been {action}. Click here immediately: {url}",
-         "Your {account_type} will be {action} in {time}. Verify now: {url}",
-         "URGENT MESSAGE: {issue} requires immediate attention. Click: {url}",
-         "Action required immediately! Your {account_type} needs verification: {url}"],
-        
-        # Prize/Winner scams
-        ["Congratulations! You have won ${amount}! Call {phone} to claim your prize!",
-         "You've been selected! You won ${amount}! Text CLAIM to {phone}",
-         "You are the {number} visitor! Claim your free {item} now! {url}",
-         "Congratulations! ${amount} prize waiting! Act now: {url}"],
-        
-        # Tax refund scams
-        ["Your tax refund of ${amount} is ready. Click here to claim: {url}",
-         "IRS Alert: ${amount} refund pending. Verify: {url}",
-         "Tax refund approved! Claim ${amount} now: {url}"],
-        
-        # Account verification scams
-        ["Your {account_type} needs verification. Update info: {url}",
-         "Account suspended due to suspicious activity. Verify: {url}",
-         "Your {account_type} will be locked. Confirm details: {url}",
-         "Security alert: Verify your {account_type} now: {url}"],
-        
-        # Package/Delivery scams
-        ["Your package delivery failed. Pay ${fee} to reschedule: {url}",
-         "UPS: Package delivery issue. Update address: {url}",
-         "FedEx: Your package needs verification. Click: {url}"],
-        
-        # Banking scams
-        ["Your bank account needs verification. Click: {url}",
-         "Suspicious activity on your account. Verify: {url}",
-         "Your card will be blocked. Update now: {url}",
-         "Bank alert: Verify transaction of ${amount}: {url}"],
-        
-        # Tech support scams
-        ["Microsoft: Your computer has a virus. Call {phone}",
-         "Apple: Your iCloud account is locked. Unlock: {url}",
-         "Windows Security Alert: Click to scan: {url}"],
-        
-        # Romance scams
-        ["Hi beautiful, I'm {name}. Let's chat and get to know each other.",
-         "I saw your profile and I'm interested. Message me at {url}",
-         "You seem amazing. Want to connect? {url}"],
-        
-        # Loan/Investment scams
-        ["Get approved for a ${amount} loan with 0% interest! Apply: {url}",
-         "Investment opportunity! Double your money in 30 days. Join: {url}",
-         "Guaranteed returns! Invest ${amount} and get 10x back: {url}"],
-        
-        # Free offer scams
-        ["Free {item}! Limited time offer. Claim now: {url}",
-         "Get free ${amount} gift card! Just pay shipping: {url}",
-         "Congratulations! You qualify for a free {item}: {url}"]
-    ]
-    
-    # Variations for placeholders
-    account_types = ["bank", "PayPal", "Amazon", "Netflix", "credit card", "email", "iCloud", "Facebook"]
-    actions = ["suspended", "locked", "closed", "compromised", "frozen"]
-    times = ["24 hours", "48 hours", "today", "2 days", "3 hours"]
-    issues = ["Unauthorized login", "Suspicious activity", "Failed verification", "Payment issue"]
-    amounts = ["500", "1,000", "2,500", "5,000", "10,000", "50,000", "100,000"]
-    fees = ["5.99", "9.99", "12.99", "19.99", "24.99"]
-    phones = ["1-800-WINNER", "1-888-456-7890", "+1-555-123-4567", "18005551234"]
-    items = ["iPhone", "iPad", "laptop", "tablet", "watch", "TV", "gift card"]
-    numbers = ["1,000th", "10,000th", "100,000th", "millionth"]
-    urls = ["verify-now.com", "secure-bank.com", "claim-prize.net", "update-info.org", 
-            "taxrefund.gov", "delivery-update.com", "account-verify.net"]
-    names = ["John", "Sarah", "Michael", "Emily", "David", "Jessica"]
-    
     messages = []
     
     for _ in range(count):
         # Pick a random template category
-        category = random.choice(scam_templates)
+        category = random.choice(SCAM_TEMPLATES)
         template = random.choice(category)
         
         # Fill placeholders
-        message = template.format(
-            account_type=random.choice(account_types),
-            action=random.choice(actions),
-            time=random.choice(times),
-            issue=random.choice(issues),
-            amount=random.choice(amounts),
-            fee=random.choice(fees),
-            phone=random.choice(phones),
-            item=random.choice(items),
-            number=random.choice(numbers),
-            url=random.choice(urls),
-            name=random.choice(names)
-        )
+        message = template.format(**{name: random.choice(options) for name, options in SCAM_PLACEHOLDERS.items()})
         
         # Add variations
         if random.random() < 0.3:
@@ -108,8 +189,7 @@ def generate_scam_messages(count=5000):
             message = message.replace('.', '!')  # Exclamation marks
         if random.random() < 0.2:
             # Add extra urgency
-            urgency_prefixes = ["URGENT: ", "⚠️ ", "ALERT: ", "WARNING: "]
-            message = random.choice(urgency_prefixes) + message
+            message = random.choice(URGENCY_PREFIXES) + message
         
         messages.append(message)
     
@@ -117,104 +197,13 @@ def generate_scam_messages(count=5000):
 
 def generate_ham_messages(count=5000):
     """Generate legitimate (ham) message templates."""
-    ham_templates = [
-        # Casual conversations
-        ["Hey, are you free for {activity} {time}?",
-         "Want to grab {food} later?",
-         "Can we reschedule our {meeting_type}?",
-         "Thanks for {action}! Really appreciate it."],
-        
-        # Work/Professional
-        ["The meeting is scheduled for {time} in {location}.",
-         "Can you send me the {document_type} when you get a chance?",
-         "I'll review the {project_type} and get back to you.",
-         "Please find attached the {file_type}."],
-        
-        # Personal messages
-        ["Happy birthday! Hope you have a great day!",
-         "Just wanted to check in and see how you're doing.",
-         "Thanks for the {item}. It's exactly what I needed!",
-         "Hope you're having a good week!"],
-        
-        # Reminders
-        ["Don't forget about {event} {time}.",
-         "Reminder: {task} due by {time}.",
-         "Just a reminder to {action}."],
-        
-        # Informational
-        ["The weather looks great today. Perfect for {activity}.",
-         "I'll be running about {time} late for our appointment.",
-         "Let me know your availability for a {call_type} call."],
-        
-        # Confirmations
-        ["Got it! See you {time}.",
-         "Sounds good. Looking forward to it!",
-         "Perfect, I'll see you then.",
-         "Confirmed! Thanks for letting me know."],
-        
-        # Questions
-        ["Do you know where {place} is?",
-         "What time works best for you?",
-         "Can you help me with {task}?"],
-        
-        # Apologies
-        ["Sorry I'm running late. Be there in {time}.",
-         "Apologies for the delay. Thanks for your patience.",
-         "Sorry about the confusion. Let me clarify."],
-        
-        # Appointments
-        ["Your appointment with {name} is on {date} at {time}.",
-         "Appointment confirmed for {date} at {time}.",
-         "We'll see you on {date} at {time}."],
-        
-        # Social
-        ["Are you coming to {event} this weekend?",
-         "Would you like to join us for {activity}?",
-         "We're meeting at {place} if you want to come."]
-    ]
-    
-    # Variations
-    activities = ["lunch", "dinner", "coffee", "a walk", "the movies", "a game"]
-    times = ["tomorrow", "next week", "Friday", "this afternoon", "3 PM", "next month"]
-    foods = ["lunch", "dinner", "coffee", "a drink", "pizza"]
-    meeting_types = ["meeting", "call", "appointment", "session"]
-    actions = ["your help", "the update", "doing that", "your time"]
-    locations = ["the conference room", "my office", "the main hall", "room 101"]
-    document_types = ["report", "presentation", "document", "file", "data"]
-    project_types = ["proposal", "document", "report", "presentation"]
-    file_types = ["document", "report", "file", "data"]
-    items = ["book", "email", "message", "call"]
-    events = ["the meeting", "the party", "dinner", "the event"]
-    tasks = ["submit the form", "send the email", "call back", "reply"]
-    call_types = ["quick", "brief", "scheduled"]
-    places = ["the restaurant", "the office", "the store", "the cafe"]
-    names = ["Dr. Smith", "John", "Sarah", "the team"]
-    dates = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
-    
     messages = []
     
     for _ in range(count):
-        category = random.choice(ham_templates)
+        category = random.choice(HAM_TEMPLATES)
         template = random.choice(category)
         
-        message = template.format(
-            activity=random.choice(activities),
-            time=random.choice(times),
-            food=random.choice(foods),
-            meeting_type=random.choice(meeting_types),
-            action=random.choice(actions),
-            location=random.choice(locations),
-            document_type=random.choice(document_types),
-            project_type=random.choice(project_types),
-            file_type=random.choice(file_types),
-            item=random.choice(items),
-            event=random.choice(events),
-            task=random.choice(tasks),
-            call_type=random.choice(call_types),
-            place=random.choice(places),
-            name=random.choice(names),
-            date=random.choice(dates)
-        )
+        message = template.format(**{name: random.choice(options) for name, options in HAM_PLACEHOLDERS.items()})
         
         messages.append(message)
     
@@ -271,13 +260,232 @@ def generate_dataset(output_path="dataset/scam_dataset.csv", total_samples=10000
     
     return df
 
-if __name__ == "__main__":
-    # Generate 10,000 samples
-    import sys
-    import os
+class VariantTable:
+    """
+    Every distinct message one label's templates can produce, rendered once.
+    
+    Each template has a fixed number of variants (the product of the option
+    lists of its placeholders, times the scam styling variations), so a
+    message is fully described by one integer code. Rows are sampled as codes
+    with numpy and turned into text by indexing the pre-rendered table, which
+    gives the same distribution as generate_scam_messages /
+    generate_ham_messages without a Python loop per row.
+    """
+    
+    def __init__(self, templates, placeholders, label: int, styled: bool = False):
+        # (transform, probability) for each combination of the scam variations
+        styles = [(lambda message: message, 1.0)]
+        if styled:
+            styles = []
+            for upper in (False, True):
+                for exclaim in (False, True):
+                    for prefix in [None] + URGENCY_PREFIXES:
+                        probability = (0.3 if upper else 0.7) * (0.4 if exclaim else 0.6)
+                        probability *= 0.2 / len(URGENCY_PREFIXES) if prefix else 0.8
+                        styles.append((self._styler(upper, exclaim, prefix), probability))
+        
+        messages = []
+        offsets, sizes, template_probabilities = [], [], []
+        for category in templates:
+            for template in category:
+                fields = [field for _, field, _, _ in string.Formatter().parse(template) if field]
+                combinations = list(itertools.product(*(placeholders[field] for field in fields)))
+                offsets.append(len(messages))
+                sizes.append(len(combinations))
+                # Category first, then a template within it, as in the Python generators
+                template_probabilities.append(1.0 / len(templates) / len(category))
+                for values in combinations:
+                    base = template.format(**dict(zip(fields, values)))
+                    messages.extend(style(base) for style, _ in styles)
+        
+        self.label = label
+        self.messages = np.array(messages, dtype=object)
+        self.csv_lines = np.array([f"{_csv_field(message)},{label}\n".encode("utf-8") for message in messages],
+                                  dtype=object)
+        self._offsets = np.array(offsets, dtype=np.int64)
+        self._sizes = np.array(sizes, dtype=np.int64)
+        self._template_probabilities = np.array(template_probabilities)
+        self._style_count = len(styles)
+        self._style_probabilities = np.array([probability for _, probability in styles])
+    
+    @staticmethod
+    def _styler(upper: bool, exclaim: bool, prefix):
+        def style(message):
+            if upper:
+                message = message.upper()
+            if exclaim:
+                message = message.replace('.', '!')
+            if prefix:
+                message = prefix + message
+            return message
+        return style
+    
+    def sample(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        """Draw count message codes (indexes into messages / csv_lines)."""
+        template = rng.choice(len(self._sizes), size=count, p=self._template_probabilities)
+        variant = (rng.random(count) * self._sizes[template]).astype(np.int64)
+        style = rng.choice(self._style_count, size=count, p=self._style_probabilities)
+        return self._offsets[template] + variant * self._style_count + style
+
+def _csv_field(value: str) -> str:
+    """Quote a CSV field the way pandas does (only when needed)."""
+    if any(char in value for char in ',"\n\r'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+_tables = None
+
+def _variant_tables():
+    """The scam and ham tables, built once per process (inherited by forked workers)."""
+    global _tables
+    if _tables is None:
+        _tables = (VariantTable(SCAM_TEMPLATES, SCAM_PLACEHOLDERS, label=1, styled=True),
+                   VariantTable(HAM_TEMPLATES, HAM_PLACEHOLDERS, label=0))
+    return _tables
+
+def shard_path(output_path: str, shard: int, shards: int) -> str:
+    """Path of one shard: data.csv -> data-00003-of-00016.csv (unchanged for a single shard)."""
+    if shards == 1:
+        return output_path
+    root, ext = os.path.splitext(output_path)
+    return f"{root}-{shard:05d}-of-{shards:05d}{ext}"
+
+def write_shard(output_path: str, rows: int, seed: int, shard: int, block_size: int = 100000,
+                file_format: str = "csv") -> dict:
+    """
+    Write one shard of rows messages, block by block.
+    
+    The shard's generator is seeded with (seed, shard), so a shard's content
+    depends only on the seed, its index, its row count and block_size, not on
+    how many processes write the shards. Every block is exactly balanced
+    (half scam, rounded down) and shuffled.
+    
+    Returns:
+        dict: path, rows and scam count of the shard
+    """
+    scam_table, ham_table = _variant_tables()
+    rng = np.random.default_rng([seed, shard])
+    
+    if file_format == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Writing Parquet needs pyarrow: pip install pyarrow")
+        schema = pa.schema([("message", pa.string()), ("label", pa.int64())])
+        writer = pq.ParquetWriter(output_path, schema)
+    else:
+        writer = open(output_path, "wb")
+        writer.write(b"message,label\n")
     
+    scams = 0
+    try:
+        for start in range(0, rows, block_size):
+            count = min(block_size, rows - start)
+            is_scam = rng.permutation(count) < count // 2
+            scam_codes = scam_table.sample(rng, int(is_scam.sum()))
+            ham_codes = ham_table.sample(rng, count - len(scam_codes))
+            scams += len(scam_codes)
+            
+            if file_format == "parquet":
+                messages = np.empty(count, dtype=object)
+                messages[is_scam] = scam_table.messages[scam_codes]
+                messages[~is_scam] = ham_table.messages[ham_codes]
+                writer.write_table(pa.table({"message": pa.array(messages.tolist(), pa.string()),
+                                             "label": is_scam.astype(np.int64)}, schema=schema))
+            else:
+                lines = np.empty(count, dtype=object)
+                lines[is_scam] = scam_table.csv_lines[scam_codes]
+                lines[~is_scam] = ham_table.csv_lines[ham_codes]
+                writer.write(b"".join(lines.tolist()))
+    finally:
+        writer.close()
+    
+    return {"path": output_path, "rows": rows, "scam": scams}
+
+def _write_shard_job(job):
+    return write_shard(*job)
+
+def generate_large_dataset(output_path: str, total_rows: int, shards: int = 1, processes: int = None,
+                           seed: int = 42, block_size: int = 100000, file_format: str = None):
+    """
+    Generate a large dataset as seeded shards written in parallel.
+    
+    Rows are sampled from pre-rendered template variants (see VariantTable)
+    and streamed to disk block by block, so memory stays constant whatever
+    total_rows is. With the same seed, total_rows, shards and block_size the
+    output is identical, however many processes are used.
+    
+    Returns:
+        list: one dict (path, rows, scam) per shard
+    """
+    file_format = file_format or ("parquet" if output_path.endswith((".parquet", ".pq")) else "csv")
+    processes = min(processes or os.cpu_count() or 1, shards)
+    
+    print("=" * 60)
+    print("Generating Scam Detection Dataset (streaming)")
+    print("=" * 60)
+    print(f"\n{total_rows} rows in {shards} {file_format} shard(s), {processes} process(es), seed {seed}")
+    
+    os.makedirs(os.path.dirname(output_path) if os.path.dirname(output_path) else '.', exist_ok=True)
+    # Build the tables before forking so every worker shares them
+    _variant_tables()
+    
+    jobs = [(shard_path(output_path, shard, shards), total_rows // shards + (shard < total_rows % shards),
+             seed, shard, block_size, file_format) for shard in range(shards)]
+    
+    start = time.perf_counter()
+    results = []
+    if processes > 1:
+        context = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else mp.get_context()
+        with context.Pool(processes) as pool:
+            for result in pool.imap_unordered(_write_shard_job, jobs):
+                results.append(result)
+                print(f"   {result['path']}: {result['rows']} rows ({len(results)}/{shards} shards)")
+    else:
+        for job in jobs:
+            results.append(write_shard(*job))
+            print(f"   {results[-1]['path']}: {results[-1]['rows']} rows ({len(results)}/{shards} shards)")
+    elapsed = time.perf_counter() - start
+    
+    results.sort(key=lambda result: result["path"])
+    scams = sum(result["scam"] for result in results)
+    print(f"\n✅ Dataset saved to: {shard_path(output_path, 0, shards)}" + (" ..." if shards > 1 else ""))
+    print(f"   Total messages: {total_rows}")
+    print(f"   Scam messages: {scams}")
+    print(f"   Legitimate messages: {total_rows - scams}")
+    print(f"   Time: {elapsed:.1f}s ({total_rows / max(elapsed, 1e-9):,.0f} rows/sec)")
+    print("\n" + "=" * 60)
+    print("Dataset generation completed!")
+    print("=" * 60)
+    
+    return results
+
+if __name__ == "__main__":
     # Get the script's directory
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    output_path = os.path.join(script_dir, "scam_dataset.csv")
     
-    generate_dataset(output_path, total_samples=10000)
+    parser = argparse.ArgumentParser(description="Generate the scam detection dataset")
+    parser.add_argument("--output", default=os.path.join(script_dir, "scam_dataset.csv"),
+                        help="output CSV (or .parquet with --streaming)")
+    parser.add_argument("--rows", type=int, default=10000, help="total messages (half scam)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="random seed (default: unseeded, or 42 with --streaming)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="vectorized generator that streams seeded shards with constant memory")
+    parser.add_argument("--shards", type=int, default=1, help="output files for --streaming")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="shards written in parallel (default: all cores)")
+    parser.add_argument("--block-size", type=int, default=100000, help="rows generated per block")
+    parser.add_argument("--format", choices=("csv", "parquet"), default=None,
+                        help="output format for --streaming (default: from the extension)")
+    args = parser.parse_args()
+    
+    if args.streaming:
+        generate_large_dataset(args.output, args.rows, shards=args.shards, processes=args.processes,
+                               seed=42 if args.seed is None else args.seed, block_size=args.block_size,
+                               file_format=args.format)
+    else:
+        if args.seed is not None:
+            random.seed(args.seed)
+        generate_dataset(args.output, total_samples=args.rows)